@@ -1,32 +1,31 @@
 import streamlit as st
-import json
 import os
-from typing import Dict, Any, List, Tuple
+import time
+from typing import Dict, List, Tuple
+
+from utils.repository import get_repository
+from utils.ranking import top_k, get_leaderboard
+from utils.images import image_data_uri, pick_image
+from utils.scores import compute_scores_from_summary
+from utils import live_feed
+from utils import season as season_stats
+from utils import metrics
 
 # =========================
 # CONFIG
 # =========================
 st.set_page_config(page_title="Futebol de Terça", layout="wide")
+metrics.begin_rerun("app")
 
-JOGADORES_FILE = "database/jogadores.json"
-RODADAS_DIR = "database/rodadas"
-IMAGENS_DIR = "imagens/jogadores"
+# backend de dados: "json" (padrão, arquivos do repositório) ou "sqlite"
+REPO = get_repository(st.secrets.get("STORAGE_BACKEND"), st.secrets.get("SQLITE_PATH"))
 
 # =========================
 # UTILITÁRIOS
 # =========================
-def safe_load_json(path: str) -> Any:
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return None
-
 def carregar_jogadores() -> Dict[str, dict]:
-    """Carrega jogadores do arquivo local JSON."""
-    if not os.path.exists(JOGADORES_FILE):
-        return {}
-    data = safe_load_json(JOGADORES_FILE)
+    """Carrega jogadores do repositório (objeto possivelmente compartilhado; não mutar)."""
+    data = REPO.get_jogadores()
     if not data:
         return {}
     if isinstance(data, dict):
@@ -36,42 +35,44 @@ def carregar_jogadores() -> Dict[str, dict]:
     return {}
 
 def list_rodadas() -> List[str]:
-    """Retorna lista de ids de rodadas ordenadas (pasta names)."""
-    base = RODADAS_DIR
-    if not os.path.exists(base):
-        return []
-    rodadas = []
-    for name in sorted(os.listdir(base)):
-        path = os.path.join(base, name)
-        if not os.path.isdir(path):
-            continue
-        meta_path = os.path.join(path, "meta.json")
-        if os.path.exists(meta_path):
-            rodadas.append(name)
-    return rodadas
+    """Retorna lista de ids de rodadas ordenadas (a partir do catálogo de rodadas)."""
+    return [r["id"] for r in REPO.list_rodadas()]
 
 def load_scores_for_rodada(rodada_id: str) -> Dict[str, dict]:
     """Carrega scores.json.scores (map player_id -> {gols, assistencias, vitorias, pontos})."""
     if not rodada_id:
         return {}
-    path = os.path.join(RODADAS_DIR, rodada_id, "scores.json")
-    data = safe_load_json(path)
+    data = REPO.get_scores(rodada_id)
     if not data:
         return {}
     return data.get("scores", {}) or {}
 
-def compute_top_players_from_scores(scores: Dict[str, dict], top_n: int = 3) -> List[Tuple[str, dict]]:
-    """Retorna lista (player_id, score_obj) ordenada por pontos desc, limitada a top_n."""
-    items = [(pid, vals) for pid, vals in scores.items()]
-    items.sort(key=lambda kv: kv[1].get("pontos", 0), reverse=True)
-    return items[:top_n]
+def load_provisional_scores(rodada_id: str) -> Dict[str, dict]:
+    """Pontuação parcial de uma rodada ainda aberta, a partir do resumo corrente (running_summary.json)."""
+    if not rodada_id:
+        return {}
+    running = REPO.get_running_summary(rodada_id)
+    if not running:
+        return {}
+    return compute_scores_from_summary(running).get("scores", {})
+
+def compute_top_players_from_scores(scores: Dict[str, dict], top_n: int = 3, jogadores: Dict[str, dict] = None) -> List[Tuple[str, dict]]:
+    """Retorna lista (player_id, score_obj) ordenada por pontos desc, limitada a top_n (heap, O(n log top_n))."""
+    return top_k(scores, top_n, jogadores)
 
 def format_points(n: int) -> str:
     return str(int(n)) if n is not None else "0"
 
+def live_match_clock(state: dict) -> int:
+    """Segundos de jogo da partida ao vivo (o relógio corre enquanto running)."""
+    if state.get("running") and state.get("start_time"):
+        return int(time.time() - state["start_time"])
+    return int(state.get("elapsed", 0))
+
 # =========================
 # INTERFACE
 # =========================
+metrics.section("inicio")
 st.title("⚽ Futebol de Terça")
 
 jogadores = carregar_jogadores()
@@ -79,25 +80,77 @@ if not jogadores:
     st.warning("Nenhum jogador cadastrado.")
     st.stop()
 
+# =========================
+# PLACAR AO VIVO (partida em andamento no console do olheiro)
+# =========================
+LIVE_REFRESH_SECONDS = 3
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+@metrics.fragment_rerun("app.placar_ao_vivo")
+def render_live_scoreboard(journal_path: str):
+    # cada espectador guarda (versão, estado) e só pede o que mudou desde a versão dele
+    view = st.session_state.get("live_view")
+    if not view or view.get("path") != journal_path:
+        view = st.session_state.live_view = {"path": journal_path, "version": None, "state": None}
+    changes = live_feed.changes_since(journal_path, view["version"])
+    if changes["status"] != "not_modified":
+        view["state"] = live_feed.apply_changes(view["state"], changes)
+        view["version"] = changes["version"]
+    state = view["state"]
+    if state is None:
+        st.info("Partida encerrada.")
+        return
+
+    elapsed = live_match_clock(state)
+    c1, c2, c3 = st.columns([2, 1, 2])
+    c1.metric("Time 1", state["score"]["team1"])
+    c2.markdown(f"<h3 style='text-align:center'>{elapsed // 60:02d}:{elapsed % 60:02d}</h3>", unsafe_allow_html=True)
+    c3.metric("Time 2", state["score"]["team2"])
+    for ev in reversed(state["events"][-5:]):
+        t = ev.get("time", 0)
+        if ev.get("type") == "gol":
+            nome = jogadores.get(ev.get("scorer"), {}).get("nome", ev.get("scorer"))
+            st.caption(f"{t // 60:02d}:{t % 60:02d} — {ev.get('team')} — ⚽ Gol: {nome}")
+        else:
+            nome = jogadores.get(ev.get("assister"), {}).get("nome", ev.get("assister"))
+            st.caption(f"{t // 60:02d}:{t % 60:02d} — {ev.get('team')} — Assistência: {nome}")
+
+metrics.section("ao_vivo")
+ao_vivo = live_feed.live_journals([r["id"] for r in REPO.list_rodadas(status="open")])
+if ao_vivo:
+    st.markdown("### 🔴 Ao vivo")
+    labels = {path: f"{rid} — partida {os.path.basename(path)[:-6]}" for rid, path in ao_vivo}
+    if st.toggle("Acompanhar placar ao vivo", value=False):
+        journal_sel = st.selectbox("Partida", options=list(labels), format_func=labels.get) if len(labels) > 1 else next(iter(labels))
+        render_live_scoreboard(journal_sel)
+    st.divider()
+
 # Seleção de rodada
+metrics.section("leaderboard")
 rodadas_opts = ["Todas as rodadas"] + list_rodadas()
 selected_rodada = st.selectbox("Mostrar dados da rodada", options=rodadas_opts, index=0)
 
-# Carrega scores da rodada selecionada (se houver)
+# Carrega scores da rodada selecionada (se houver); rodada aberta usa a pontuação parcial
 rodada_scores = {}
+provisional = False
 if selected_rodada != "Todas as rodadas":
     rodada_scores = load_scores_for_rodada(selected_rodada)
+    if not rodada_scores:
+        rodada_scores = load_provisional_scores(selected_rodada)
+        provisional = bool(rodada_scores)
+    if provisional:
+        st.info("Rodada em andamento: classificação parcial, atualizada a cada partida salva.")
 
 # Se houver rodada selecionada, destaca top 3
 if selected_rodada != "Todas as rodadas" and rodada_scores:
     st.markdown("### 🏆 Destaques da rodada")
-    top_players = compute_top_players_from_scores(rodada_scores, top_n=3)
+    top_players = compute_top_players_from_scores(rodada_scores, top_n=3, jogadores=jogadores)
     cols = st.columns(len(top_players))
     for idx, (pid, score) in enumerate(top_players):
         col = cols[idx]
         player = jogadores.get(pid, {})
         nome = player.get("nome", pid)
-        imagem = player.get("imagem", "")
+        imagem = pick_image(player, 140)
         pontos = score.get("pontos", 0)
         gols = score.get("gols", 0)
         assists = score.get("assistencias", 0)
@@ -110,19 +163,14 @@ if selected_rodada != "Todas as rodadas" and rodada_scores:
             st.caption(f"ID: {pid}")
     st.divider()
 
-# Preparar ordenação: se rodada selecionada, ordenar por pontos da rodada; senão por pontos_total
-def sort_key(item):
-    pid, j = item
-    if selected_rodada != "Todas as rodadas":
-        s = rodada_scores.get(pid)
-        if s:
-            return (-int(s.get("pontos", 0)), (j.get("nome") or "").lower())
-        else:
-            return (0, (j.get("nome") or "").lower())
-    else:
-        return (-int(j.get("pontos_total", 0)), (j.get("nome") or "").lower())
-
-sorted_items = sorted(jogadores.items(), key=sort_key)
+# Ordenação, ranks e top 1 calculados uma vez por (rodada, versão dos dados)
+if selected_rodada != "Todas as rodadas":
+    data_version = (REPO.backend,) + REPO.data_version(selected_rodada)
+    leaderboard = get_leaderboard(selected_rodada, data_version, jogadores, rodada_scores)
+else:
+    data_version = (REPO.backend,) + REPO.data_version()
+    leaderboard = get_leaderboard(None, data_version, jogadores)
+rows = leaderboard["rows"]
 
 # Cabeçalho explicativo
 st.markdown("### Jogadores — totais e por rodada")
@@ -131,70 +179,86 @@ if selected_rodada == "Todas as rodadas":
 else:
     st.caption(f"Exibindo totais acumulados e os valores da rodada **{selected_rodada}** (gols, assistências, pontos).")
 
-# Renderiza lista (compacta) com destaque visual para top 1 quando aplicável
-for jogador_id, j in sorted_items:
-    col1, col2 = st.columns([1, 3])
-    imagem_path = j.get("imagem", "")
-    nome = j.get("nome", "—")
-    gols_total = int(j.get("gols", 0))
-    assistencias_total = int(j.get("assistencias", 0))
-    pontos_total = int(j.get("pontos_total", 0))
-    valor = j.get("valor", "—")
-
-    # dados da rodada selecionada (se existir)
-    rodada_gols = None
-    rodada_assists = None
-    rodada_pontos = None
-    if selected_rodada != "Todas as rodadas":
-        s = rodada_scores.get(jogador_id)
-        if s:
-            rodada_gols = int(s.get("gols", 0))
-            rodada_assists = int(s.get("assistencias", 0))
-            rodada_pontos = int(s.get("pontos", 0))
-        else:
-            rodada_gols = 0
-            rodada_assists = 0
-            rodada_pontos = 0
-
-    # destaque visual para o melhor da rodada (top 1)
-    is_top1 = False
-    if selected_rodada != "Todas as rodadas" and rodada_scores:
-        top = compute_top_players_from_scores(rodada_scores, top_n=1)
-        if top and top[0][0] == jogador_id:
-            is_top1 = True
-
-    with col1:
-        if imagem_path and os.path.exists(imagem_path):
-            st.image(imagem_path, width=120)
-        else:
-            st.write("")
+modo = st.radio("Exibição", options=["Tabela", "Cartões"], horizontal=True)
+metrics.section(f"jogadores.{'tabela' if modo == 'Tabela' else 'cartoes'}")
 
-    with col2:
-        if is_top1:
-            st.markdown(f"### 🥇 **{nome}**")
-        else:
-            st.markdown(f"**{nome}**")
-
-        # Totais
-        st.write(f"Gols (total): **{gols_total}**")
-        st.write(f"Assistências (total): **{assistencias_total}**")
-        st.write(f"Pontos (total): **{pontos_total}**")
+if modo == "Tabela":
+    # uma única tabela paginada (st.dataframe já virtualiza as linhas visíveis)
+    page_size = st.selectbox("Jogadores por página", options=[25, 50, 100], index=0)
+    n_pages = max(1, (len(rows) + page_size - 1) // page_size)
+    page = st.number_input("Página", min_value=1, max_value=n_pages, value=1, step=1) if n_pages > 1 else 1
+    page_rows = rows[(page - 1) * page_size: page * page_size]
 
-        # Valores da rodada (se aplicável)
+    table = []
+    for r in page_rows:
+        foto = pick_image(r, 80)
+        item = {
+            "Rank": r["rank"],
+            "Foto": image_data_uri(foto) if foto and os.path.exists(foto) else None,
+            "Jogador": ("🥇 " if r["player_id"] == leaderboard["top1"] else "") + r["nome"],
+        }
         if selected_rodada != "Todas as rodadas":
-            st.markdown("---")
-            st.write(f"Gols na rodada: **{rodada_gols}**")
-            st.write(f"Assistências na rodada: **{rodada_assists}**")
-            st.write(f"Pontos na rodada: **{rodada_pontos}**")
+            item.update({
+                "Pontos (rodada)": r["pontos"],
+                "Gols (rodada)": r["gols"],
+                "Assistências (rodada)": r["assistencias"],
+            })
+        item.update({
+            "Pontos (total)": r["pontos_total"],
+            "Gols (total)": r["gols_total"],
+            "Assistências (total)": r["assistencias_total"],
+            "Valor": r["valor"],
+            "ID": r["player_id"],
+        })
+        table.append(item)
+    st.dataframe(
+        table,
+        hide_index=True,
+        use_container_width=True,
+        column_config={"Foto": st.column_config.ImageColumn("Foto", width="small")},
+    )
+    if n_pages > 1:
+        st.caption(f"Página {page} de {n_pages} — {len(rows)} jogadores")
+else:
+    # Renderiza lista (compacta) com destaque visual para top 1 quando aplicável
+    for r in rows:
+        jogador_id = r["player_id"]
+        col1, col2 = st.columns([1, 3])
+        imagem_path = pick_image(r, 120)
 
-        st.write(f"Valor: **{valor}**")
-        st.caption(f"ID: {jogador_id}")
-        st.divider()
+        with col1:
+            if imagem_path and os.path.exists(imagem_path):
+                st.image(imagem_path, width=120)
+            else:
+                st.write("")
+
+        with col2:
+            if jogador_id == leaderboard["top1"]:
+                st.markdown(f"### 🥇 **{r['nome']}**")
+            else:
+                st.markdown(f"**{r['nome']}**")
+
+            # Totais
+            st.write(f"Gols (total): **{r['gols_total']}**")
+            st.write(f"Assistências (total): **{r['assistencias_total']}**")
+            st.write(f"Pontos (total): **{r['pontos_total']}**")
+
+            # Valores da rodada (se aplicável)
+            if selected_rodada != "Todas as rodadas":
+                st.markdown("---")
+                st.write(f"Gols na rodada: **{r['gols']}**")
+                st.write(f"Assistências na rodada: **{r['assistencias']}**")
+                st.write(f"Pontos na rodada: **{r['pontos']}**")
+
+            st.write(f"Valor: **{r['valor']}**")
+            st.caption(f"ID: {jogador_id}")
+            st.divider()
 
 # Resumo final opcional: top 5 da rodada em tabela
+metrics.section("top5")
 if selected_rodada != "Todas as rodadas" and rodada_scores:
     st.markdown("### 📊 Top 5 da rodada")
-    top5 = compute_top_players_from_scores(rodada_scores, top_n=5)
+    top5 = compute_top_players_from_scores(rodada_scores, top_n=5, jogadores=jogadores)
     rows = []
     for rank, (pid, s) in enumerate(top5, start=1):
         player = jogadores.get(pid, {})
@@ -206,3 +270,37 @@ if selected_rodada != "Todas as rodadas" and rodada_scores:
             "Pontos": s.get("pontos", 0)
         })
     st.table(rows)
+
+# Temporada: séries por rodada, forma recente, médias e percentis (matriz NumPy jogador × rodada)
+metrics.section("temporada")
+if selected_rodada == "Todas as rodadas":
+    season = season_stats.get_season(REPO)
+    if season["rodadas"]:
+        st.markdown("### 📈 Temporada")
+        metrica = st.selectbox("Métrica", options=["pontos", "gols", "assistencias", "vitorias"], index=0)
+        n_top = min(5, len(season["players"]))
+        top_idx = season_stats.totals(season, metrica).argsort()[::-1][:n_top]
+        acumulado = season_stats.cumulative(season, metrica)
+        chart = {"rodada": season["rodadas"]}
+        for i in top_idx:
+            pid = season["players"][i]
+            chart[jogadores.get(pid, {}).get("nome", pid)] = acumulado[i].tolist()
+        st.caption(f"{metrica.capitalize()} acumulados por rodada — top {n_top}")
+        st.line_chart(chart, x="rodada")
+
+        n_rodadas = len(season["rodadas"])
+        n_form = st.slider("Forma: últimas N rodadas", min_value=1, max_value=n_rodadas, value=min(3, n_rodadas)) if n_rodadas > 1 else 1
+        tabela = [{
+            "Jogador": r["nome"],
+            "Pontos": r["pontos"],
+            f"Pontos (últimas {n_form})": r["forma"],
+            "Média/rodada": r["media_rodada"],
+            "Média/partida": r["media_partida"],
+            "Rodadas": r["rodadas"],
+            "Percentil": r["percentil"],
+        } for r in season_stats.season_table(season, jogadores, n_form=n_form)]
+        st.dataframe(tabela, hide_index=True, use_container_width=True)
+        p = season_stats.percentiles(season)
+        st.caption("Percentis de pontos na temporada — " + " • ".join(f"p{q}: {v:.0f}" for q, v in p.items()))
+
+metrics.end_rerun()
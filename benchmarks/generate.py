@@ -0,0 +1,124 @@
+# benchmarks/generate.py
+"""
+Gerador determinístico de uma árvore de dados sintética no layout do
+repositório (database/, users/perfis/, times/lineups/), para os benchmarks.
+
+    python -m benchmarks.generate <destino> [--tier small|medium|large] [--seed N]
+
+Mesmo tier + mesma seed = mesmos arquivos, byte a byte.
+"""
+import os
+import sys
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+# N jogadores, M rodadas (a última fica aberta), K partidas por rodada, U usuários
+TIERS = {
+    "small": {"players": 30, "rodadas": 10, "matches": 8, "users": 50},
+    "medium": {"players": 150, "rodadas": 50, "matches": 12, "users": 1000},
+    "large": {"players": 500, "rodadas": 200, "matches": 16, "users": 10000},
+}
+SQUAD = 5           # jogadores por time em campo
+LINEUP_SIZE = 5     # jogadores por time de fantasy
+START = datetime(2025, 1, 7, 20, 0, tzinfo=timezone.utc)
+
+
+def _write(path, obj):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+
+
+def _match(rng, rodada_id, match_id, pids, ts):
+    """Partida com team_assign, eventos de gol/assistência e placar coerente."""
+    escalados = rng.sample(pids, min(len(pids), 2 * SQUAD))
+    team_assign = {pid: (1 if i % 2 == 0 else 2) for i, pid in enumerate(escalados)}
+    times = {1: escalados[0::2], 2: escalados[1::2]}
+    events, placar = [], {"team1": 0, "team2": 0}
+    for minuto in sorted(rng.randint(0, 1500) for _ in range(rng.randint(0, 8))):
+        team = rng.choice((1, 2))
+        scorer = rng.choice(times[team])
+        outros = [p for p in times[team] if p != scorer]
+        assister = rng.choice(outros) if outros and rng.random() < 0.6 else None
+        events.append({"time": minuto, "type": "gol", "team": f"team{team}", "scorer": scorer, "assister": assister})
+        if assister:
+            events.append({"time": minuto, "type": "assist", "team": f"team{team}", "scorer": scorer, "assister": assister})
+        placar[f"team{team}"] += 1
+    return {
+        "rodada_id": rodada_id,
+        "timestamp_start": ts.isoformat(),
+        "timestamp_end": (ts + timedelta(minutes=25)).isoformat(),
+        "duration_seconds": 1500,
+        "team_assign": team_assign,
+        "score": placar,
+        "events": events,
+        "id": match_id,
+        "timestamp_utc": (ts + timedelta(minutes=25)).isoformat(),
+    }
+
+
+def generate(dest, tier="small", seed=0):
+    """Gera a árvore em dest (que deve estar vazio ou não existir). Retorna os tamanhos usados."""
+    from utils.summary import summary_from_matches, RUNNING_SUMMARY_FILE
+    from utils.scores import compute_scores_from_summary
+    from utils.projection import merge_totals, DEFAULT_FORMULA
+
+    sizes = TIERS[tier]
+    rng = random.Random(f"{tier}:{seed}")
+    pids = [f"jogador{i:04d}-{rng.getrandbits(32):08x}" for i in range(sizes["players"])]
+    jogadores = {pid: {"nome": f"Jogador {i}", "valor": rng.randint(5, 20), "gols": 0, "assistencias": 0,
+                       "vitorias": 0, "imagem": ""} for i, pid in enumerate(pids)}
+
+    per_rodada = {}
+    rodadas_dir = os.path.join(dest, "database", "rodadas")
+    for r in range(sizes["rodadas"]):
+        day = START + timedelta(days=7 * r)
+        rodada_id = f"{day:%Y-%m-%d}-rodada-01"
+        base = os.path.join(rodadas_dir, rodada_id)
+        matches = []
+        for k in range(sizes["matches"]):
+            match_id = f"{day:%Y-%m-%d}-match-{k + 1:02d}"
+            m = _match(rng, rodada_id, match_id, pids, day + timedelta(minutes=30 * k))
+            _write(os.path.join(base, "matches", f"{match_id}.json"), m)
+            matches.append(m)
+        is_open = r == sizes["rodadas"] - 1
+        meta = {"id": rodada_id, "nome": f"Rodada {r + 1}", "admin": "admin", "inicio": day.isoformat(),
+                "fim": None if is_open else (day + timedelta(hours=4)).isoformat(),
+                "status": "open" if is_open else "closed",
+                "matches": [m["id"] for m in matches], "match_count": len(matches)}
+        summary = summary_from_matches(rodada_id, matches)
+        if is_open:
+            _write(os.path.join(base, RUNNING_SUMMARY_FILE), summary)
+        else:
+            meta["summary_file"] = "summary.json"
+            summary.update({"timestamp_closed": meta["fim"], "meta_snapshot": meta})
+            _write(os.path.join(base, "summary.json"), summary)
+            scores = compute_scores_from_summary(summary, formula=DEFAULT_FORMULA)
+            _write(os.path.join(base, "scores.json"), scores)
+            per_rodada[rodada_id] = scores["scores"]
+        _write(os.path.join(base, "meta.json"), meta)
+
+    for pid, t in merge_totals(per_rodada).items():
+        jogadores[pid].update(t)
+    _write(os.path.join(dest, "database", "jogadores.json"), jogadores)
+
+    for u in range(sizes["users"]):
+        user_id = f"user{u:05d}"
+        email = f"{user_id}@example.com"
+        _write(os.path.join(dest, "users", "perfis", f"{user_id}.json"), {
+            "user_id": user_id, "nome_apresentacao": f"Usuário {u}", "email": email,
+            "criado_em": START.isoformat(), "ultimo_login": None, "roles": ["user"]})
+        _write(os.path.join(dest, "times", "lineups", f"{user_id}.json"), {
+            "user_id": user_id, "time": rng.sample(pids, LINEUP_SIZE), "atualizado_em": START.isoformat()})
+    return sizes
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args:
+        print("uso: python -m benchmarks.generate <destino> [--tier small|medium|large] [--seed N]")
+        sys.exit(2)
+    tier = args[args.index("--tier") + 1] if "--tier" in args else "small"
+    seed = int(args[args.index("--seed") + 1]) if "--seed" in args else 0
+    print(json.dumps(generate(args[0], tier, seed)))
@@ -0,0 +1,242 @@
+# benchmarks/run.py
+"""
+Benchmarks dos caminhos de dados sobre árvores sintéticas (benchmarks.generate).
+
+Cada tier roda em um processo próprio, com o diretório de trabalho apontando
+para uma árvore gerada em um diretório temporário (os caminhos do app são
+relativos), então caches e estado de módulo não vazam entre tiers. Os tempos
+(mediana e mínimo em ms) vão para um JSON e são comparados com o baseline.
+
+    python -m benchmarks.run [--tiers small,medium,large] [--out benchmarks/results/latest.json]
+                             [--baseline benchmarks/baseline.json] [--save-baseline]
+                             [--threshold 1.3] [--fail-on-regression]
+                             [--codec json|json-compact|msgpack]
+
+Com --codec a árvore gerada é convertida para o formato (utils.codec) antes
+das medições, e as escritas feitas durante elas usam o mesmo formato.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import tempfile
+import subprocess
+import statistics
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, "benchmarks")
+DEFAULT_OUT = os.path.join(BENCH_DIR, "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+THRESHOLD = 1.3        # razão atual/baseline acima da qual é regressão
+MIN_DELTA_MS = 0.5     # diferenças absolutas menores que isso são ruído
+MIN_TIME_S = 0.2       # cada caminho roda até somar isso (entre MIN_RUNS e MAX_RUNS vezes)
+MIN_RUNS, MAX_RUNS = 3, 200
+
+
+def _time(fn, setup=None):
+    runs = []
+    total = 0.0
+    while len(runs) < MAX_RUNS and (len(runs) < MIN_RUNS or total < MIN_TIME_S):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        runs.append(dt)
+        total += dt
+    return {"median_ms": round(statistics.median(runs) * 1000, 4),
+            "min_ms": round(min(runs) * 1000, 4), "runs": len(runs)}
+
+
+def check_running_summary(repo, match):
+    """
+    Confere o caminho O(1) do fechamento: partidas salvas pelo repositório
+    mantêm o running summary, e o fechamento o usa ("running") em vez de
+    recalcular. Levanta RuntimeError se não.
+    """
+    from utils.summary import summary_for_close
+    rodada_id = repo.create_rodada("Checagem do resumo corrente")["id"]
+    for _ in range(2):
+        repo.save_match(rodada_id, {k: v for k, v in match.items() if k not in ("id", "rodada_id")})
+    running = repo.get_running_summary(rodada_id)
+    meta = repo.get_meta(rodada_id)
+    _, origem = summary_for_close(rodada_id, meta.get("matches", []), running,
+                                  lambda: repo.list_matches(rodada_id))
+    if origem != "running":
+        raise RuntimeError(f"fechamento recalculou o resumo (origem {origem!r}, running={running is not None})")
+
+
+def check_apply_scores_idempotent(repo, rodada_id):
+    """
+    Somar de novo aos totais os scores de uma rodada já aplicada não muda
+    jogadores (fechamento refeito após conflito, lote interrompido). Levanta
+    RuntimeError se mudar.
+    """
+    from utils import projection
+    scores = repo.get_scores(rodada_id)["scores"]
+    projection.apply_scores(repo, {rodada_id: scores})
+    antes = repo.get_jogadores()
+    projection.apply_scores(repo, {rodada_id: scores})
+    diffs = projection.diff_totals(antes, repo.get_jogadores())
+    if diffs:
+        raise RuntimeError(f"rodada {rodada_id} aplicada duas vezes aos totais: {diffs[:3]}")
+
+
+def bench_tier(tier, seed=0):
+    """Gera a árvore do tier em um diretório temporário e mede cada caminho. Roda no processo do tier."""
+    sys.path.insert(0, ROOT)
+    from benchmarks.generate import generate
+    tmp = tempfile.mkdtemp(prefix=f"bench-{tier}-")
+    sizes = generate(tmp, tier, seed)
+    os.chdir(tmp)  # antes de importar utils: os caminhos dos módulos são relativos
+
+    from utils import cache, codec, fantasy, projection, ranking, perfis
+    from utils import season as season_stats
+    from utils.match_id import next_match_id_for_date
+    from utils.repository import get_repository
+    from utils.summary import summary_from_matches, summary_for_close
+
+    if os.environ.get("FUTEBOL_CODEC"):
+        codec.convert()
+    repo = get_repository("json")
+    rng = random.Random(seed)
+    closed = [r["id"] for r in repo.list_rodadas(status="closed")]
+    open_id = repo.list_rodadas(status="open")[0]["id"]
+    last_closed = closed[-1]
+    jogadores = repo.get_jogadores()
+    scores = repo.get_scores(last_closed)["scores"]
+    lineups = repo.list_lineups()
+    emails = [p["email"] for p in repo.list_perfis().values()]
+    open_meta = repo.get_meta(open_id)
+
+    def drop_email_index():
+        cache.invalidate()
+        if os.path.exists(perfis.EMAIL_INDEX_FILE):
+            os.remove(perfis.EMAIL_INDEX_FILE)
+
+    def reset_season():
+        season_stats._season = None
+
+    paths = {
+        "carregar_jogadores.cold": (repo.get_jogadores, cache.invalidate),
+        "carregar_jogadores.warm": (repo.get_jogadores, None),
+        "top_players": (lambda: ranking.top_k(scores, 3, jogadores), None),
+        "leaderboard": (lambda: ranking.build_leaderboard(jogadores, scores), None),
+        "fechar_rodada.recompute": (lambda: summary_from_matches(open_id, repo.list_matches(open_id)), None),
+        "fechar_rodada.running": (lambda: summary_for_close(
+            open_id, open_meta["matches"], repo.get_running_summary(open_id),
+            lambda: repo.list_matches(open_id)), None),
+        "apply_scores.projection": (lambda: projection.project_totals(repo, workers=1), cache.invalidate),
+        "apply_scores.delta": (lambda: projection.apply_delta(jogadores, last_closed, scores, scores), None),
+        "email_lookup.cold": (lambda: repo.find_perfil_by_email(rng.choice(emails)), drop_email_index),
+        "email_lookup.warm": (lambda: repo.find_perfil_by_email(rng.choice(emails)), None),
+        "fantasy.score_lineups": (lambda: fantasy.score_lineups(lineups, scores), None),
+        "fantasy.suggest_lineup": (lambda: fantasy.suggest_lineup(
+            jogadores, {pid: s["pontos"] for pid, s in scores.items()}), None),
+        "season.build": (lambda: season_stats.get_season(repo), reset_season),
+        # por último: cria arquivos reservados na pasta da rodada aberta
+        "next_match_id": (lambda: next_match_id_for_date(
+            os.path.join("database", "rodadas", open_id, "matches"), open_id[:10]), None),
+    }
+    results = {}
+    try:
+        for name, (fn, setup) in paths.items():
+            results[name] = _time(fn, setup)
+        check_running_summary(repo, repo.list_matches(last_closed)[0])
+        check_apply_scores_idempotent(repo, last_closed)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(tmp, ignore_errors=True)
+    return {"sizes": sizes, "paths": results}
+
+
+def run(tiers, seed=0, codec_format=None):
+    env = dict(os.environ)
+    env.pop("FUTEBOL_CODEC_HOT", None)
+    if codec_format:
+        env["FUTEBOL_CODEC"] = codec_format
+    else:
+        env.pop("FUTEBOL_CODEC", None)
+    out = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": seed,
+            "codec": codec_format or "json",
+        },
+        "tiers": {},
+    }
+    for tier in tiers:
+        # processo novo por tier: caches e estado global começam vazios
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.run", "--worker", tier, "--seed", str(seed)],
+                              cwd=ROOT, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"tier {tier} falhou:\n{proc.stderr}")
+        out["tiers"][tier] = json.loads(proc.stdout.strip().splitlines()[-1])
+    return out
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """[{tier, path, baseline_ms, atual_ms, razao, regressao}] para os caminhos presentes nos dois."""
+    rows = []
+    for tier, data in current["tiers"].items():
+        base_paths = (baseline.get("tiers", {}).get(tier) or {}).get("paths", {})
+        for name, r in data["paths"].items():
+            b = base_paths.get(name)
+            if not b:
+                continue
+            ratio = r["median_ms"] / b["median_ms"] if b["median_ms"] else float("inf")
+            rows.append({"tier": tier, "path": name, "baseline_ms": b["median_ms"], "atual_ms": r["median_ms"],
+                         "razao": round(ratio, 2),
+                         "regressao": ratio > threshold and r["median_ms"] - b["median_ms"] > MIN_DELTA_MS})
+    return rows
+
+
+def _write(path, obj):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    opt = lambda name, default=None: args[args.index(name) + 1] if name in args else default
+    seed = int(opt("--seed", 0))
+    if "--worker" in args:
+        print(json.dumps(bench_tier(opt("--worker"), seed)))
+        sys.exit(0)
+
+    tiers = opt("--tiers", "small,medium").split(",")
+    out_path = opt("--out", DEFAULT_OUT)
+    baseline_path = opt("--baseline", DEFAULT_BASELINE)
+    threshold = float(opt("--threshold", THRESHOLD))
+
+    current = run(tiers, seed, opt("--codec"))
+    _write(out_path, current)
+    for tier, data in current["tiers"].items():
+        print(f"\n[{tier}] {json.dumps(data['sizes'])}")
+        for name, r in data["paths"].items():
+            print(f"  {name:28s} {r['median_ms']:10.3f} ms  (min {r['min_ms']:.3f}, {r['runs']} execuções)")
+    print(f"\nresultados: {out_path}")
+
+    regressions = []
+    if os.path.exists(baseline_path):
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            rows = compare(current, json.load(f), threshold)
+        print(f"\ncomparação com {baseline_path} (limite {threshold}x):")
+        for row in rows:
+            flag = "  REGRESSÃO" if row["regressao"] else ""
+            print(f"  [{row['tier']}] {row['path']:28s} {row['baseline_ms']:10.3f} -> {row['atual_ms']:10.3f} ms"
+                  f"  {row['razao']:.2f}x{flag}")
+        regressions = [r for r in rows if r["regressao"]]
+    if "--save-baseline" in args:
+        _write(baseline_path, current)
+        print(f"baseline gravado em {baseline_path}")
+    if regressions and "--fail-on-regression" in args:
+        sys.exit(1)
@@ -1,59 +1,53 @@
 import streamlit as st
-import json
 import os
 import re
 import uuid
 import io
 from PIL import Image
-import base64
-import requests
-import tempfile
-import shutil
-import glob
-from datetime import datetime, timezone
-from utils.scores import generate_and_apply_scores
+from utils import codec, metrics, projection, rodada_service, snapshots, storage
+from utils.repository import get_repository
+from utils.github_sync import load_config, is_configured
+from utils import outbox
+from utils.images import generate_derivatives, remove_derivatives, pick_image
+from utils.rodadas import rebuild_catalog
 
 # =========================
 # CONFIGURAÇÃO DA PÁGINA
 # =========================
 st.set_page_config(page_title="Admin - Futebol de Terça", page_icon="⚽")
+metrics.begin_rerun("admin")
 
 PASSWORD = st.secrets["ADMIN_PASSWORD"]
 
 JOGADORES_FILE = "database/jogadores.json"
+SNAPSHOT_KEEP_LAST = int(st.secrets.get("SNAPSHOT_KEEP_LAST", snapshots.KEEP_LAST))
 IMAGENS_DIR = "imagens/jogadores"
 os.makedirs("database", exist_ok=True)
 os.makedirs(IMAGENS_DIR, exist_ok=True)
 
+# backend de dados: "json" (padrão, arquivos do repositório) ou "sqlite"
+REPO = get_repository(st.secrets.get("STORAGE_BACKEND"), st.secrets.get("SQLITE_PATH"))
+
 # =========================
 # GITHUB CONFIG (opcional)
 # =========================
-GITHUB_USER = st.secrets.get("GITHUB_USER", "")
-GITHUB_REPO = st.secrets.get("GITHUB_REPO", "")
-GITHUB_TOKEN = st.secrets.get("GITHUB_TOKEN", "")
-GITHUB_BRANCH = st.secrets.get("GITHUB_BRANCH", "main")
+GITHUB_CONFIG = load_config(st.secrets)
+# com o backend SQLite os dados não são arquivos do repositório: não há o que sincronizar
+GITHUB_ENABLED = is_configured(GITHUB_CONFIG) and REPO.syncs_files
+if REPO.syncs_files:
+    outbox.start_worker(GITHUB_CONFIG)
 
 def github_upload(path_local, repo_path, message):
-    """Envia arquivo local ao GitHub (opcional). Retorna (ok, msg)."""
-    if not GITHUB_USER or not GITHUB_REPO or not GITHUB_TOKEN:
+    """Enfileira o envio de um arquivo local ao GitHub (opcional). Retorna (ok, msg)."""
+    return github_commit([(path_local, repo_path)], message)
+
+def github_commit(files, message):
+    """Enfileira vários arquivos [(path_local, repo_path), ...]; o worker os envia em um commit. Retorna (ok, msg)."""
+    if not GITHUB_ENABLED:
         return False, "GitHub não configurado"
-    try:
-        headers = {"Authorization": f"Bearer {GITHUB_TOKEN}"}
-        url = f"https://api.github.com/repos/{GITHUB_USER}/{GITHUB_REPO}/contents/{repo_path}"
-        with open(path_local, "rb") as f:
-            content_b64 = base64.b64encode(f.read()).decode()
-        get_file = requests.get(url, headers=headers, params={"ref": GITHUB_BRANCH})
-        sha = get_file.json().get("sha") if get_file.status_code == 200 else None
-        payload = {"message": message, "content": content_b64, "branch": GITHUB_BRANCH}
-        if sha:
-            payload["sha"] = sha
-        resp = requests.put(url, headers=headers, json=payload)
-        if resp.status_code in (200, 201):
-            return True, f"ok ({resp.status_code})"
-        else:
-            return False, f"erro ({resp.status_code}): {resp.text}"
-    except Exception as e:
-        return False, f"erro: {e}"
+    with metrics.span("github.enqueue"):
+        outbox.enqueue_many(files, message)
+    return True, "enfileirado"
 
 # =========================
 # UTILITÁRIOS
@@ -75,31 +69,19 @@ def resize_image_bytes(uploaded_file_bytes: bytes, max_size=(800, 800), quality=
     return out.read()
 
 def carregar_jogadores():
-    if not os.path.exists(JOGADORES_FILE):
-        return {}
-    with open(JOGADORES_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def salvar_jogadores(jogadores_dict):
-    with open(JOGADORES_FILE, "w", encoding="utf-8") as f:
-        json.dump(jogadores_dict, f, indent=2, ensure_ascii=False)
-
-def _write_atomic(path, data_bytes):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
-    os.close(fd)
-    with open(tmp, "wb") as f:
-        f.write(data_bytes)
-        f.flush()
-        os.fsync(f.fileno())
-    os.replace(tmp, path)
-
-def _load_json(path):
+    # objeto compartilhado (cache): não mutar; alterações passam por salvar_jogadores
+    return REPO.get_jogadores()
+
+def salvar_jogadores(alterar):
+    """
+    Grava uma alteração em jogadores.json com compare-and-swap: alterar(jogadores)
+    muda a cópia atual e, se outra sessão gravou no meio, é reaplicada sobre a nova.
+    """
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return None
+        return REPO.update_jogadores(alterar)
+    except storage.VersionConflict:
+        st.error("jogadores.json está sendo alterado por outras sessões; tente de novo.")
+        st.stop()
 
 # =========================
 # REQUISITO: estar logado como admin (global)
@@ -129,6 +111,7 @@ if not st.session_state.auth:
 # =========================
 # INTERFACE - Cadastro de jogadores
 # =========================
+metrics.section("jogadores")
 st.title("⚽ Cadastro de Jogadores")
 
 nome = st.text_input("Nome do jogador")
@@ -150,21 +133,23 @@ if st.button("Cadastrar jogador"):
 
     with open(img_path, "wb") as f:
         f.write(processed_bytes)
+    miniaturas = generate_derivatives(img_path)
 
-    jogadores_dict = carregar_jogadores()
     player_id = f"{slugify(nome)}-{uuid.uuid4().hex[:8]}"
     novo_jogador = {
         "nome": nome,
         "valor": 10,
         "gols": 0,
         "assistencias": 0,
-        "imagem": img_path
+        "imagem": img_path,
+        "miniaturas": miniaturas
     }
-    jogadores_dict[player_id] = novo_jogador
-    salvar_jogadores(jogadores_dict)
+    salvar_jogadores(lambda jogadores: jogadores.update({player_id: novo_jogador}))
 
-    github_upload(img_path, f"{IMAGENS_DIR}/{img_filename}", f"Adiciona imagem do jogador {nome}")
-    github_upload(JOGADORES_FILE, JOGADORES_FILE, f"Atualiza jogadores.json com {nome}")
+    arquivos = [(img_path, f"{IMAGENS_DIR}/{img_filename}"), (JOGADORES_FILE, JOGADORES_FILE)]
+    for entry in miniaturas.values():
+        arquivos.extend((thumb_path, thumb_path) for thumb_path in entry.values())
+    github_commit(arquivos, f"Adiciona jogador {nome}")
 
     st.success("✅ Jogador cadastrado!")
     st.rerun()
@@ -183,81 +168,45 @@ else:
     for player_id, j in sorted_items:
         col1, col2, col3 = st.columns([1, 3, 1])
         with col1:
-            if os.path.exists(j["imagem"]):
-                st.image(j["imagem"], width=80)
+            img_80 = pick_image(j, 80)
+            if img_80 and os.path.exists(img_80):
+                st.image(img_80, width=80)
         with col2:
             st.write(f"**{j.get('nome', '—')}**")
             st.write(f"Gols: {j.get('gols', 0)} | Assistências: {j.get('assistencias', 0)}")
             st.caption(f"ID: {player_id}")
         with col3:
             if st.button("🗑️ Excluir", key=f"del-{player_id}"):
-                jogadores_dict.pop(player_id)
-                salvar_jogadores(jogadores_dict)
+                salvar_jogadores(lambda jogadores: jogadores.pop(player_id, None))
                 try:
                     os.remove(j["imagem"])
                 except Exception:
                     pass
-                github_upload(JOGADORES_FILE, JOGADORES_FILE, f"Remove jogador {j['nome']}")
+                remove_derivatives(j.get("miniaturas"))
+                github_commit([(JOGADORES_FILE, JOGADORES_FILE)], f"Remove jogador {j['nome']}")
                 st.success(f"Jogador {j['nome']} excluído!")
                 st.rerun()
 
 # ------------------------
 # Iniciar rodada (Admin)
 # ------------------------
-def next_rodada_id_for_date(base_dir, date_str, prefix="rodada", pad=2, max_attempts=1000):
-    os.makedirs(base_dir, exist_ok=True)
-    for n in range(1, max_attempts + 1):
-        seq = str(n).zfill(pad)
-        rodada_id = f"{date_str}-{prefix}-{seq}"
-        path = os.path.join(base_dir, rodada_id)
-        try:
-            # tentativa atômica de criar a pasta; falha se já existir
-            os.mkdir(path)
-            # pasta criada com sucesso; devolve id
-            return rodada_id
-        except FileExistsError:
-            continue
-    raise RuntimeError("Não foi possível gerar rodada_id único após muitas tentativas")
-
-def create_rodada(base_dir, nome, admin_user=None, github_upload_enabled=False):
-    date_str = datetime.now().strftime("%Y-%m-%d")
-    rodada_id = next_rodada_id_for_date(base_dir, date_str)
-    rodada_dir = os.path.join(base_dir, rodada_id)
-    matches_dir = os.path.join(rodada_dir, "matches")
-    os.makedirs(matches_dir, exist_ok=True)
-
-    meta = {
-        "id": rodada_id,
-        "nome": nome or f"Rodada {date_str}",
-        "admin": admin_user or "",
-        "inicio": datetime.now(timezone.utc).isoformat(),
-        "fim": None,
-        "status": "open",
-        "matches": [],
-        "match_count": 0
-    }
-
-    meta_path = os.path.join(rodada_dir, "meta.json")
-    try:
-        _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"))
-    except Exception as e:
-        return False, None, f"Falha ao gravar meta.json: {e}"
-
+def create_rodada(nome, admin_user=None, github_upload_enabled=False):
+    ok, rodada_id, msg, arquivos = rodada_service.create_rodada(REPO, nome, admin_user=admin_user)
     # opcional: upload para GitHub (não bloqueante)
-    if github_upload_enabled and GITHUB_USER and GITHUB_REPO and GITHUB_TOKEN:
+    if ok and github_upload_enabled and GITHUB_ENABLED:
         try:
-            github_upload(meta_path, f"database/rodadas/{rodada_id}/meta.json", f"Cria rodada {rodada_id}")
+            github_commit(arquivos, f"Cria rodada {rodada_id}")
         except Exception:
             pass
-
-    return True, rodada_id, "Rodada criada com sucesso"
+    return ok, rodada_id, msg
 
 # UI para iniciar rodada
 st.markdown("---")
+metrics.section("rodadas")
 st.subheader("🟢 Iniciar nova rodada")
 rodada_nome = st.text_input("Nome da rodada (opcional)", value="")
 admin_user = st.session_state.get("user_id") or st.session_state.get("perfil") or "admin"
-github_enabled = bool(GITHUB_USER and GITHUB_REPO and GITHUB_TOKEN)
+github_enabled = GITHUB_ENABLED
 
 if "creating_rodada" not in st.session_state:
     st.session_state.creating_rodada = False
@@ -265,14 +214,13 @@ if "creating_rodada" not in st.session_state:
 if st.button("Iniciar rodada", disabled=st.session_state.creating_rodada):
     st.session_state.creating_rodada = True
     try:
-        ok, rodada_id, msg = create_rodada(os.path.join("database", "rodadas"), rodada_nome, admin_user=admin_user, github_upload_enabled=github_enabled)
+        ok, rodada_id, msg = create_rodada(rodada_nome, admin_user=admin_user, github_upload_enabled=github_enabled)
         if ok:
             st.success(f"Rodada iniciada: **{rodada_id}**")
             st.info(msg)
             # verificação rápida pós-criação
-            meta_path = os.path.join("database", "rodadas", rodada_id, "meta.json")
             try:
-                meta_check = _load_json(meta_path)
+                meta_check = REPO.get_meta(rodada_id)
                 if meta_check and meta_check.get("matches"):
                     st.warning("Atenção: meta.matches não está vazio após criação (investigar).")
             except Exception:
@@ -285,239 +233,48 @@ if st.button("Iniciar rodada", disabled=st.session_state.creating_rodada):
 
 # Lista rápida de rodadas abertas (informativa)
 st.markdown("Rodadas abertas")
-rodadas_base = os.path.join("database", "rodadas")
-if os.path.exists(rodadas_base):
-    rows = []
-    for name in sorted(os.listdir(rodadas_base)):
-        meta_path = os.path.join(rodadas_base, name, "meta.json")
-        if os.path.exists(meta_path):
-            try:
-                with open(meta_path, "r", encoding="utf-8") as f:
-                    meta = json.load(f)
-                if meta.get("status") == "open":
-                    rows.append((name, meta.get("nome"), meta.get("inicio"), len(meta.get("matches", []))))
-            except Exception:
-                continue
-    if not rows:
-        st.write("Nenhuma rodada aberta")
-    else:
-        for r in rows:
-            st.write(f"- **{r[0]}** — {r[1]} — início: {r[2]} — partidas: {r[3]}")
+rows = REPO.list_rodadas(status="open")
+if not rows:
+    st.write("Nenhuma rodada aberta")
 else:
-    st.write("Nenhuma rodada encontrada")
+    for r in rows:
+        st.write(f"- **{r['id']}** — {r.get('nome')} — início: {r.get('inicio')} — partidas: {r.get('match_count', 0)}")
+if REPO.backend == "json" and st.button("Reconstruir catálogo de rodadas"):
+    rebuild_catalog()
+    st.rerun()
 
 # ------------------------
 # Fechar rodada (Admin)
 # ------------------------
-def fechar_rodada(rodada_id, fazer_backup_jogadores=True, github_upload_enabled=False):
-    base = os.path.join("database", "rodadas", rodada_id)
-    meta_path = os.path.join(base, "meta.json")
-    matches_dir = os.path.join(base, "matches")
-    summary_path = os.path.join(base, "summary.json")
-
-    # valida meta
-    meta = _load_json(meta_path)
-    if not meta:
-        return False, "meta.json não encontrado ou inválido"
-    if meta.get("status") != "open":
-        return False, f"Rodada já está com status '{meta.get('status')}'"
-
-    # lista arquivos de partida
-    match_files = sorted(glob.glob(os.path.join(matches_dir, "*.json")))
-    if not match_files:
-        return False, "Nenhuma partida encontrada para agregar"
-
-    # agregadores
-    resumo_por_jogador = {}
-    placar_por_partida = {}
-    matches_list = []
-
-    for mf in match_files:
-        m = _load_json(mf)
-        if not m:
-            # pula arquivos inválidos
-            continue
-        match_id = m.get("id") or os.path.splitext(os.path.basename(mf))[0]
-        matches_list.append(match_id)
-        placar_por_partida[match_id] = m.get("score", {"team1":0,"team2":0})
-
-        # determina vencedor da partida
-        s = m.get("score", {"team1":0,"team2":0})
-        if s.get("team1",0) > s.get("team2",0):
-            vencedor_match = "team1"
-        elif s.get("team2",0) > s.get("team1",0):
-            vencedor_match = "team2"
-        else:
-            vencedor_match = "empate"
-
-        # resumo por eventos (gols/assist)
-        events = m.get("events", [])
-        for ev in events:
-            if ev.get("type") == "gol" and ev.get("scorer"):
-                pid = ev["scorer"]
-                resumo_por_jogador.setdefault(pid, {"gols":0,"assistencias":0,"vitorias":0})
-                resumo_por_jogador[pid]["gols"] += 1
-            if ev.get("type") == "assist" and ev.get("assister"):
-                pid = ev["assister"]
-                resumo_por_jogador.setdefault(pid, {"gols":0,"assistencias":0,"vitorias":0})
-                resumo_por_jogador[pid]["assistencias"] += 1
-
-        # vitorias por jogador: incrementa para jogadores atribuídos ao time vencedor
-        if vencedor_match in ("team1","team2"):
-            team_assign = m.get("team_assign", {})
-            winning_team_num = 1 if vencedor_match == "team1" else 2
-            for pid, team in team_assign.items():
-                if team == winning_team_num:
-                    resumo_por_jogador.setdefault(pid, {"gols":0,"assistencias":0,"vitorias":0})
-                    resumo_por_jogador[pid]["vitorias"] = resumo_por_jogador[pid].get("vitorias",0) + 1
-
-    # monta summary
-    summary = {
-        "rodada_id": rodada_id,
-        "timestamp_closed": datetime.now(timezone.utc).isoformat(),
-        "matches": matches_list,
-        "placar_por_partida": placar_por_partida,
-        "resumo_por_jogador": resumo_por_jogador,
-        "meta_snapshot": meta
-    }
-
-    # grava summary atômico
-    try:
-        _write_atomic(summary_path, json.dumps(summary, ensure_ascii=False, indent=2).encode("utf-8"))
-    except Exception as e:
-        return False, f"Falha ao gravar summary.json: {e}"
-
-        # gera scores.json e aplica em jogadores.json (idempotente)
-    try:
-        github_fn = (lambda p, rp, m: github_upload(p, rp, m)) if (github_upload_enabled and GITHUB_USER and GITHUB_REPO and GITHUB_TOKEN) else None
-        res_scores = generate_and_apply_scores(base, summary, formula={"gol":8,"assist":4,"vitoria":4}, jogadores_path=JOGADORES_FILE, github_upload_fn=github_fn)
-        # opcional: mostrar resultado no admin
-        # st.info(f"Scores aplicados: {res_scores['applied']} | pulados: {res_scores['skipped']}")
-    except Exception as e:
-        return False, f"Falha ao gerar/aplicar scores.json: {e}"
-
-    # backup jogadores.json
-    if fazer_backup_jogadores and os.path.exists(JOGADORES_FILE):
-        try:
-            ts = datetime.now().strftime("%Y%m%dT%H%M%S")
-            shutil.copy(JOGADORES_FILE, f"{JOGADORES_FILE}.bak-{ts}")
-        except Exception as e:
-            return False, f"Falha ao criar backup de jogadores.json: {e}"
-
-    # atualiza jogadores.json incrementalmente
-    try:
-        jogadores_on_disk = {}
-        if os.path.exists(JOGADORES_FILE):
-            with open(JOGADORES_FILE, "r", encoding="utf-8") as f:
-                jogadores_on_disk = json.load(f)
-
-        # aplica incrementos
-        for pid, vals in resumo_por_jogador.items():
-            if pid not in jogadores_on_disk:
-                jogadores_on_disk[pid] = {
-                    "nome": pid,
-                    "valor": 0,
-                    "gols": 0,
-                    "assistencias": 0,
-                    "imagem": "",
-                    "vitorias": 0
-                }
-            jogadores_on_disk[pid]["gols"] = jogadores_on_disk[pid].get("gols",0) + vals.get("gols",0)
-            jogadores_on_disk[pid]["assistencias"] = jogadores_on_disk[pid].get("assistencias",0) + vals.get("assistencias",0)
-            jogadores_on_disk[pid]["vitorias"] = jogadores_on_disk[pid].get("vitorias",0) + vals.get("vitorias",0)
-
-        # grava atômico jogadores.json
-        _write_atomic(JOGADORES_FILE, json.dumps(jogadores_on_disk, ensure_ascii=False, indent=2).encode("utf-8"))
-    except Exception as e:
-        return False, f"Falha ao atualizar jogadores.json: {e}"
-
-    # atualiza meta.json somente após sucesso completo, com verificação
-    try:
-        meta["fim"] = datetime.now(timezone.utc).isoformat()
-        meta["status"] = "closed"
-        meta["summary_file"] = os.path.basename(summary_path)
-        meta["match_count"] = len(matches_list)
-        _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"))
-
-        # leitura de verificação imediata
-        verified = False
-        for attempt in range(3):
-            try:
-                with open(meta_path, "r", encoding="utf-8") as f:
-                    meta_check = json.load(f)
-                if meta_check.get("status") == "closed" and meta_check.get("fim"):
-                    verified = True
-                    break
-            except Exception:
-                pass
-            import time as _time
-            _time.sleep(0.1)
-
-        if not verified:
-            # tenta uma segunda escrita antes de falhar
-            try:
-                _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"))
-            except Exception as e:
-                meta["status"] = "error"
-                meta["error_message"] = f"Falha ao gravar meta.json: {e}"
-                try:
-                    _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"))
-                except Exception:
-                    pass
-                return False, f"Falha ao confirmar gravação de meta.json: {e}"
-            # última verificação
-            try:
-                with open(meta_path, "r", encoding="utf-8") as f:
-                    meta_check = json.load(f)
-                if meta_check.get("status") != "closed":
-                    return False, "Gravado meta.json, mas verificação final falhou (status diferente de closed)."
-            except Exception as e:
-                return False, f"Gravado meta.json, mas não foi possível ler para verificação: {e}"
-
-    except Exception as e:
-        try:
-            meta["status"] = "error"
-            meta["error_message"] = str(e)
-            _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"))
-        except Exception:
-            pass
-        return False, f"Erro ao fechar rodada (atualizando meta.json): {e}"
+def fechar_rodada(rodada_id, fazer_backup_jogadores=True, github_upload_enabled=False, recalcular=False):
+    ok, msg, arquivos, _ = rodada_service.close_rodada(
+        REPO, rodada_id, backup=fazer_backup_jogadores, recalcular=recalcular, snapshot_keep_last=SNAPSHOT_KEEP_LAST)
+    if not ok:
+        return False, msg
 
     # upload GitHub opcional
-    if github_upload_enabled and GITHUB_USER and GITHUB_REPO and GITHUB_TOKEN:
+    if github_upload_enabled and GITHUB_ENABLED:
         try:
-            ok1, out1 = github_upload(summary_path, f"database/rodadas/{rodada_id}/summary.json", f"Adiciona summary da rodada {rodada_id}")
-            ok2, out2 = github_upload(meta_path, f"database/rodadas/{rodada_id}/meta.json", f"Fecha rodada {rodada_id}")
-            ok3, out3 = github_upload(JOGADORES_FILE, JOGADORES_FILE, f"Atualiza jogadores após fechamento de {rodada_id}")
-            if not ok1 or not ok2 or not ok3:
-                return True, f"Rodada fechada localmente; upload parcial: {out1}; {out2}; {out3}"
+            ok, out = github_commit(arquivos, f"Fecha rodada {rodada_id}")
+            if not ok:
+                return True, f"Rodada fechada localmente; falha ao enfileirar upload: {out}"
         except Exception as e:
             return True, f"Rodada fechada localmente; erro no upload GitHub: {e}"
 
-    return True, "Rodada fechada com sucesso"
+    return True, msg
 
 # UI: botão para fechar rodada
 st.markdown("---")
+metrics.section("fechar_rodada")
 st.subheader("🔴 Fechar rodada")
-rodadas_base = os.path.join("database", "rodadas")
-open_rodadas = []
-if os.path.exists(rodadas_base):
-    for name in sorted(os.listdir(rodadas_base)):
-        mp = os.path.join(rodadas_base, name, "meta.json")
-        if os.path.exists(mp):
-            try:
-                with open(mp, "r", encoding="utf-8") as f:
-                    m = json.load(f)
-                if m.get("status") == "open":
-                    open_rodadas.append(name)
-            except Exception:
-                continue
+open_rodadas = [r["id"] for r in REPO.list_rodadas(status="open")]
 
 if not open_rodadas:
     st.info("Nenhuma rodada aberta para fechar.")
 else:
     rodada_to_close = st.selectbox("Selecionar rodada para fechar", options=open_rodadas)
-    github_enabled = bool(GITHUB_USER and GITHUB_REPO and GITHUB_TOKEN)
+    recalcular = st.checkbox("Recalcular resumo a partir das partidas (verificação)", value=False)
+    github_enabled = GITHUB_ENABLED
 
     if "closing_rodada" not in st.session_state:
         st.session_state.closing_rodada = False
@@ -525,7 +282,7 @@ else:
     if st.button("Fechar rodada selecionada", disabled=st.session_state.closing_rodada):
         st.session_state.closing_rodada = True
         try:
-            ok, msg = fechar_rodada(rodada_to_close, fazer_backup_jogadores=True, github_upload_enabled=github_enabled)
+            ok, msg = fechar_rodada(rodada_to_close, fazer_backup_jogadores=True, github_upload_enabled=github_enabled, recalcular=recalcular)
             if ok:
                 st.success(msg)
             else:
@@ -534,3 +291,101 @@ else:
             st.session_state.closing_rodada = False
             st.rerun()
 
+# ------------------------
+# Fila de uploads para o GitHub (Admin)
+# ------------------------
+st.markdown("---")
+metrics.section("github")
+st.subheader("☁️ Sincronização com o GitHub")
+if not GITHUB_ENABLED:
+    st.info("GitHub não configurado.")
+else:
+    fila = outbox.status()
+    c1, c2 = st.columns(2)
+    c1.metric("Pendentes", len(fila["pending"]))
+    c2.metric("Com falha", len(fila["failed"]))
+    for it in fila["pending"]:
+        st.write(f"- ⏳ `{it['repo_path']}` — {it['message']} — tentativas: {it.get('attempts', 0)}")
+    for it in fila["failed"]:
+        st.write(f"- ❌ `{it['repo_path']}` — {it['message']} — erro: {it.get('last_error')}")
+    if fila["failed"] and st.button("Reenviar itens com falha"):
+        outbox.retry_failed()
+        st.rerun()
+
+# ------------------------
+# Totais dos jogadores (projeção a partir das partidas)
+# ------------------------
+st.markdown("---")
+metrics.section("totais")
+st.subheader("🧮 Totais dos jogadores")
+st.caption("Gols, assistências, vitórias e pontos são recalculados a partir dos arquivos de partida de todas as rodadas fechadas.")
+c1, c2 = st.columns(2)
+if c1.button("Verificar totais"):
+    diffs = projection.verify(REPO)
+    if diffs:
+        st.warning(f"{len(diffs)} diferença(s) entre jogadores.json e as partidas.")
+        st.dataframe([{**d, "atual": str(d["atual"]), "projetado": str(d["projetado"])} for d in diffs], hide_index=True)
+    else:
+        st.success("Totais conferem com as partidas.")
+if c2.button("Reconstruir totais"):
+    try:
+        snapshots.snapshot_bytes(storage.dumps_json(REPO.get_jogadores()), "reconstruir_totais")
+        diffs = projection.rebuild(REPO)
+    except Exception as e:
+        st.error(f"Falha ao reconstruir totais: {e}")
+    else:
+        if diffs and GITHUB_ENABLED:
+            github_commit([(JOGADORES_FILE, JOGADORES_FILE)], "Reconstrói totais dos jogadores a partir das partidas")
+        st.success(f"Totais reconstruídos ({len(diffs)} alteração(ões)).")
+
+# ------------------------
+# Backups de jogadores (snapshots)
+# ------------------------
+st.markdown("---")
+metrics.section("backups")
+st.subheader("🗄️ Backups de jogadores")
+lista_snapshots = snapshots.list_snapshots()
+if not lista_snapshots:
+    st.info("Nenhum backup registrado.")
+else:
+    labels = {e["id"]: f"{e['timestamp'][:19]} — {e['reason']}" + (f" — {e['rodada_id']}" if e.get("rodada_id") else "") for e in lista_snapshots}
+    snap_id = st.selectbox("Backup", options=list(labels), format_func=labels.get)
+    st.caption(f"{len(lista_snapshots)} backup(s) — {len({e['blob'] for e in lista_snapshots})} conteúdo(s) distinto(s)")
+    if st.button("Restaurar backup selecionado"):
+        try:
+            # o estado atual também vira snapshot antes de ser substituído
+            snapshots.snapshot_bytes(storage.dumps_json(REPO.get_jogadores()), "antes_de_restaurar")
+            REPO.save_jogadores(codec.loads(snapshots.load(snap_id)))
+        except Exception as e:
+            st.error(f"Falha ao restaurar: {e}")
+        else:
+            if GITHUB_ENABLED:
+                github_commit([(JOGADORES_FILE, JOGADORES_FILE)], f"Restaura jogadores do backup {snap_id}")
+            st.success(f"Backup {snap_id} restaurado.")
+            st.rerun()
+
+# ------------------------
+# Desempenho (tempos por rerun gravados por utils.metrics)
+# ------------------------
+metrics.section("desempenho")
+st.markdown("---")
+st.subheader("⏱️ Desempenho")
+resumo_metricas = metrics.summarize(metrics.load_records())
+if not resumo_metricas["pages"]:
+    st.info("Nenhuma execução registrada ainda." + ("" if metrics.ENABLED else " (FUTEBOL_METRICS=0)"))
+else:
+    st.caption("Tempo por execução de cada página (ms), nas últimas execuções registradas.")
+    st.dataframe(resumo_metricas["pages"], hide_index=True, use_container_width=True)
+    pagina_metricas = st.selectbox("Página", options=[p["page"] for p in resumo_metricas["pages"]])
+    st.caption("Trechos mais lentos (p95 em ms; chamadas somadas por execução).")
+    st.dataframe(resumo_metricas["spans"].get(pagina_metricas, [])[:30], hide_index=True, use_container_width=True)
+    if st.button("Perfilar próxima execução"):
+        metrics.request_profile(pagina_metricas)
+        st.success(f"A próxima execução de '{pagina_metricas}' será perfilada (cProfile).")
+perfis_cprofile = metrics.list_profiles()
+if perfis_cprofile:
+    with st.expander(f"Último perfil — {os.path.basename(perfis_cprofile[0])}"):
+        with open(perfis_cprofile[0], "r", encoding="utf-8") as f:
+            st.code(f.read())
+
+metrics.end_rerun()
@@ -1,5 +1,17 @@
 import streamlit as st
-from utils.storage import carregar_lineup, salvar_lineup
+
+from utils.repository import get_repository
+from utils import fantasy, metrics
+from utils import season as season_stats
+
+metrics.begin_rerun("fantasy")
+
+# backend de dados: "json" (padrão, arquivos do repositório) ou "sqlite"
+REPO = get_repository(st.secrets.get("STORAGE_BACKEND"), st.secrets.get("SQLITE_PATH"))
+
+# regras do fantasy (secrets FANTASY_BUDGET / FANTASY_SQUAD_SIZE)
+BUDGET = int(st.secrets.get("FANTASY_BUDGET", fantasy.BUDGET))
+SQUAD_SIZE = int(st.secrets.get("FANTASY_SQUAD_SIZE", fantasy.SQUAD_SIZE))
 
 # proteção: só continua se estiver logado
 if not st.session_state.get("logged_in"):
@@ -12,18 +24,80 @@ if not user_id:
     st.stop()
 
 # carregar lineup do usuário autenticado
-lineup = carregar_lineup(user_id)
+metrics.section("time")
+lineup = REPO.get_lineup(user_id)
+# objeto compartilhado (cache): não mutar
+jogadores = REPO.get_jogadores() or {}
+projecao = fantasy.projected_points(season_stats.get_season(REPO), jogadores)
 
 st.title(f"Montar Time — {st.session_state.get('perfil', {}).get('nome_apresentacao', user_id)}")
+st.caption(f"Orçamento: {BUDGET} · {SQUAD_SIZE} jogadores · pontos projetados = média de pontos por rodada")
+
+# seleção (chave de sessão própria, para o botão de sugestão poder preenchê-la)
+if "fantasy_time" not in st.session_state:
+    st.session_state.fantasy_time = [pid for pid in lineup.get("time", []) if pid in jogadores]
+
+if st.button("Sugerir melhor time"):
+    sugestao, pontos = fantasy.suggest_lineup(jogadores, projecao, BUDGET, SQUAD_SIZE)
+    if sugestao is None:
+        st.warning("Não existe time viável com esse orçamento e tamanho.")
+    else:
+        st.session_state.fantasy_time = sugestao
+        st.success(f"Sugestão: {pontos:.1f} pontos projetados.")
 
-# UI para editar lineup (exemplo simplificado)
-# ... sua lógica de seleção de jogadores aqui ...
-# suponha que `novo_lineup` seja o dicionário final a salvar
+def _label(pid):
+    j = jogadores.get(pid, {})
+    return f"{j.get('nome', pid)} — valor {fantasy.player_cost(j)} · proj. {projecao.get(pid, 0.0):.1f}"
 
-if st.button("Salvar Time"):
-    # validações adicionais (ex.: número de jogadores, posições)
+time_sel = st.multiselect(
+    "Jogadores",
+    options=sorted(jogadores, key=lambda p: jogadores[p].get("nome", p)),
+    format_func=_label,
+    key="fantasy_time",
+    max_selections=SQUAD_SIZE,
+)
+
+custo = fantasy.lineup_cost(time_sel, jogadores)
+c1, c2, c3 = st.columns(3)
+c1.metric("Custo", f"{custo} / {BUDGET}", delta=BUDGET - custo)
+c2.metric("Jogadores", f"{len(time_sel)} / {SQUAD_SIZE}")
+c3.metric("Pontos projetados", f"{sum(projecao.get(p, 0.0) for p in time_sel):.1f}")
+
+erros = fantasy.validate_lineup(time_sel, jogadores, BUDGET, SQUAD_SIZE)
+for e in erros:
+    st.caption(f"⚠️ {e}")
+
+if st.button("Salvar Time", disabled=bool(erros)):
+    novo_lineup = {"time": list(time_sel), "custo": custo, "orcamento": BUDGET}
     try:
-        salvar_lineup(user_id, novo_lineup)
+        REPO.save_lineup(user_id, novo_lineup)
         st.success("Time salvo com sucesso.")
     except Exception as e:
-        st.error("Erro ao salvar o time.")
+        st.error(f"Erro ao salvar o time: {e}")
+
+# ------------------------
+# Pontuação e ranking dos usuários (gravados no fechamento de cada rodada)
+# ------------------------
+st.markdown("---")
+metrics.section("ranking")
+st.subheader("🏆 Ranking do fantasy")
+leaderboard = REPO.get_fantasy_leaderboard() or {}
+usuarios = leaderboard.get("usuarios") or {}
+if not usuarios:
+    st.info("Nenhuma rodada pontuada ainda.")
+else:
+    ranking = list(usuarios.items())
+    posicao = next((k for k, (uid, _) in enumerate(ranking, 1) if uid == user_id), None)
+    meu = usuarios.get(user_id) or {}
+    c1, c2 = st.columns(2)
+    c1.metric("Sua posição", f"{posicao}º de {len(ranking)}" if posicao else "—")
+    c2.metric("Seus pontos", meu.get("pontos_total", 0))
+    ultima = leaderboard.get("rodadas", [])[-1:] or [None]
+    st.dataframe([{
+        "#": k,
+        "usuário": uid,
+        "pontos": rec.get("pontos_total", 0),
+        "última rodada": rec.get("pontos_por_rodada", {}).get(ultima[0], 0),
+    } for k, (uid, rec) in enumerate(ranking[:50], 1)], hide_index=True, use_container_width=True)
+
+metrics.end_rerun()
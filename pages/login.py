@@ -1,15 +1,21 @@
 import streamlit as st
 import os
-import json
 from datetime import datetime
 import time
 
+from utils import metrics
+from utils.repository import get_repository
+
 st.set_page_config(page_title="Login - Fantasy Futebol", layout="wide")
+metrics.begin_rerun("login")
 
 # Diretório de perfis
 PERFIS_DIR = "users/perfis"
 os.makedirs(PERFIS_DIR, exist_ok=True)
 
+# backend de dados: "json" (padrão, arquivos do repositório) ou "sqlite"
+REPO = get_repository(st.secrets.get("STORAGE_BACKEND"), st.secrets.get("SQLITE_PATH"))
+
 # Configurações administrativas (defina em secrets.toml)
 ADMIN_PASSWORD = st.secrets.get("ADMIN_PASSWORD")
 ADMIN_USER_ID = st.secrets.get("ADMIN_USER_ID", "admin")
@@ -21,46 +27,16 @@ SCOUT_USER_ID = st.secrets.get("SCOUT_USER_ID", "olheiro")
 # -----------------------
 # Utilitários de perfil
 # -----------------------
-def listar_perfis():
-    perfis = {}
-    if not os.path.exists(PERFIS_DIR):
-        return perfis
-    for fname in os.listdir(PERFIS_DIR):
-        if not fname.lower().endswith(".json"):
-            continue
-        path = os.path.join(PERFIS_DIR, fname)
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                uid = data.get("user_id") or fname[:-5]
-                perfis[uid] = data
-        except Exception:
-            continue
-    return perfis
-
+@metrics.timed("login.encontrar_userid_por_email")
 def encontrar_userid_por_email(email: str):
-    perfis = listar_perfis()
-    email_norm = (email or "").strip().lower()
-    for uid, perfil in perfis.items():
-        if (perfil.get("email") or "").strip().lower() == email_norm:
-            return uid, perfil
-    return None, None
+    return REPO.find_perfil_by_email(email)
 
 def carregar_perfil(user_id: str):
-    path = os.path.join(PERFIS_DIR, f"{user_id}.json")
-    if not os.path.exists(path):
-        return None
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return None
+    return REPO.get_perfil(user_id)
 
 def salvar_perfil(user_id: str, perfil: dict):
-    path = os.path.join(PERFIS_DIR, f"{user_id}.json")
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(perfil, f, indent=2, ensure_ascii=False)
+        REPO.save_perfil(user_id, perfil)
         return True
     except Exception:
         return False
@@ -92,6 +68,7 @@ if st.session_state.get("login_message"):
 # -----------------------
 # Interface de login
 # -----------------------
+metrics.section("formulario")
 st.title("🔐 Entrar")
 
 email_or_userid = st.text_input("E‑mail cadastrado ou user_id", placeholder="ex: joao.cogo@unesp.br ou admin")
@@ -179,4 +156,7 @@ if st.button("Entrar"):
     # - não renderizamos a UI admin aqui; a página admin está em pages/admin.py e exige senha própria
     # - apenas propagamos o estado e deixamos o usuário navegar no menu
     st.success(st.session_state["login_message"])
+    metrics.end_rerun()
     st.rerun()
+
+metrics.end_rerun()
@@ -1,24 +1,24 @@
 # pages/scout.py
 import streamlit as st
-import json
 import os
 import time
 from datetime import datetime, timezone
-import tempfile
 import uuid
-import base64
-import requests
 
-# util: função criada por você em utils/match_id.py
-from utils.match_id import create_match_file
-# util: função criada por você em utils/rodadas.py
-from utils.rodadas import add_match_to_meta
+from utils.repository import get_repository
+from utils import live_match, metrics
+from utils.github_sync import load_config, is_configured
+from utils import outbox
 
 st.set_page_config(page_title="Olheiro - Futebol de Terça", layout="wide")
+metrics.begin_rerun("scout")
 
 JOGADORES_FILE = "database/jogadores.json"
 os.makedirs("database", exist_ok=True)
 
+# backend de dados: "json" (padrão, arquivos do repositório) ou "sqlite"
+REPO = get_repository(st.secrets.get("STORAGE_BACKEND"), st.secrets.get("SQLITE_PATH"))
+
 # ------------------------
 # Proteção: só olheiro pode acessar
 # ------------------------
@@ -31,82 +31,27 @@ if not st.session_state.get("is_scout"):
 # Utilitários
 # ------------------------
 def carregar_jogadores():
-    if not os.path.exists(JOGADORES_FILE):
-        return {}
-    try:
-        with open(JOGADORES_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-def salvar_jogadores(jogadores_dict):
-    with open(JOGADORES_FILE, "w", encoding="utf-8") as f:
-        json.dump(jogadores_dict, f, indent=2, ensure_ascii=False)
+    # objeto compartilhado (cache): não mutar; os números da partida ficam em match["player_stats"]
+    return REPO.get_jogadores()
 
 def ensure_match_state():
     if "match" not in st.session_state:
-        st.session_state.match = {
-            "running": False,
-            "start_time": None,
-            "elapsed": 0.0,
-            "team_assign": {},   # player_id -> 0/1/2 (0 = none, 1 = team1, 2 = team2)
-            "score": {"team1": 0, "team2": 0},
-            "events": []  # list of {time, type, team, scorer, assister}
-        }
+        st.session_state.match = live_match.new_state()
+    st.session_state.match.setdefault("player_stats", {})
 
 # ------------------------
-# GitHub upload opcional (usa secrets GITHUB_USER, GITHUB_REPO, GITHUB_TOKEN, GITHUB_BRANCH)
+# GitHub upload opcional (usa secrets GITHUB_USER, GITHUB_REPO, GITHUB_TOKEN, GITHUB_BRANCH, GITHUB_API_URL)
 # ------------------------
-GITHUB_USER = st.secrets.get("GITHUB_USER", "")
-GITHUB_REPO = st.secrets.get("GITHUB_REPO", "")
-GITHUB_TOKEN = st.secrets.get("GITHUB_TOKEN", "")
-GITHUB_BRANCH = st.secrets.get("GITHUB_BRANCH", "main")
-
-def github_upload(path_local, repo_path, message):
-    """Envia arquivo local ao GitHub (opcional). Retorna (ok, msg)."""
-    if not GITHUB_USER or not GITHUB_REPO or not GITHUB_TOKEN:
-        return False, "GitHub não configurado"
-    headers = {"Authorization": f"Bearer {GITHUB_TOKEN}"}
-    url = f"https://api.github.com/repos/{GITHUB_USER}/{GITHUB_REPO}/contents/{repo_path}"
-    with open(path_local, "rb") as f:
-        content_b64 = base64.b64encode(f.read()).decode()
-    get_file = requests.get(url, headers=headers, params={"ref": GITHUB_BRANCH})
-    sha = get_file.json().get("sha") if get_file.status_code == 200 else None
-    payload = {"message": message, "content": content_b64, "branch": GITHUB_BRANCH}
-    if sha:
-        payload["sha"] = sha
-    resp = requests.put(url, headers=headers, json=payload)
-    if resp.status_code in (200, 201):
-        return True, f"ok ({resp.status_code})"
-    else:
-        return False, f"erro ({resp.status_code}): {resp.text}"
-
-# ------------------------
-# Rodadas helpers
-# ------------------------
-def list_open_rodadas():
-    base = os.path.join("database", "rodadas")
-    if not os.path.exists(base):
-        return []
-    rodadas = []
-    for name in sorted(os.listdir(base)):
-        path = os.path.join(base, name)
-        if not os.path.isdir(path):
-            continue
-        meta_path = os.path.join(path, "meta.json")
-        if os.path.exists(meta_path):
-            try:
-                with open(meta_path, "r", encoding="utf-8") as f:
-                    meta = json.load(f)
-                if meta.get("status") == "open":
-                    rodadas.append(name)
-            except Exception:
-                continue
-    return rodadas
+GITHUB_CONFIG = load_config(st.secrets)
+# com o backend SQLite os dados não são arquivos do repositório: não há o que sincronizar
+GITHUB_ENABLED = is_configured(GITHUB_CONFIG) and REPO.syncs_files
+if REPO.syncs_files:
+    outbox.start_worker(GITHUB_CONFIG)
 
 # ------------------------
 # Inicialização
 # ------------------------
+metrics.section("inicializacao")
 ensure_match_state()
 jogadores = carregar_jogadores()
 
@@ -115,6 +60,67 @@ for pid in jogadores.keys():
     if pid not in st.session_state.match["team_assign"]:
         st.session_state.match["team_assign"][pid] = 0
 
+# ------------------------
+# Rodada da partida e journal ao vivo (database/rodadas/<rodada>/live/*.jsonl)
+# ------------------------
+def _rodada_dir(rid):
+    return os.path.join("database", "rodadas", rid)
+
+# seleção de rodada (apenas rodadas com meta.json status=open)
+open_rodadas = [r["id"] for r in REPO.list_rodadas(status="open")]
+journal_path = st.session_state.get("match_journal")
+if journal_path and st.session_state.get("match_rodada") not in open_rodadas:
+    # a rodada foi fechada no meio da partida: o journal fica na pasta dela, sem novas ações
+    journal_path = st.session_state.match_journal = None
+if journal_path:
+    # partida em andamento: a rodada fica fixa (o journal já está na pasta dela)
+    rodada_id = st.session_state.match_rodada
+    st.caption(f"Rodada da partida em andamento: **{rodada_id}**")
+elif not open_rodadas:
+    st.info("Nenhuma rodada aberta encontrada. Peça ao administrador para criar uma rodada antes de registrar partidas.")
+    rodada_id = None
+else:
+    rodada_id = st.selectbox("Rodada (selecionar a rodada aberta onde esta partida pertence)", options=open_rodadas)
+
+# partidas não finalizadas (refresh do navegador / restart do servidor) podem ser retomadas
+if rodada_id and not journal_path:
+    pendentes = live_match.list_journals(_rodada_dir(rodada_id))
+    if pendentes:
+        with st.expander(f"Partidas não finalizadas nesta rodada ({len(pendentes)})", expanded=True):
+            for path in pendentes:
+                estado = live_match.replay(path, jogadores)
+                if estado is None:
+                    continue
+                c1, c2, c3 = st.columns([3,1,1])
+                c1.write(f"`{os.path.basename(path)}` — placar {estado['score']['team1']} x {estado['score']['team2']} — eventos: {len(estado['events'])}")
+                if c2.button("Retomar", key=f"resume-{path}"):
+                    live_match.repair(path)
+                    st.session_state.match = estado
+                    st.session_state.match_journal = path
+                    st.session_state.match_rodada = rodada_id
+                    st.rerun()
+                if c3.button("Descartar", key=f"discard-{path}"):
+                    live_match.discard(path)
+                    st.rerun()
+
+def _log(op):
+    """Aplica a operação à partida da sessão e acrescenta uma linha ao journal da rodada."""
+    path = st.session_state.get("match_journal")
+    if rodada_id and not path:
+        # o journal nasce na primeira ação, com o estado anterior a ela
+        try:
+            path = live_match.new_journal(_rodada_dir(rodada_id), st.session_state.match)
+            st.session_state.match_journal = path
+            st.session_state.match_rodada = rodada_id
+        except Exception as e:
+            st.warning(f"Não foi possível criar o journal da partida: {e}")
+    live_match.apply_op(st.session_state.match, op, jogadores)
+    if path:
+        try:
+            live_match.append_op(path, op)
+        except Exception as e:
+            st.warning(f"Falha ao registrar ação no journal da partida: {e}")
+
 # ------------------------
 # Funções de evento e atribuição rápida
 # ------------------------
@@ -126,39 +132,42 @@ def _now_elapsed():
 def start_match():
     if not st.session_state.match["running"]:
         if st.session_state.match["start_time"] is None:
-            st.session_state.match["start_time"] = time.time()
-            st.session_state.match["elapsed"] = 0.0
+            start_time, elapsed = time.time(), 0.0
         else:
-            st.session_state.match["start_time"] = time.time() - st.session_state.match["elapsed"]
-        st.session_state.match["running"] = True
-        st.rerun()
+            start_time, elapsed = time.time() - st.session_state.match["elapsed"], st.session_state.match["elapsed"]
+        _log({"op": "clock", "running": True, "start_time": start_time, "elapsed": elapsed})
+        st.rerun(scope="app")
 
-def pause_match():
+def pause_match(rerun=True):
     if st.session_state.match["running"]:
-        st.session_state.match["elapsed"] = time.time() - st.session_state.match["start_time"]
-        st.session_state.match["running"] = False
-        st.rerun()
+        elapsed = time.time() - st.session_state.match["start_time"]
+        _log({"op": "clock", "running": False, "start_time": st.session_state.match["start_time"], "elapsed": elapsed})
+        if rerun:
+            st.rerun(scope="app")
 
 def reset_match():
-    st.session_state.match = {
-        "running": False,
-        "start_time": None,
-        "elapsed": 0.0,
-        "team_assign": {},
-        "score": {"team1": 0, "team2": 0},
-        "events": []
-    }
+    # descarta a partida (e o journal dela)
+    if st.session_state.get("match_journal"):
+        live_match.discard(st.session_state.match_journal)
+    st.session_state.match_journal = None
+    st.session_state.match = live_match.new_state()
     for pid in jogadores.keys():
         st.session_state.match["team_assign"][pid] = 0
-    st.rerun()
+    st.rerun(scope="app")
 
 def assign_player(pid, team_num):
     # não permite alterar atribuições enquanto a partida estiver rodando
     if st.session_state.match.get("running"):
         st.warning("Não é possível alterar atribuições enquanto a partida estiver em andamento.")
         return
-    st.session_state.match["team_assign"][pid] = team_num
-    st.rerun()
+    _log({"op": "assign", "pid": pid, "team": team_num})
+    # muda a composição dos painéis: rerun da página inteira
+    st.rerun(scope="app")
+
+def player_display_stats(pid, p):
+    """(gols, assistências) do jogador: total em disco + o que foi marcado nesta partida."""
+    stats = st.session_state.match["player_stats"].get(pid, {})
+    return p.get("gols", 0) + stats.get("gols", 0), p.get("assistencias", 0) + stats.get("assistencias", 0)
 
 def record_event(ev_type, team_num, scorer_pid=None, assister_pid=None, delta_scorer=0, delta_assister=0):
     t = _now_elapsed()
@@ -169,41 +178,19 @@ def record_event(ev_type, team_num, scorer_pid=None, assister_pid=None, delta_sc
         "scorer": scorer_pid,
         "assister": assister_pid
     }
-    st.session_state.match["events"].append(ev)
-    # atualizar placar e jogadores em memória (não grava jogadores.json aqui)
-    if ev_type == "gol" and scorer_pid:
-        if team_num == 1:
-            st.session_state.match["score"]["team1"] += delta_scorer
-        else:
-            st.session_state.match["score"]["team2"] += delta_scorer
-        # atualiza apenas em memória para exibição imediata
-        jogadores[scorer_pid]["gols"] = jogadores[scorer_pid].get("gols", 0) + delta_scorer
-    if assister_pid and delta_assister != 0:
-        jogadores[assister_pid]["assistencias"] = jogadores[assister_pid].get("assistencias", 0) + delta_assister
+    # atualiza placar e números da partida (live_match.apply_op) e acrescenta ao journal;
     # não salvamos jogadores.json aqui; partidas serão salvas por arquivo dentro da rodada
+    _log({"op": "event", "ev": ev, "delta_scorer": delta_scorer, "delta_assister": delta_assister})
 
 def undo_last_event():
     if not st.session_state.match["events"]:
         st.warning("Nenhum evento para desfazer.")
         return
-    last = st.session_state.match["events"].pop()  # remove último evento
-    ev_type = last.get("type")
-    team = last.get("team")
-    scorer = last.get("scorer")
-    assister = last.get("assister")
-    # reverter alterações em memória
-    if ev_type == "gol" and scorer:
-        if jogadores.get(scorer):
-            jogadores[scorer]["gols"] = max(0, jogadores[scorer].get("gols", 0) - 1)
-        if team == "team1":
-            st.session_state.match["score"]["team1"] = max(0, st.session_state.match["score"]["team1"] - 1)
-        else:
-            st.session_state.match["score"]["team2"] = max(0, st.session_state.match["score"]["team2"] - 1)
-    if assister:
-        if jogadores.get(assister):
-            jogadores[assister]["assistencias"] = max(0, jogadores[assister].get("assistencias", 0) - 1)
+    # remove o último evento e reverte placar/números (live_match.apply_op)
+    _log({"op": "undo"})
     st.success("Último evento desfeito.")
-    st.rerun()
+    # placar e blocos dos dois times mudam: rerun da página inteira
+    st.rerun(scope="app")
 
 # ------------------------
 # Função única para renderizar bloco de jogador (evita duplicação)
@@ -214,31 +201,31 @@ def render_player_block(pid, p, team_num):
     team_num: 1 (Time1), 2 (Time2)
     """
     nome = p.get("nome", pid)
-    gols = p.get("gols", 0)
-    asts = p.get("assistencias", 0)
+    gols, asts = player_display_stats(pid, p)
 
     st.markdown(f"**{nome}**")
     st.caption(f"Gols: {gols} | Assistências: {asts}")
 
     cols = st.columns([1,1,1,1])
+    # eventos redesenham só o painel deste time (placar + blocos); um único rerun por clique
     # + Gol
     if cols[0].button("Adicionar Gol", key=f"+gol-{team_num}-{pid}"):
         record_event("gol", team_num, scorer_pid=pid, assister_pid=None, delta_scorer=1, delta_assister=0)
-        st.rerun()
+        st.rerun(scope="fragment")
     # - Gol
     if cols[1].button("Remover Gol", key=f"-gol-{team_num}-{pid}"):
         if gols > 0:
             record_event("gol", team_num, scorer_pid=pid, assister_pid=None, delta_scorer=-1, delta_assister=0)
-            st.rerun()
+            st.rerun(scope="fragment")
     # + Assist
     if cols[2].button("Adicionar Assist", key=f"+ast-{team_num}-{pid}"):
         record_event("assist", team_num, scorer_pid=None, assister_pid=pid, delta_scorer=0, delta_assister=1)
-        st.rerun()
+        st.rerun(scope="fragment")
     # - Assist
     if cols[3].button("Remover Assist", key=f"-ast-{team_num}-{pid}"):
         if asts > 0:
             record_event("assist", team_num, scorer_pid=None, assister_pid=pid, delta_scorer=0, delta_assister=-1)
-            st.rerun()
+            st.rerun(scope="fragment")
 
     # botões rápidos abaixo para mover entre times / remover
     # desabilita movimentação enquanto partida estiver rodando
@@ -257,15 +244,16 @@ def render_player_block(pid, p, team_num):
         st.write(f"ID: {pid}")
 
 # ------------------------
-# Layout: três colunas (Time1 | Centro | Time2)
+# Fragments: cada parte do console é redesenhada sozinha
+# (cronômetro, painel de cada time e histórico de eventos). Ações que mudam
+# mais de uma parte (iniciar/pausar, mover jogador, desfazer) pedem rerun da
+# página inteira com st.rerun(scope="app").
 # ------------------------
-left_col, center_col, right_col = st.columns([3, 2, 3])
-
-# --- Centro: cronômetro e jogadores disponíveis ---
-with center_col:
-    st.markdown("<div style='text-align:center'>", unsafe_allow_html=True)
-    st.markdown("### ⏱️ Cronômetro", unsafe_allow_html=True)
+def _match_started():
+    return st.session_state.match.get("start_time") is not None
 
+@metrics.fragment_rerun("scout.cronometro")
+def _render_timer():
     c1, c2, c3 = st.columns([1,1,1])
     with c1:
         if st.button("Iniciar / Retomar", disabled=st.session_state.match.get("running", False)):
@@ -284,6 +272,61 @@ with center_col:
     mins = elapsed // 60
     secs = elapsed % 60
     st.markdown(f"<h1 style='text-align:center;font-size:48px;margin:8px'>{mins:02d}:{secs:02d}</h1>", unsafe_allow_html=True)
+
+# com a partida rodando, só o cronômetro é atualizado a cada segundo
+render_timer = st.fragment(run_every=1 if st.session_state.match.get("running") else None)(_render_timer)
+
+@st.fragment
+@metrics.fragment_rerun("scout.painel_time")
+def render_team_panel(team_num):
+    st.markdown(f"## TIME {team_num}")
+    st.metric(f"Placar Time {team_num}", st.session_state.match["score"][f"team{team_num}"])
+    st.markdown("---")
+    team = [ (pid, jogadores[pid]) for pid,t in st.session_state.match["team_assign"].items() if t==team_num and pid in jogadores ]
+    if not team:
+        st.write(f"Nenhum jogador atribuído ao Time {team_num}")
+    else:
+        for pid, p in team:
+            render_player_block(pid, p, team_num=team_num)
+            st.markdown("---")
+
+@metrics.fragment_rerun("scout.eventos")
+def _render_events():
+    undo_col, events_col = st.columns([1,5])
+    with undo_col:
+        if st.button("⟲ Desfazer último evento"):
+            undo_last_event()
+    with events_col:
+        if not st.session_state.match["events"]:
+            st.write("Nenhum evento registrado.")
+        else:
+            for ev in st.session_state.match["events"]:
+                t = ev["time"]
+                mm = t // 60
+                ss = t % 60
+                if ev["type"] == "gol":
+                    scorer_name = jogadores.get(ev["scorer"], {}).get("nome", ev.get("scorer"))
+                    assister_name = jogadores.get(ev["assister"], {}).get("nome", "") if ev.get("assister") else ""
+                    st.write(f"{mm:02d}:{ss:02d} — {ev['team']} — Gol: **{scorer_name}**" + (f" | Assist: {assister_name}" if assister_name else ""))
+                else:
+                    assister_name = jogadores.get(ev["assister"], {}).get("nome", ev.get("assister"))
+                    st.write(f"{mm:02d}:{ss:02d} — {ev['team']} — Assistência: **{assister_name}**")
+
+# os painéis dos times não redesenham o histórico: durante a partida ele se atualiza sozinho
+render_events = st.fragment(run_every=2 if _match_started() else None)(_render_events)
+
+# ------------------------
+# Layout: três colunas (Time1 | Centro | Time2)
+# ------------------------
+metrics.section("campo")
+left_col, center_col, right_col = st.columns([3, 2, 3])
+
+# --- Centro: cronômetro e jogadores disponíveis ---
+with center_col:
+    st.markdown("<div style='text-align:center'>", unsafe_allow_html=True)
+    st.markdown("### ⏱️ Cronômetro", unsafe_allow_html=True)
+
+    render_timer()
     st.markdown("</div>", unsafe_allow_html=True)
 
     st.markdown("---")
@@ -306,29 +349,11 @@ with center_col:
 
 # --- Left: Time 1 ---
 with left_col:
-    st.markdown("## TIME 1")
-    st.metric("Placar Time 1", st.session_state.match["score"]["team1"])
-    st.markdown("---")
-    team1 = [ (pid, jogadores[pid]) for pid,t in st.session_state.match["team_assign"].items() if t==1 and pid in jogadores ]
-    if not team1:
-        st.write("Nenhum jogador atribuído ao Time 1")
-    else:
-        for pid, p in team1:
-            render_player_block(pid, p, team_num=1)
-            st.markdown("---")
+    render_team_panel(1)
 
 # --- Right: Time 2 ---
 with right_col:
-    st.markdown("## TIME 2")
-    st.metric("Placar Time 2", st.session_state.match["score"]["team2"])
-    st.markdown("---")
-    team2 = [ (pid, jogadores[pid]) for pid,t in st.session_state.match["team_assign"].items() if t==2 and pid in jogadores ]
-    if not team2:
-        st.write("Nenhum jogador atribuído ao Time 2")
-    else:
-        for pid, p in team2:
-            render_player_block(pid, p, team_num=2)
-            st.markdown("---")
+    render_team_panel(2)
 
 # ------------------------
 # Painel de atribuição (abaixo): permite atribuir jogadores a times rapidamente (opcional)
@@ -365,40 +390,15 @@ with right_col:
 # Eventos registrados (histórico) com Desfazer
 # ------------------------
 st.markdown("---")
+metrics.section("eventos")
 st.markdown("### Eventos registrados")
-undo_col, events_col = st.columns([1,5])
-with undo_col:
-    if st.button("⟲ Desfazer último evento"):
-        undo_last_event()
-with events_col:
-    if not st.session_state.match["events"]:
-        st.write("Nenhum evento registrado.")
-    else:
-        for ev in st.session_state.match["events"]:
-            t = ev["time"]
-            mm = t // 60
-            ss = t % 60
-            if ev["type"] == "gol":
-                scorer_name = jogadores.get(ev["scorer"], {}).get("nome", ev.get("scorer"))
-                assister_name = jogadores.get(ev["assister"], {}).get("nome", "") if ev.get("assister") else ""
-                st.write(f"{mm:02d}:{ss:02d} — {ev['team']} — Gol: **{scorer_name}**" + (f" | Assist: {assister_name}" if assister_name else ""))
-            else:
-                assister_name = jogadores.get(ev["assister"], {}).get("nome", ev.get("assister"))
-                st.write(f"{mm:02d}:{ss:02d} — {ev['team']} — Assistência: **{assister_name}**")
+render_events()
 
 # ------------------------
 # Finalizar partida: salva um arquivo de partida dentro da rodada selecionada
 # ------------------------
 st.markdown("---")
 
-# seleção de rodada (apenas rodadas com meta.json status=open)
-open_rodadas = list_open_rodadas()
-if not open_rodadas:
-    st.info("Nenhuma rodada aberta encontrada. Peça ao administrador para criar uma rodada antes de registrar partidas.")
-    rodada_id = None
-else:
-    rodada_id = st.selectbox("Rodada (selecionar a rodada aberta onde esta partida pertence)", options=open_rodadas)
-
 def _build_resumo_from_events(events):
     resumo = {}
     for ev in events:
@@ -413,63 +413,50 @@ def _build_resumo_from_events(events):
     return resumo
 
 def _finalize_match_save_file(rodada_id):
-    # força pausa para capturar tempo final consistente
+    # força pausa para capturar tempo final consistente (sem rerun: o salvamento continua)
     if st.session_state.match.get("running"):
-        pause_match()
+        pause_match(rerun=False)
 
     if not rodada_id:
         st.error("Nenhuma rodada selecionada. Não é possível salvar a partida.")
         return False
 
-    matches_dir = os.path.join("database", "rodadas", rodada_id, "matches")
-    os.makedirs(matches_dir, exist_ok=True)
+    # a partida salva é a reconstruída do journal (o mesmo que sobrevive a um restart)
+    journal = st.session_state.get("match_journal")
+    partida = (live_match.replay(journal, jogadores) if journal else None) or st.session_state.match
 
     # montar match_entry
     now_iso = datetime.now(timezone.utc).isoformat()
     match_entry = {
         "rodada_id": rodada_id,
-        "timestamp_start": datetime.fromtimestamp(st.session_state.match["start_time"], tz=timezone.utc).isoformat() if st.session_state.match.get("start_time") else None,
+        "timestamp_start": datetime.fromtimestamp(partida["start_time"], tz=timezone.utc).isoformat() if partida.get("start_time") else None,
         "timestamp_end": now_iso,
-        "duration_seconds": int(st.session_state.match.get("elapsed", 0)),
-        "team_assign": st.session_state.match.get("team_assign", {}),
-        "score": st.session_state.match.get("score", {"team1": 0, "team2": 0}),
-        "events": st.session_state.match.get("events", []),
-        "resumo_jogadores": _build_resumo_from_events(st.session_state.match.get("events", []))
+        "duration_seconds": int(partida.get("elapsed", 0)),
+        "team_assign": partida.get("team_assign", {}),
+        "score": partida.get("score", {"team1": 0, "team2": 0}),
+        "events": partida.get("events", []),
+        "resumo_jogadores": _build_resumo_from_events(partida.get("events", []))
     }
 
-    # cria arquivo de partida usando sua utilidade create_match_file
+    # grava a partida, registra no meta da rodada (idempotente) e incorpora ao
+    # resumo corrente (classificação parcial); devolve os arquivos tocados
     try:
-        match_id, filepath = create_match_file(matches_dir, match_entry)
+        with metrics.span("scout.salvar_partida"):
+            match_id, arquivos_locais = REPO.save_match(rodada_id, match_entry)
     except Exception as e:
-        st.error(f"Falha ao criar arquivo de partida: {e}")
+        st.error(f"Falha ao salvar a partida: {e}")
         return False
+    arquivos = [(path, path.replace(os.sep, "/")) for path in arquivos_locais]
 
-    # adiciona partida ao meta.json da rodada (idempotente)
-    try:
-        added = add_match_to_meta(rodada_id, match_id)
-        if added:
-            # opcional: upload meta.json ao GitHub
-            meta_path = os.path.join("database", "rodadas", rodada_id, "meta.json")
-            if GITHUB_USER and GITHUB_REPO and GITHUB_TOKEN and os.path.exists(meta_path):
-                ok_meta, out_meta = github_upload(meta_path, f"database/rodadas/{rodada_id}/meta.json", f"Atualiza meta da rodada {rodada_id} com {match_id}")
-                if not ok_meta:
-                    st.warning(f"Meta da rodada atualizada localmente, mas falha ao enviar para GitHub: {out_meta}")
-        else:
-            st.info("Partida já estava registrada na meta da rodada (idempotente).")
-    except Exception as e:
-        st.warning(f"Partida salva, mas falha ao atualizar meta da rodada: {e}")
-
-    # opcional: upload para GitHub do arquivo de partida
-    if GITHUB_USER and GITHUB_REPO and GITHUB_TOKEN:
-        ok, out = github_upload(filepath, f"database/rodadas/{rodada_id}/matches/{os.path.basename(filepath)}", f"Adiciona partida {match_id} em {rodada_id}")
-        if not ok:
-            st.warning(f"Partida salva localmente em {filepath}, mas falha ao enviar para GitHub: {out}")
-        else:
-            st.info(f"Partida enviada ao GitHub ({out}).")
+    # opcional: upload para GitHub do arquivo de partida (e meta.json), em segundo plano
+    if GITHUB_ENABLED and arquivos:
+        outbox.enqueue_many(arquivos, f"Adiciona partida {match_id} em {rodada_id}")
+        st.info("Envio ao GitHub enfileirado.")
 
     st.success(f"Partida salva: {match_id}")
     return True
 
+metrics.section("finalizar")
 end_col1, end_col2 = st.columns([1,1])
 with end_col1:
     if st.button("Finalizar partida (salvar partida na rodada)"):
@@ -484,3 +471,5 @@ with end_col2:
                 del st.session_state[k]
         st.success("Logout efetuado.")
         st.rerun()
+
+metrics.end_rerun()
@@ -0,0 +1,104 @@
+# utils/cache.py
+"""
+Cache de leitura compartilhado pelo processo (todas as sessões e páginas).
+
+As entradas são indexadas por (path, tipo) e validadas pela assinatura do
+arquivo (mtime_ns, tamanho, inode): enquanto o arquivo não mudar em disco, o
+valor já carregado é devolvido sem reabrir nem reparsear nada. O total em
+memória é limitado por MAX_CACHE_BYTES com despejo LRU.
+
+Os objetos devolvidos são compartilhados entre sessões: não devem ser
+mutados. Quem precisa alterar deve trabalhar sobre uma cópia (copy.deepcopy).
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from utils import codec, metrics
+
+MAX_CACHE_BYTES = 64 * 1024 * 1024  # custo estimado pelo tamanho em disco
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # (path, kind) -> (signature, value, cost)
+_total_cost = 0
+
+
+def file_signature(path):
+    """Retorna (mtime_ns, size, ino) de path, ou None se não existir."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _evict_locked():
+    global _total_cost
+    while _total_cost > MAX_CACHE_BYTES and _entries:
+        _, (_, _, cost) = _entries.popitem(last=False)
+        _total_cost -= cost
+
+
+def cached(path, loader, kind="raw"):
+    """
+    Devolve loader(path), reaproveitando o resultado enquanto a assinatura de
+    path não mudar. Arquivos inexistentes não são cacheados.
+    """
+    global _total_cost
+    key = (os.path.normpath(path), kind)
+    sig = file_signature(path)
+    if sig is None:
+        return loader(path)
+
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] == sig:
+            _entries.move_to_end(key)
+            return entry[1]
+
+    with metrics.span(f"cache.miss.{kind}"):
+        value = loader(path)
+    cost = max(sig[1], 1)
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _total_cost -= old[2]
+        if cost <= MAX_CACHE_BYTES:
+            _entries[key] = (sig, value, cost)
+            _total_cost += cost
+            _evict_locked()
+    return value
+
+
+def _read_json(path):
+    return codec.load(path)
+
+
+def load_json(path, default=None):
+    """Carrega um arquivo de dados (qualquer formato do codec) via cache. Retorna default se o arquivo não existir ou for inválido."""
+    try:
+        data = cached(path, _read_json, kind="json")
+    except codec.CodecUnavailable:
+        raise
+    except Exception:
+        return default
+    return default if data is None else data
+
+
+def invalidate(path=None):
+    """Remove entradas de path (todas as variantes) ou limpa o cache inteiro."""
+    global _total_cost
+    with _lock:
+        if path is None:
+            _entries.clear()
+            _total_cost = 0
+            return
+        norm = os.path.normpath(path)
+        for key in [k for k in _entries if k[0] == norm]:
+            _total_cost -= _entries.pop(key)[2]
+
+
+def stats():
+    """Resumo do estado do cache (para depuração/admin)."""
+    with _lock:
+        return {"entries": len(_entries), "bytes": _total_cost, "max_bytes": MAX_CACHE_BYTES}
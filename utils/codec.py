@@ -0,0 +1,223 @@
+# utils/codec.py
+"""
+Formato em disco dos arquivos de dados (database/, users/, times/).
+
+Três formatos, escolhidos na escrita:
+  - "json":         JSON indentado (padrão; diffs legíveis no GitHub)
+  - "json-compact": JSON sem espaços (orjson se o pacote opcional estiver
+                    instalado, senão json da biblioteca padrão)
+  - "msgpack":      binário (pacote opcional "msgpack"; sem ele cai para
+                    json-compact na escrita)
+
+A leitura detecta o formato pelo primeiro byte (um documento msgpack de
+objeto/lista começa com 0x80-0x9f ou 0xdc-0xdf, que nunca iniciam JSON),
+então arquivos em formatos diferentes convivem na mesma árvore e os nomes
+continuam *.json.
+
+Configuração por variável de ambiente (ou chave de mesmo nome nos secrets
+do Streamlit, que viram variáveis de ambiente):
+  FUTEBOL_CODEC      formato padrão das escritas
+  FUTEBOL_CODEC_HOT  formato dos arquivos quentes (HOT_FILES); padrão: FUTEBOL_CODEC
+
+Conversão de uma árvore existente (reescreve cada arquivo no formato
+configurado, ou no --format informado):
+
+    python -m utils.codec convert [--format json|json-compact|msgpack] [--dry-run] [raiz ...]
+    python -m utils.codec stats [raiz ...]
+"""
+import os
+import sys
+import json
+import fnmatch
+
+try:
+    import orjson
+except ImportError:  # opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # opcional
+    msgpack = None
+
+FORMATS = ("json", "json-compact", "msgpack")
+DEFAULT_FORMAT = "json"
+# lidos a cada rerun: jogadores, catálogo de rodadas, índice de e-mails e resumos correntes
+HOT_FILES = (
+    "database/jogadores.json",
+    "database/rodadas_catalog.json",
+    "database/fantasy_leaderboard.json",
+    "database/rodadas/*/running_summary.json",
+    "users/email_index.json",
+)
+ROOTS = ("database", "users", "times")
+# estado interno (journal, outbox) e blobs de snapshots não são convertidos
+SKIP_DIRS = (".journal", ".outbox", "snapshots", "metrics")
+
+_BOM = b"\xef\xbb\xbf"
+
+
+class CodecUnavailable(RuntimeError):
+    """Arquivo em um formato cujo pacote opcional não está instalado."""
+
+
+# ------------------------
+# Escolha do formato
+# ------------------------
+def _env_format(name, default):
+    fmt = (os.environ.get(name) or "").strip().lower() or default
+    return fmt if fmt in FORMATS else default
+
+
+def format_for(path=None):
+    """Formato de escrita de path (HOT_FILES usam FUTEBOL_CODEC_HOT)."""
+    fmt = _env_format("FUTEBOL_CODEC", DEFAULT_FORMAT)
+    if path is not None:
+        norm = os.path.normpath(path).replace(os.sep, "/")
+        if any(fnmatch.fnmatch(norm, p) for p in HOT_FILES):
+            fmt = _env_format("FUTEBOL_CODEC_HOT", fmt)
+    if fmt == "msgpack" and msgpack is None:
+        return "json-compact"
+    return fmt
+
+
+# ------------------------
+# Codificação
+# ------------------------
+def dumps(obj, fmt=None, path=None):
+    """obj -> bytes no formato fmt (padrão: format_for(path))."""
+    fmt = fmt or format_for(path)
+    if fmt == "msgpack" and msgpack is not None:
+        return msgpack.packb(obj, use_bin_type=True)
+    if fmt in ("json-compact", "msgpack"):
+        if orjson is not None:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def detect(data):
+    """Formato de um conteúdo já gravado: "msgpack" ou "json"."""
+    if data:
+        b = data[0]
+        if 0x80 <= b <= 0x9f or 0xdc <= b <= 0xdf:
+            return "msgpack"
+    return "json"
+
+
+def loads(data):
+    """bytes (ou str) em qualquer dos formatos -> objeto."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if detect(data) == "msgpack":
+        if msgpack is None:
+            raise CodecUnavailable("arquivo em msgpack, mas o pacote 'msgpack' não está instalado")
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    if data.startswith(_BOM):
+        data = data[len(_BOM):]
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # NaN/Infinity e afins: o json da biblioteca padrão aceita
+    return json.loads(data.decode("utf-8"))
+
+
+def load(path):
+    """Lê e decodifica path (levanta exceção se não existir ou for inválido)."""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+# ------------------------
+# Conversão de árvore
+# ------------------------
+def iter_files(roots=ROOTS):
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for fname in filenames:
+                if fname.endswith(".json") and not fname.startswith("."):
+                    yield os.path.join(dirpath, fname)
+
+
+def stats(roots=ROOTS):
+    """{formato: [arquivos, bytes]} dos arquivos de dados em roots."""
+    out = {}
+    for path in iter_files(roots):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        s = out.setdefault(detect(data), [0, 0])
+        s[0] += 1
+        s[1] += len(data)
+    return out
+
+
+def convert(roots=ROOTS, fmt=None, dry_run=False):
+    """
+    Reescreve cada arquivo de dados no formato fmt (ou no de format_for(path)),
+    de forma atômica. Arquivos ilegíveis são mantidos como estão. Arquivos
+    versionados (jogadores, leaderboard, meta.json: repository.is_versioned)
+    são gravados com compare-and-swap; os que outra sessão alterar durante a
+    conversão ficam como estão, em "pulados". Retorna {"convertidos", "iguais",
+    "pulados", "erros", "bytes_antes", "bytes_depois"}.
+    """
+    from utils import cache, storage
+    from utils.repository import is_versioned
+
+    if fmt is not None and fmt not in FORMATS:
+        raise ValueError(f"formato desconhecido: {fmt}")
+    out = {"convertidos": 0, "iguais": 0, "pulados": [], "erros": [], "bytes_antes": 0, "bytes_depois": 0}
+    for path in iter_files(roots):
+        # versão lida antes do conteúdo (mesma ordem de storage.read_versioned)
+        version = storage.file_version(path) if is_versioned(path) else None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            new = dumps(loads(data), fmt, path)
+        except Exception as e:
+            out["erros"].append((path, str(e)))
+            continue
+        if new != data and not dry_run:
+            try:
+                if version is None:
+                    storage.write_atomic(path, new)
+                else:
+                    storage.write_bytes_cas(path, new, version)
+            except storage.VersionConflict:
+                out["pulados"].append(path)
+                continue
+        out["bytes_antes"] += len(data)
+        out["bytes_depois"] += len(new)
+        if new == data:
+            out["iguais"] += 1
+        else:
+            out["convertidos"] += 1
+    if not dry_run:
+        cache.invalidate()
+    return out
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    cmd = args[0] if args else None
+    fmt = args[args.index("--format") + 1] if "--format" in args else None
+    roots = [a for a in args[1:] if not a.startswith("--") and a != fmt] or list(ROOTS)
+    if cmd == "convert":
+        r = convert(roots, fmt, dry_run="--dry-run" in args)
+        print(f"{r['convertidos']} convertido(s), {r['iguais']} já no formato, {len(r['erros'])} erro(s)")
+        print(f"{r['bytes_antes']} -> {r['bytes_depois']} bytes")
+        for path, err in r["erros"]:
+            print(f"  {path}: {err}")
+        for path in r["pulados"]:
+            print(f"  {path}: alterado durante a conversão, mantido (rode de novo)")
+        sys.exit(1 if r["erros"] else 0)
+    elif cmd == "stats":
+        for name, (n, size) in sorted(stats(roots).items()):
+            print(f"{name}\t{n} arquivo(s)\t{size} bytes")
+    else:
+        print("uso: python -m utils.codec (convert [--format F] [--dry-run] | stats) [raiz ...]")
+        sys.exit(2)
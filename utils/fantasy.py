@@ -0,0 +1,186 @@
+# utils/fantasy.py
+"""
+Fantasy: montagem de time com orçamento.
+
+O custo de cada jogador é o "valor" de jogadores.json (inteiro); o time tem
+exatamente SQUAD_SIZE jogadores e custo total <= BUDGET. suggest_lineup()
+resolve a escolha ótima (máximo de pontos projetados) por programação dinâmica
+de mochila com cardinalidade fixa, vetorizada em NumPy sobre o orçamento:
+O(n · tamanho · orçamento) operações elementares, milissegundos para centenas
+de jogadores.
+
+No fechamento de cada rodada, score_rodada() pontua todos os times de uma vez
+contra scores.json e grava os pontos dos usuários na rodada e o leaderboard
+acumulado.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+
+from utils import storage
+from utils import season as season_stats
+
+BUDGET = 100
+SQUAD_SIZE = 5
+
+
+def player_cost(jogador):
+    try:
+        return max(0, int(round(float(jogador.get("valor", 0) or 0))))
+    except (TypeError, ValueError):
+        return 0
+
+
+def projected_points(season, jogadores):
+    """{player_id: pontos projetados} = média de pontos por rodada disputada na temporada (0 sem histórico)."""
+    media = season_stats.averages(season)["por_rodada"]
+    proj = {pid: 0.0 for pid in jogadores}
+    for i, pid in enumerate(season["players"]):
+        if pid in proj and not np.isnan(media[i]):
+            proj[pid] = float(media[i])
+    return proj
+
+
+def lineup_cost(time, jogadores):
+    return sum(player_cost(jogadores.get(pid, {})) for pid in time)
+
+
+def validate_lineup(time, jogadores, budget=BUDGET, squad_size=SQUAD_SIZE):
+    """Lista de erros (vazia se o time é válido)."""
+    erros = []
+    if len(set(time)) != len(time):
+        erros.append("Jogador repetido no time.")
+    desconhecidos = [pid for pid in time if pid not in jogadores]
+    if desconhecidos:
+        erros.append(f"Jogadores inexistentes: {', '.join(desconhecidos)}")
+    if len(time) != squad_size:
+        erros.append(f"O time precisa ter exatamente {squad_size} jogadores (tem {len(time)}).")
+    custo = lineup_cost(time, jogadores)
+    if custo > budget:
+        erros.append(f"Custo {custo} acima do orçamento ({budget}).")
+    return erros
+
+
+def suggest_lineup(jogadores, points, budget=BUDGET, squad_size=SQUAD_SIZE):
+    """
+    Time de squad_size jogadores com custo <= budget que maximiza a soma de
+    points[pid]. Retorna (lista de player_ids, pontos projetados) ou (None, 0.0)
+    se não existe time viável.
+
+    dp[k, b] = melhor soma com k jogadores e custo exato b (-inf se impossível);
+    take[i, k, b] registra se o jogador i melhorou dp[k, b], para reconstruir.
+    """
+    pids = sorted(jogadores)
+    n, budget = len(pids), int(budget)
+    if squad_size <= 0 or n < squad_size or budget < 0:
+        return None, 0.0
+    costs = [player_cost(jogadores[pid]) for pid in pids]
+    pts = [float(points.get(pid, 0.0)) for pid in pids]
+    dp = np.full((squad_size + 1, budget + 1), -np.inf)
+    dp[0, 0] = 0.0
+    take = np.zeros((n, squad_size + 1, budget + 1), dtype=bool)
+    for i in range(n):
+        c = costs[i]
+        if c > budget:
+            continue
+        # k decrescente: cada jogador entra no máximo uma vez
+        for k in range(min(i + 1, squad_size), 0, -1):
+            cand = dp[k - 1, :budget + 1 - c] + pts[i]
+            better = cand > dp[k, c:]
+            if better.any():
+                dp[k, c:][better] = cand[better]
+                take[i, k, c:][better] = True
+    b = int(np.argmax(dp[squad_size]))
+    best = dp[squad_size, b]
+    if not np.isfinite(best):
+        return None, 0.0
+    time, k = [], squad_size
+    for i in range(n - 1, -1, -1):
+        if k and take[i, k, b]:
+            time.append(pids[i])
+            k -= 1
+            b -= costs[i]
+    return sorted(time), float(best)
+
+
+# ------------------------
+# Pontuação dos usuários (lote, no fechamento da rodada)
+# ------------------------
+def score_lineups(lineups, scores):
+    """
+    {user_id: pontos} de todos os times contra os scores de uma rodada, em uma
+    passada: os times viram um vetor achatado de índices de jogador e os pontos
+    por usuário saem de um único np.bincount (jogador sem score vale 0).
+    """
+    index = {pid: k for k, pid in enumerate(scores)}
+    # posição extra no fim = jogador que não pontuou na rodada
+    pts = np.zeros(len(index) + 1)
+    if index:
+        pts[:-1] = np.fromiter((float(v.get("pontos", 0)) for v in scores.values()), dtype=float, count=len(index))
+    users = list(lineups)
+    missing = len(index)
+    flat, owner = [], []
+    for u, uid in enumerate(users):
+        time = (lineups[uid] or {}).get("time") or []
+        flat.extend(index.get(pid, missing) for pid in time)
+        owner.extend([u] * len(time))
+    totals = np.bincount(np.asarray(owner, dtype=np.intp), weights=pts[np.asarray(flat, dtype=np.intp)],
+                         minlength=len(users)) if flat else np.zeros(len(users))
+    return {uid: int(round(totals[u])) for u, uid in enumerate(users)}
+
+
+def update_leaderboard(leaderboard, points_by_rodada):
+    """
+    Novo leaderboard com os pontos {rodada_id: {user_id: pontos}} (substituem os
+    que já existiam para essas rodadas).
+    """
+    usuarios = {}
+    for uid, rec in ((leaderboard or {}).get("usuarios") or {}).items():
+        por_rodada = {rid: p for rid, p in (rec.get("pontos_por_rodada") or {}).items() if rid not in points_by_rodada}
+        usuarios[uid] = {"pontos_por_rodada": por_rodada}
+    for rodada_id, user_points in points_by_rodada.items():
+        for uid, p in user_points.items():
+            usuarios.setdefault(uid, {"pontos_por_rodada": {}})["pontos_por_rodada"][rodada_id] = p
+    for rec in usuarios.values():
+        rec["pontos_por_rodada"] = dict(sorted(rec["pontos_por_rodada"].items()))
+        rec["pontos_total"] = sum(rec["pontos_por_rodada"].values())
+    rodadas = sorted({rid for rec in usuarios.values() for rid in rec["pontos_por_rodada"]})
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "rodadas": rodadas,
+        "usuarios": dict(sorted(usuarios.items(), key=lambda kv: (-kv[1]["pontos_total"], kv[0]))),
+    }
+
+
+def save_leaderboard(repo, points_by_rodada):
+    """Incorpora {rodada_id: {user_id: pontos}} ao leaderboard acumulado (uma gravação para o lote)."""
+    def attempt():
+        with repo.batch():
+            repo.save_fantasy_leaderboard(update_leaderboard(repo.get_fantasy_leaderboard(), points_by_rodada))
+    storage.retry_on_conflict(attempt)
+
+
+def score_rodada(repo, rodada_id, scores=None, lineups=None, leaderboard=True):
+    """
+    Pontua todos os times na rodada e grava os pontos da rodada e (leaderboard=True)
+    o leaderboard acumulado, dentro de repo.batch() (entra no batch do chamador,
+    se houver). scores: {player_id: {...}} (padrão: scores.json da rodada);
+    lineups: já carregados (padrão: repo.list_lineups(), uma leitura para todos).
+    Retorna {user_id: pontos}.
+    """
+    if scores is None:
+        scores = (repo.get_scores(rodada_id) or {}).get("scores", {}) or {}
+    if lineups is None:
+        lineups = repo.list_lineups()
+    user_points = score_lineups(lineups, scores)
+    obj = {
+        "rodada_id": rodada_id,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "pontos": {uid: {"pontos": p, "time": list((lineups[uid] or {}).get("time") or [])}
+                   for uid, p in sorted(user_points.items())},
+    }
+    with repo.batch():
+        repo.save_fantasy_points(rodada_id, obj)
+        if leaderboard:
+            save_leaderboard(repo, {rodada_id: user_points})
+    return user_points
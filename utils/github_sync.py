@@ -0,0 +1,114 @@
+# utils/github_sync.py
+"""
+Sincronização com o GitHub via Git Data API: todos os arquivos tocados por
+uma operação vão em um único commit (blobs -> tree -> commit -> update ref),
+usando uma requests.Session compartilhada (keep-alive, pool de conexões).
+
+A URL base é configurável (GITHUB_API_URL) para permitir apontar para um
+servidor local de testes.
+"""
+import base64
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import metrics
+
+DEFAULT_API_URL = "https://api.github.com"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Session HTTP única do processo, reaproveitando conexões entre chamadas."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+        return _session
+
+
+def load_config(secrets):
+    """Monta a configuração a partir de st.secrets (ou de qualquer mapping com .get)."""
+    return {
+        "user": secrets.get("GITHUB_USER", ""),
+        "repo": secrets.get("GITHUB_REPO", ""),
+        "token": secrets.get("GITHUB_TOKEN", ""),
+        "branch": secrets.get("GITHUB_BRANCH", "main"),
+        "base_url": (secrets.get("GITHUB_API_URL", "") or DEFAULT_API_URL).rstrip("/"),
+    }
+
+
+def is_configured(config):
+    return bool(config and config.get("user") and config.get("repo") and config.get("token"))
+
+
+def _request(session, method, url, config, **kwargs):
+    headers = {"Authorization": f"Bearer {config['token']}", "Accept": "application/vnd.github+json"}
+    resp = session.request(method, url, headers=headers, timeout=30, **kwargs)
+    if resp.status_code not in (200, 201):
+        raise RuntimeError(f"{method} {url} -> {resp.status_code}: {resp.text[:300]}")
+    return resp.json()
+
+
+def _commit_once(files, message, config, session):
+    base = f"{config['base_url']}/repos/{config['user']}/{config['repo']}/git"
+    branch = config.get("branch") or "main"
+
+    ref = _request(session, "GET", f"{base}/ref/heads/{branch}", config)
+    head_sha = ref["object"]["sha"]
+    head_commit = _request(session, "GET", f"{base}/commits/{head_sha}", config)
+
+    tree = []
+    for path_local, repo_path in files:
+        if path_local is None:
+            # remoção do arquivo no repositório
+            tree.append({"path": repo_path, "mode": "100644", "type": "blob", "sha": None})
+            continue
+        with open(path_local, "rb") as f:
+            content_b64 = base64.b64encode(f.read()).decode()
+        blob = _request(session, "POST", f"{base}/blobs", config,
+                        json={"content": content_b64, "encoding": "base64"})
+        tree.append({"path": repo_path, "mode": "100644", "type": "blob", "sha": blob["sha"]})
+
+    new_tree = _request(session, "POST", f"{base}/trees", config,
+                        json={"base_tree": head_commit["tree"]["sha"], "tree": tree})
+    commit = _request(session, "POST", f"{base}/commits", config,
+                      json={"message": message, "tree": new_tree["sha"], "parents": [head_sha]})
+    _request(session, "PATCH", f"{base}/refs/heads/{branch}", config,
+             json={"sha": commit["sha"], "force": False})
+    return commit["sha"]
+
+
+@metrics.timed("github.commit")
+def commit_files(files, message, config, session=None, attempts=2):
+    """
+    Envia files = [(path_local | None, repo_path), ...] em um único commit.
+    path_local None remove o arquivo. Se o branch andou durante a operação
+    (update de ref rejeitado), refaz a partir do novo HEAD. Retorna (ok, msg).
+    """
+    if not is_configured(config):
+        return False, "GitHub não configurado"
+    files = [(p, rp.replace("\\", "/")) for p, rp in files]
+    if not files:
+        return True, "nada a enviar"
+    session = session or get_session()
+    last_err = None
+    for _ in range(max(1, attempts)):
+        try:
+            sha = _commit_once(files, message, config, session)
+            return True, f"ok ({sha[:7]}, {len(files)} arquivo(s))"
+        except Exception as e:
+            last_err = e
+    return False, f"erro: {last_err}"
+
+
+def github_upload(path_local, repo_path, message, config, session=None):
+    """Compatível com a antiga função das páginas: um arquivo, um commit."""
+    return commit_files([(path_local, repo_path)], message, config, session=session)
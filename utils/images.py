@@ -1,4 +1,17 @@
 import base64
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from utils import cache, codec, metrics, storage
+from utils.storage import write_atomic
+
+JOGADORES_FILE = "database/jogadores.json"
+THUMBS_DIR = "imagens/jogadores/thumbs"
+THUMB_SIZES = (80, 160, 320)
 
 def img_to_base64(uploaded_file):
     if uploaded_file is None:
@@ -8,3 +21,124 @@ def img_to_base64(uploaded_file):
     encoded = base64.b64encode(bytes_data).decode("utf-8")
 
     return f"data:image/png;base64,{encoded}"
+
+def _file_to_data_uri(path):
+    ext = path.rsplit(".", 1)[-1].lower()
+    mime = {"jpg": "jpeg", "jpeg": "jpeg", "png": "png", "webp": "webp"}.get(ext, "jpeg")
+    with open(path, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode("utf-8")
+    return f"data:image/{mime};base64,{encoded}"
+
+@metrics.timed("images.data_uri")
+def image_data_uri(path):
+    """data URI de uma imagem local (para colunas de imagem do st.dataframe), via cache."""
+    if not path:
+        return None
+    try:
+        return cache.cached(path, _file_to_data_uri, kind="datauri")
+    except Exception:
+        return None
+
+# ------------------------
+# Miniaturas (derivados de tamanho fixo)
+# ------------------------
+def generate_derivatives(src_path, thumbs_dir=THUMBS_DIR, sizes=THUMB_SIZES, quality=80):
+    """
+    Gera miniaturas quadradas (lado máximo = size) em WebP e JPEG para src_path.
+    Retorna o manifest {"80": {"webp": path, "jpg": path}, ...}.
+    """
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    with Image.open(src_path) as img:
+        img = img.convert("RGB")
+        manifest = {}
+        for size in sorted(sizes):
+            thumb = img.copy()
+            thumb.thumbnail((size, size))
+            entry = {}
+            for fmt, ext in (("WEBP", "webp"), ("JPEG", "jpg")):
+                out = io.BytesIO()
+                thumb.save(out, format=fmt, quality=quality)
+                path = os.path.join(thumbs_dir, f"{stem}-{size}.{ext}")
+                write_atomic(path, out.getvalue())
+                entry[ext] = path
+            manifest[str(size)] = entry
+    return manifest
+
+def remove_derivatives(manifest):
+    for entry in (manifest or {}).values():
+        for path in entry.values():
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+
+def pick_image(jogador, width, prefer="webp"):
+    """
+    Caminho da menor miniatura com lado >= width (ou a maior disponível);
+    cai para a imagem original se o jogador não tiver miniaturas em disco.
+    """
+    manifest = jogador.get("miniaturas") or {}
+    sizes = sorted(int(s) for s in manifest)
+    candidates = [s for s in sizes if s >= width] or sizes[-1:]
+    for size in candidates:
+        entry = manifest.get(str(size), {})
+        for ext in (prefer, "jpg", "webp"):
+            path = entry.get(ext)
+            if path and os.path.exists(path):
+                return path
+    return jogador.get("imagem", "")
+
+def _backfill_one(args):
+    pid, src_path = args
+    try:
+        return pid, generate_derivatives(src_path), None
+    except Exception as e:
+        return pid, None, str(e)
+
+def backfill_derivatives(jogadores_path=JOGADORES_FILE, workers=None, force=False):
+    """
+    Regera (em paralelo) as miniaturas das imagens já cadastradas e grava o
+    manifest de cada jogador em jogadores.json. Retorna (gerados, erros).
+    """
+    jogadores = codec.load(jogadores_path)
+
+    todo = []
+    for pid, j in jogadores.items():
+        src = j.get("imagem")
+        if not src or not os.path.exists(src):
+            continue
+        if not force and j.get("miniaturas") and pick_image(j, max(THUMB_SIZES)) != src:
+            continue
+        todo.append((pid, src))
+
+    erros, manifests = {}, {}
+    gerados = 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for pid, manifest, err in pool.map(_backfill_one, todo):
+                if err:
+                    erros[pid] = err
+                    continue
+                manifests[pid] = manifest
+                gerados += 1
+
+        # compare-and-swap: o admin pode ter gravado jogadores.json durante a geração
+        def aplicar(atual):
+            for pid, manifest in manifests.items():
+                if pid in atual:
+                    atual[pid]["miniaturas"] = manifest
+        storage.update_json(jogadores_path, aplicar, default={})
+    return gerados, erros
+
+if __name__ == "__main__":
+    # uso: python -m utils.images backfill [--force] [--workers N]
+    args = sys.argv[1:]
+    if not args or args[0] != "backfill":
+        print("uso: python -m utils.images backfill [--force] [--workers N]")
+        sys.exit(2)
+    workers = int(args[args.index("--workers") + 1]) if "--workers" in args else None
+    gerados, erros = backfill_derivatives(workers=workers, force="--force" in args)
+    print(f"miniaturas geradas para {gerados} jogador(es)")
+    for pid, err in erros.items():
+        print(f"  erro em {pid}: {err}")
+    sys.exit(1 if erros else 0)
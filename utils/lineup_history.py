@@ -0,0 +1,348 @@
+# utils/lineup_history.py
+"""
+Histórico de lineups: um log append-only por usuário.
+
+    times/history/<user_id>.jsonl   uma linha por versão do time: a cada
+                                    KEYFRAME_EVERY versões um registro completo
+                                    ("full"), nas demais só a diferença para a
+                                    anterior ("add"/"del" no time, "set"/"unset"
+                                    nos outros campos)
+    times/history/<user_id>.idx     índice binário de tamanho fixo, um registro
+                                    por versão: (ts em µs, offset da linha,
+                                    offset do keyframe)
+
+lineup_at(user_id, ts) faz busca binária no índice (seek, sem ler o arquivo
+todo) e reconstrói o time a partir do keyframe mais próximo: no máximo
+KEYFRAME_EVERY linhas lidas. A compactação reescreve o log dobrando as versões
+mais antigas que RETENTION_DAYS em um único keyframe.
+
+    python -m utils.lineup_history at <user_id> <timestamp ISO>
+    python -m utils.lineup_history compact [--days N]
+    python -m utils.lineup_history import-legacy   # antigos times/history/<user>/*.json
+"""
+import os
+import sys
+import json
+import glob
+import struct
+from datetime import datetime, timezone, timedelta
+
+from utils import storage
+
+HISTORY_DIR = storage.HISTORY_DIR
+KEYFRAME_EVERY = 32
+COMPACT_EVERY = 512      # compactação automática a cada N versões gravadas
+RETENTION_DAYS = 365
+IGNORED_FIELDS = ("user_id", "atualizado_em")  # não contam como mudança de time
+_REC = struct.Struct("<qqq")
+
+
+def _paths(user_id, base_dir):
+    base = os.path.join(base_dir, user_id)
+    return base + ".jsonl", base + ".idx"
+
+
+def to_us(ts):
+    """Timestamp (datetime, ISO 8601 com ou sem Z, ou epoch em segundos) -> µs desde a epoch (UTC)."""
+    if isinstance(ts, (int, float)):
+        return int(ts * 1_000_000)
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp() * 1_000_000)
+
+
+def _iso(us):
+    return datetime.fromtimestamp(us / 1_000_000, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _append_bytes(path, data):
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+        getattr(os, "fdatasync", os.fsync)(fd)
+    finally:
+        os.close(fd)
+
+
+def _line(rec):
+    return (json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+# ------------------------
+# Delta
+# ------------------------
+def _strip(lineup):
+    return {k: v for k, v in (lineup or {}).items() if k not in IGNORED_FIELDS}
+
+
+def diff(old, new):
+    """Registro de delta que leva old a new."""
+    rec = {}
+    old_time, new_time = old.get("time") or [], new.get("time") or []
+    old_set, new_set = set(old_time), set(new_time)
+    removed = [p for p in old_time if p not in new_set]
+    added = [p for p in new_time if p not in old_set]
+    if [p for p in old_time if p in new_set] + added != new_time:
+        rec["time"] = list(new_time)  # só mudou a ordem: grava o time inteiro
+    else:
+        if removed:
+            rec["del"] = removed
+        if added:
+            rec["add"] = added
+    changed = {k: v for k, v in new.items() if k != "time" and old.get(k) != v}
+    unset = [k for k in old if k != "time" and k not in new]
+    if changed:
+        rec["set"] = changed
+    if unset:
+        rec["unset"] = unset
+    return rec
+
+
+def apply_record(state, rec):
+    """Estado após o registro (keyframe ou delta); não altera state."""
+    if "full" in rec:
+        return dict(rec["full"])
+    out = dict(state)
+    if "time" in rec:
+        out["time"] = list(rec["time"])
+    elif "add" in rec or "del" in rec:
+        removed = set(rec.get("del", ()))
+        out["time"] = [p for p in out.get("time") or [] if p not in removed] + list(rec.get("add", ()))
+    out.update(rec.get("set") or {})
+    for k in rec.get("unset") or ():
+        out.pop(k, None)
+    return out
+
+
+# ------------------------
+# Índice
+# ------------------------
+def _count(idx_f):
+    idx_f.seek(0, os.SEEK_END)
+    return idx_f.tell() // _REC.size
+
+
+def _entry(idx_f, i):
+    idx_f.seek(i * _REC.size)
+    return _REC.unpack(idx_f.read(_REC.size))
+
+
+def _bisect(idx_f, n, t_us):
+    """Maior i com ts_i <= t_us (-1 se nenhum): O(log n) seeks no índice."""
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _entry(idx_f, mid)[0] <= t_us:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo - 1
+
+
+def _state_through(log_f, kf_off, off):
+    """Reconstrói o estado lendo do keyframe em kf_off até a linha em off (inclusive)."""
+    log_f.seek(kf_off)
+    state, pos = {}, kf_off
+    while pos <= off:
+        line = log_f.readline()
+        if not line:
+            break
+        state = apply_record(state, json.loads(line))
+        pos += len(line)
+    return state
+
+
+def _repair(log_path, idx_path):
+    """
+    Deixa log e índice consistentes depois de uma queda: indexa linhas completas
+    que ficaram sem entrada no índice e corta uma última linha incompleta.
+    """
+    if not os.path.exists(log_path):
+        return
+    with open(idx_path, "ab+") as idx_f, open(log_path, "rb+") as log_f:
+        n = _count(idx_f)
+        if idx_f.tell() != n * _REC.size:
+            idx_f.truncate(n * _REC.size)
+        if n:
+            last_ts, off, kf_off = _entry(idx_f, n - 1)
+            log_f.seek(off)
+            pos = off + len(log_f.readline())
+        else:
+            last_ts, kf_off, pos = 0, 0, 0
+        log_f.seek(pos)
+        pending = b""
+        for line in iter(log_f.readline, b""):
+            try:
+                rec = json.loads(line) if line.endswith(b"\n") else None
+            except ValueError:
+                rec = None
+            if rec is None:
+                break
+            last_ts = max(last_ts, to_us(rec["ts"]))
+            if "full" in rec:
+                kf_off = pos
+            pending += _REC.pack(last_ts, pos, kf_off)
+            pos += len(line)
+        if pending:
+            idx_f.seek(0, os.SEEK_END)
+            idx_f.write(pending)
+            idx_f.flush()
+            os.fsync(idx_f.fileno())
+        log_f.seek(0, os.SEEK_END)
+        if log_f.tell() != pos:
+            log_f.truncate(pos)
+
+
+# ------------------------
+# Gravação / consulta
+# ------------------------
+def append(user_id, lineup, base_dir=HISTORY_DIR):
+    """
+    Acrescenta uma versão do time ao histórico do usuário (timestamp = atualizado_em).
+    Versões iguais à anterior não são gravadas. Retorna True se gravou.
+    """
+    log_path, idx_path = _paths(user_id, base_dir)
+    new = _strip(lineup)
+    with storage.file_lock(log_path):
+        _repair(log_path, idx_path)
+        last_ts, state, n, offset = 0, None, 0, 0
+        if os.path.exists(log_path):
+            offset = os.path.getsize(log_path)
+            with open(idx_path, "rb") as idx_f, open(log_path, "rb") as log_f:
+                n = _count(idx_f)
+                if n:
+                    last_ts, off, kf_off = _entry(idx_f, n - 1)
+                    state = _state_through(log_f, kf_off, off)
+        if state == new:
+            return False
+        ts_us = max(to_us(lineup.get("atualizado_em") or datetime.now(timezone.utc)), last_ts)
+        if n % KEYFRAME_EVERY == 0:
+            rec, kf_off = {"ts": _iso(ts_us), "full": new}, offset
+        else:
+            rec = {"ts": _iso(ts_us), **diff(state, new)}
+        _append_bytes(log_path, _line(rec))
+        _append_bytes(idx_path, _REC.pack(ts_us, offset, kf_off))
+        if (n + 1) % COMPACT_EVERY == 0:
+            _compact_locked(log_path, idx_path, to_us(datetime.now(timezone.utc) - timedelta(days=RETENTION_DAYS)))
+    return True
+
+
+def lineup_at(user_id, timestamp, base_dir=HISTORY_DIR):
+    """Time do usuário vigente em timestamp (None se não havia time salvo até lá)."""
+    log_path, idx_path = _paths(user_id, base_dir)
+    t_us = to_us(timestamp)
+    with storage.file_lock(log_path, shared=True):
+        try:
+            with open(idx_path, "rb") as idx_f, open(log_path, "rb") as log_f:
+                i = _bisect(idx_f, _count(idx_f), t_us)
+                if i < 0:
+                    return None
+                ts_us, off, kf_off = _entry(idx_f, i)
+                state = _state_through(log_f, kf_off, off)
+        except FileNotFoundError:
+            return None
+    return {**state, "user_id": user_id, "atualizado_em": _iso(ts_us)}
+
+
+def _read_versions(log_path):
+    """[(ts_us, estado)] de todas as versões do log, em ordem."""
+    versions, state = [], {}
+    with open(log_path, "rb") as f:
+        for line in f:
+            rec = json.loads(line)
+            state = apply_record(state, rec)
+            versions.append((to_us(rec["ts"]), state))
+    return versions
+
+
+def _compact_locked(log_path, idx_path, before_us=None):
+    versions = _read_versions(log_path)
+    kept = []
+    for ts_us, state in versions:
+        if before_us is not None and ts_us < before_us and kept and kept[-1][0] < before_us:
+            kept[-1] = (ts_us, state)  # dobra as versões antigas na mais recente delas
+        elif not kept or kept[-1][1] != state:
+            kept.append((ts_us, state))
+    log_bytes, idx_bytes, offset, kf_off, prev = [], [], 0, 0, None
+    for i, (ts_us, state) in enumerate(kept):
+        if i % KEYFRAME_EVERY == 0:
+            rec, kf_off = {"ts": _iso(ts_us), "full": state}, offset
+        else:
+            rec = {"ts": _iso(ts_us), **diff(prev, state)}
+        line = _line(rec)
+        log_bytes.append(line)
+        idx_bytes.append(_REC.pack(ts_us, offset, kf_off))
+        offset += len(line)
+        prev = state
+    storage.write_atomic(log_path, b"".join(log_bytes))
+    storage.write_atomic(idx_path, b"".join(idx_bytes))
+    return len(versions), len(kept)
+
+
+def compact(user_id, before=None, base_dir=HISTORY_DIR):
+    """
+    Reescreve o log do usuário: versões anteriores a before (timestamp) viram uma
+    só, versões repetidas somem e os keyframes são redistribuídos.
+    Retorna (versões antes, versões depois).
+    """
+    log_path, idx_path = _paths(user_id, base_dir)
+    if not os.path.exists(log_path):
+        return 0, 0
+    with storage.file_lock(log_path):
+        _repair(log_path, idx_path)
+        return _compact_locked(log_path, idx_path, to_us(before) if before is not None else None)
+
+
+def versions(user_id, base_dir=HISTORY_DIR):
+    """Todas as versões do time do usuário, em ordem (atualizado_em = ts da versão)."""
+    log_path, idx_path = _paths(user_id, base_dir)
+    if not os.path.exists(log_path):
+        return []
+    with storage.file_lock(log_path):
+        _repair(log_path, idx_path)
+        return [{**state, "user_id": user_id, "atualizado_em": _iso(ts_us)}
+                for ts_us, state in _read_versions(log_path)]
+
+
+def list_users(base_dir=HISTORY_DIR):
+    return sorted(os.path.basename(p)[:-6] for p in glob.glob(os.path.join(base_dir, "*.jsonl")))
+
+
+def import_legacy(base_dir=HISTORY_DIR):
+    """Importa (e remove) as cópias antigas times/history/<user_id>/<ts>.json. Retorna quantas."""
+    n = 0
+    for user_dir in sorted(p for p in glob.glob(os.path.join(base_dir, "*")) if os.path.isdir(p)):
+        user_id = os.path.basename(user_dir)
+        for path in sorted(glob.glob(os.path.join(user_dir, "*.json"))):
+            lineup = storage.read_json(path)
+            if isinstance(lineup, dict):
+                if not lineup.get("atualizado_em"):
+                    lineup["atualizado_em"] = datetime.strptime(
+                        os.path.basename(path)[:-5], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc).isoformat()
+                append(user_id, lineup, base_dir=base_dir)
+            os.remove(path)
+            n += 1
+        try:
+            os.rmdir(user_dir)
+        except OSError:
+            pass
+    return n
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    cmd = args[0] if args else None
+    if cmd == "at" and len(args) == 3:
+        print(json.dumps(lineup_at(args[1], args[2]), ensure_ascii=False, indent=2))
+    elif cmd == "compact":
+        days = int(args[args.index("--days") + 1]) if "--days" in args else RETENTION_DAYS
+        before = datetime.now(timezone.utc) - timedelta(days=days)
+        for uid in list_users():
+            print("%s\t%d -> %d versões" % ((uid,) + compact(uid, before=before)))
+    elif cmd == "import-legacy":
+        print(f"importados: {import_legacy()}")
+    else:
+        print("uso: python -m utils.lineup_history (at <user_id> <timestamp> | compact [--days N] | import-legacy)")
+        sys.exit(2)
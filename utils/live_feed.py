@@ -0,0 +1,117 @@
+# utils/live_feed.py
+"""
+Feed de mudanças da partida ao vivo, para o placar dos espectadores.
+
+A fonte é o journal do olheiro (utils.live_match). O processo mantém, por
+journal, o estado reconstruído e a lista de operações já lidas; cada pergunta
+"o que mudou desde a versão N" custa no máximo um stat (limitado a um por
+CHECK_INTERVAL por journal, para todos os espectadores juntos) e devolve
+"not_modified", um delta com as operações novas ou, se o journal foi
+recriado, o estado completo.
+
+Versão: (epoch, n). n é o número de operações lidas (só cresce); epoch muda
+quando o arquivo é substituído/truncado, e aí o espectador recebe um "reset".
+"""
+import os
+import copy
+import json
+import time
+import threading
+
+from utils import live_match
+
+CHECK_INTERVAL = 1.0  # segundos entre stats do mesmo journal
+
+_feeds = {}
+_lock = threading.Lock()
+_epoch_counter = 0
+
+
+def _new_feed(path):
+    global _epoch_counter
+    _epoch_counter += 1
+    return {"path": path, "epoch": _epoch_counter, "ino": None, "offset": 0,
+            "ops": [], "state": live_match.new_state(), "checked_at": 0.0}
+
+
+def _advance(feed, now):
+    """Lê as linhas novas do journal (a partir do offset já lido). False se o journal sumiu."""
+    try:
+        st = os.stat(feed["path"])
+    except FileNotFoundError:
+        return False
+    feed["checked_at"] = now
+    if feed["ino"] is not None and (st.st_ino != feed["ino"] or st.st_size < feed["offset"]):
+        # arquivo recriado ou truncado (repair): recomeça com nova epoch
+        fresh = _new_feed(feed["path"])
+        feed.clear()
+        feed.update(fresh)
+    feed["ino"] = st.st_ino
+    if st.st_size == feed["offset"]:
+        return True
+    with open(feed["path"], "rb") as f:
+        f.seek(feed["offset"])
+        data = f.read()
+    # só linhas completas; uma linha em escrita fica para a próxima leitura.
+    # Como em live_match.read_ops, para na primeira linha inválida: o offset
+    # avança só pelos bytes consumidos, sem pular o que vem depois dela
+    consumed = 0
+    while True:
+        nl = data.find(b"\n", consumed)
+        if nl < 0:
+            break
+        try:
+            op = json.loads(data[consumed:nl])
+        except ValueError:
+            break
+        live_match.apply_op(feed["state"], op)
+        feed["ops"].append(op)
+        consumed = nl + 1
+    feed["offset"] += consumed
+    return True
+
+
+def changes_since(path, version=None, now=None):
+    """
+    Mudanças do journal desde version ((epoch, n) ou None). Retorna um dict com
+    "status" em {"not_modified", "delta", "reset", "gone"} e "version"; "delta"
+    traz "ops" e "reset" traz "state" (cópia).
+    """
+    now = time.time() if now is None else now
+    with _lock:
+        feed = _feeds.get(path)
+        if feed is None:
+            feed = _feeds[path] = _new_feed(path)
+            feed["checked_at"] = -CHECK_INTERVAL
+        if now - feed["checked_at"] >= CHECK_INTERVAL:
+            if not _advance(feed, now):
+                _feeds.pop(path, None)
+                return {"status": "gone", "version": None}
+        current = (feed["epoch"], len(feed["ops"]))
+        if version == current:
+            return {"status": "not_modified", "version": current}
+        if version is not None and version[0] == feed["epoch"] and version[1] <= current[1]:
+            return {"status": "delta", "version": current, "ops": feed["ops"][version[1]:]}
+        return {"status": "reset", "version": current, "state": copy.deepcopy(feed["state"])}
+
+
+def apply_changes(state, changes):
+    """Aplica a resposta de changes_since ao estado local do espectador. Retorna o novo estado (ou None)."""
+    status = changes["status"]
+    if status == "gone":
+        return None
+    if status == "reset":
+        return changes["state"]
+    if status == "delta":
+        for op in changes["ops"]:
+            live_match.apply_op(state, op)
+    return state
+
+
+def live_journals(rodada_ids, rodadas_dir=os.path.join("database", "rodadas")):
+    """[(rodada_id, journal)] das partidas em andamento nas rodadas dadas (abertas)."""
+    out = []
+    for rid in rodada_ids:
+        for path in live_match.list_journals(os.path.join(rodadas_dir, rid)):
+            out.append((rid, path))
+    return out
@@ -0,0 +1,162 @@
+# utils/live_match.py
+"""
+Journal (JSONL, só acrescenta) da partida ao vivo do console do olheiro.
+
+Cada ação (atribuir jogador, gol/assistência, desfazer, iniciar/pausar) vira
+uma linha em database/rodadas/<rodada>/live/<live_id>.jsonl. Gravar custa um
+append pequeno (tamanho constante), não a reescrita do estado inteiro, e o
+estado da partida pode ser reconstruído do journal depois de um refresh do
+navegador ou de um restart do servidor. O arquivo final da partida é gerado a
+partir do mesmo journal.
+
+Operações (campo "op"):
+  snapshot {"state"}                         estado inicial (primeira linha)
+  clock    {"running", "start_time", "elapsed"}
+  assign   {"pid", "team"}
+  event    {"ev", "delta_scorer", "delta_assister"}
+  undo     {}
+"""
+import os
+import json
+import time
+import uuid
+import glob
+import copy
+
+LIVE_DIRNAME = "live"
+
+
+def new_state():
+    return {
+        "running": False,
+        "start_time": None,
+        "elapsed": 0.0,
+        "team_assign": {},   # player_id -> 0/1/2 (0 = none, 1 = team1, 2 = team2)
+        "score": {"team1": 0, "team2": 0},
+        "events": [],  # list of {time, type, team, scorer, assister}
+        "player_stats": {}  # player_id -> {"gols", "assistencias"} nesta partida (exibição)
+    }
+
+
+# ------------------------
+# Transições de estado (as mesmas para a sessão e para o replay)
+# ------------------------
+def _bump_stat(state, pid, campo, delta, base):
+    stats = state["player_stats"].setdefault(pid, {"gols": 0, "assistencias": 0})
+    base_val = (base or {}).get(pid, {}).get(campo, 0)
+    # nunca exibe total negativo (mesma regra do desfazer)
+    stats[campo] = max(-base_val, stats[campo] + delta)
+
+
+def apply_op(state, op, base=None):
+    """Aplica uma operação ao estado (in-place). base: jogadores (totais em disco), para exibição."""
+    kind = op.get("op")
+    if kind == "snapshot":
+        state.clear()
+        state.update(copy.deepcopy(op["state"]))
+        state.setdefault("player_stats", {})
+    elif kind == "clock":
+        state["running"] = op["running"]
+        state["start_time"] = op["start_time"]
+        state["elapsed"] = op["elapsed"]
+    elif kind == "assign":
+        state["team_assign"][op["pid"]] = op["team"]
+    elif kind == "event":
+        ev = dict(op["ev"])
+        state["events"].append(ev)
+        team_num = 1 if ev.get("team") == "team1" else 2
+        if ev.get("type") == "gol" and ev.get("scorer"):
+            state["score"][f"team{team_num}"] += op.get("delta_scorer", 0)
+            _bump_stat(state, ev["scorer"], "gols", op.get("delta_scorer", 0), base)
+        if ev.get("assister") and op.get("delta_assister", 0) != 0:
+            _bump_stat(state, ev["assister"], "assistencias", op["delta_assister"], base)
+    elif kind == "undo":
+        if not state["events"]:
+            return
+        last = state["events"].pop()
+        if last.get("type") == "gol" and last.get("scorer"):
+            _bump_stat(state, last["scorer"], "gols", -1, base)
+            team = "team1" if last.get("team") == "team1" else "team2"
+            state["score"][team] = max(0, state["score"][team] - 1)
+        if last.get("assister"):
+            _bump_stat(state, last["assister"], "assistencias", -1, base)
+    else:
+        raise ValueError(f"operação desconhecida: {kind}")
+
+
+# ------------------------
+# Journal em disco
+# ------------------------
+def live_dir(rodada_dir):
+    return os.path.join(rodada_dir, LIVE_DIRNAME)
+
+
+def new_journal(rodada_dir, state):
+    """Cria o journal de uma nova partida com o snapshot do estado atual. Retorna o caminho."""
+    os.makedirs(live_dir(rodada_dir), exist_ok=True)
+    path = os.path.join(live_dir(rodada_dir), f"{uuid.uuid4().hex[:12]}.jsonl")
+    append_op(path, {"op": "snapshot", "state": state})
+    return path
+
+
+def append_op(path, op):
+    """Acrescenta uma linha ao journal (O_APPEND + fdatasync): custo constante por ação."""
+    record = dict(op)
+    record.setdefault("ts", time.time())
+    line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+        getattr(os, "fdatasync", os.fsync)(fd)
+    finally:
+        os.close(fd)
+
+
+def read_ops(path):
+    """Operações do journal, em ordem; uma última linha incompleta (queda no meio do append) é ignorada."""
+    ops = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    ops.append(json.loads(line))
+                except ValueError:
+                    break
+    except FileNotFoundError:
+        pass
+    return ops
+
+
+def repair(path):
+    """Corta uma última linha incompleta (antes de retomar a partida e voltar a acrescentar)."""
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            f.truncate(end)
+
+
+def replay(path, base=None):
+    """Reconstrói o estado da partida a partir do journal (None se vazio/inválido)."""
+    ops = read_ops(path)
+    if not ops or ops[0].get("op") != "snapshot":
+        return None
+    state = new_state()
+    for op in ops:
+        apply_op(state, op, base)
+    return state
+
+
+def list_journals(rodada_dir):
+    """Journals de partidas não finalizadas da rodada, mais antigos primeiro."""
+    paths = glob.glob(os.path.join(live_dir(rodada_dir), "*.jsonl"))
+    return sorted(paths, key=lambda p: os.path.getmtime(p))
+
+
+def discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
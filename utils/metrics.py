@@ -0,0 +1,320 @@
+# utils/metrics.py
+"""
+Instrumentação leve por rerun: cada execução de uma página (ou fragmento) vira
+uma árvore de spans (nome, ms, filhos) gravada como uma linha em
+database/metrics/metrics.jsonl (rotativo: MAX_BYTES por arquivo, BACKUPS
+arquivos antigos).
+
+    metrics.begin_rerun("admin")      # topo da página
+    metrics.section("rodadas")        # seções de render (fecha a anterior)
+    with metrics.span("github"): ...  # trechos / helpers de I/O
+    @metrics.timed("storage.write_atomic")
+    metrics.end_rerun()               # fim da página
+
+Fora de um rerun (threads de fundo, linha de comando) os spans não fazem
+nada além de um getattr. Reruns interrompidos por st.stop()/st.rerun() são
+gravados no begin_rerun seguinte da mesma thread, com status "interrompido"
+e fim no último span fechado.
+
+Um rerun pode ser perfilado com cProfile: request_profile(pagina) marca a
+próxima execução daquela página, e o relatório vai para
+database/metrics/profile-<pagina>-<ts>.txt.
+
+Desligável com FUTEBOL_METRICS=0.
+"""
+import io
+import os
+import math
+import json
+import time
+import pstats
+import cProfile
+import functools
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+METRICS_DIR = os.path.join("database", "metrics")
+METRICS_FILE = os.path.join(METRICS_DIR, "metrics.jsonl")
+PROFILE_REQUEST = os.path.join(METRICS_DIR, "profile_request")
+MAX_BYTES = 5 * 1024 * 1024
+BACKUPS = 3
+ENABLED = os.environ.get("FUTEBOL_METRICS", "1") != "0"
+
+_local = threading.local()
+
+
+# ------------------------
+# Spans
+# ------------------------
+def _open(name):
+    node = {"name": name, "children": [], "_t0": time.perf_counter()}
+    _local.stack[-1]["children"].append(node)
+    _local.stack.append(node)
+    return node
+
+
+def _close(node):
+    now = time.perf_counter()
+    node["ms"] = round((now - node.pop("_t0")) * 1000, 3)
+    _local.last = now
+    stack = _local.stack or []
+    # tira da pilha o nó e filhos que ficaram abertos (exceção no meio de uma seção)
+    for i in range(len(stack) - 1, 0, -1):
+        if stack[i] is node:
+            del stack[i:]
+            break
+
+
+def _active():
+    return bool(getattr(_local, "stack", None))
+
+
+@contextmanager
+def span(name):
+    if not _active():
+        yield
+        return
+    node = _open(name)
+    try:
+        yield
+    finally:
+        if "_t0" in node:
+            _close(node)
+
+
+def timed(name):
+    """Decorator: a função vira um span (sem custo fora de um rerun)."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _active():
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def section(name):
+    """Abre a seção de render name no nível da página, fechando a anterior."""
+    if not _active():
+        return
+    prev = getattr(_local, "section", None)
+    if prev is not None and "_t0" in prev:
+        _close(prev)
+    del _local.stack[1:]
+    _local.section = _open(f"render.{name}")
+
+
+# ------------------------
+# Reruns
+# ------------------------
+def begin_rerun(page):
+    """Início da execução da página (grava antes um rerun anterior interrompido nesta thread)."""
+    if not ENABLED:
+        return
+    if _active():
+        _finish("interrompido")
+    root = {"name": page, "children": [], "_t0": time.perf_counter(),
+            "ts": datetime.now(timezone.utc).isoformat()}
+    _local.stack = [root]
+    _local.section = None
+    _local.last = root["_t0"]
+    _local.profiler = _claim_profile(page)
+
+
+def end_rerun():
+    if _active():
+        _finish("ok")
+
+
+@contextmanager
+def rerun(page):
+    """Rerun de um fragmento (ou bloco): dentro de um rerun da página vira só um span."""
+    if _active() or not ENABLED:
+        with span(page):
+            yield
+        return
+    begin_rerun(page)
+    try:
+        yield
+    finally:
+        end_rerun()
+
+
+def fragment_rerun(page):
+    """Decorator para funções de fragmento: mesmo que rerun(page)."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with rerun(page):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def _strip(node, end):
+    if "_t0" in node:
+        node["ms"] = round(max(0.0, end - node.pop("_t0")) * 1000, 3)
+    node["children"] = [_strip(c, end) for c in node["children"]]
+    if not node["children"]:
+        del node["children"]
+    return node
+
+
+def _finish(status):
+    stack, root = _local.stack, _local.stack[0]
+    end = time.perf_counter() if status == "ok" else _local.last
+    _local.stack, _local.section = None, None
+    profiler, _local.profiler = getattr(_local, "profiler", None), None
+    del stack[:]
+    record = _strip(root, end)
+    record = {"ts": record.pop("ts"), "page": record["name"], "status": status, "ms": record["ms"],
+              "spans": record.get("children", [])}
+    if profiler is not None:
+        profiler.disable()
+        record["profile"] = _dump_profile(profiler, record["page"])
+    try:
+        _append(record)
+    except OSError:
+        pass
+
+
+# ------------------------
+# Arquivo (JSONL rotativo)
+# ------------------------
+def _append(record, path=METRICS_FILE):
+    from utils.storage import file_lock  # storage importa metrics
+    line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+    with file_lock(path):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if size + len(line) > MAX_BYTES:
+            for k in range(BACKUPS - 1, 0, -1):
+                if os.path.exists(f"{path}.{k}"):
+                    os.replace(f"{path}.{k}", f"{path}.{k + 1}")
+            os.replace(path, f"{path}.1")
+        with open(path, "ab") as f:
+            f.write(line)
+
+
+def load_records(limit=2000, path=METRICS_FILE):
+    """Os últimos limit reruns gravados (do arquivo atual e, se preciso, dos rotacionados)."""
+    lines = []
+    for p in [path] + [f"{path}.{k}" for k in range(1, BACKUPS + 1)]:
+        try:
+            with open(p, "rb") as f:
+                lines = f.read().splitlines() + lines
+        except OSError:
+            continue
+        if len(lines) >= limit:
+            break
+    out = []
+    for line in lines[-limit:]:
+        try:
+            out.append(json.loads(line))
+        except ValueError:
+            continue
+    return out
+
+
+# ------------------------
+# Agregação (painel do admin)
+# ------------------------
+def _pct(sorted_vals, q):
+    """Percentil por posição mais próxima (valores já ordenados)."""
+    if not sorted_vals:
+        return 0.0
+    k = max(0, min(len(sorted_vals), math.ceil(q / 100 * len(sorted_vals))) - 1)
+    return sorted_vals[k]
+
+
+def _walk(nodes, acc):
+    for n in nodes:
+        t = acc.setdefault(n["name"], [0.0, 0])
+        t[0] += n.get("ms", 0.0)
+        t[1] += 1
+        _walk(n.get("children", []), acc)
+
+
+def summarize(records):
+    """
+    {"pages": [{page, reruns, p50, p95, max}], "spans": {page: [{span, reruns, chamadas, p50, p95}]}}.
+    Spans com o mesmo nome em um rerun são somados antes dos percentis.
+    """
+    pages, spans = {}, {}
+    for r in records:
+        pages.setdefault(r["page"], []).append(r["ms"])
+        per_rerun = {}
+        _walk(r.get("spans", []), per_rerun)
+        page_spans = spans.setdefault(r["page"], {})
+        for name, (ms, calls) in per_rerun.items():
+            s = page_spans.setdefault(name, {"ms": [], "calls": 0})
+            s["ms"].append(ms)
+            s["calls"] += calls
+    out = {"pages": [], "spans": {}}
+    for page, vals in sorted(pages.items()):
+        vals.sort()
+        out["pages"].append({"page": page, "reruns": len(vals), "p50": _pct(vals, 50),
+                             "p95": _pct(vals, 95), "max": vals[-1]})
+    for page, page_spans in spans.items():
+        rows = []
+        for name, s in page_spans.items():
+            vals = sorted(s["ms"])
+            rows.append({"span": name, "reruns": len(vals), "chamadas": s["calls"],
+                         "p50": round(_pct(vals, 50), 3), "p95": round(_pct(vals, 95), 3)})
+        out["spans"][page] = sorted(rows, key=lambda r: -r["p95"])
+    return out
+
+
+# ------------------------
+# cProfile de um rerun
+# ------------------------
+def request_profile(page):
+    """Marca a próxima execução de page para ser perfilada."""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with open(PROFILE_REQUEST, "w", encoding="utf-8") as f:
+        f.write(page)
+
+
+def _claim_profile(page):
+    # caminho comum: um stat que falha
+    if not os.path.exists(PROFILE_REQUEST):
+        return None
+    try:
+        with open(PROFILE_REQUEST, "r", encoding="utf-8") as f:
+            if f.read().strip() != page:
+                return None
+        claimed = f"{PROFILE_REQUEST}.{os.getpid()}.{threading.get_ident()}"
+        os.rename(PROFILE_REQUEST, claimed)  # só uma sessão pega o pedido
+        os.remove(claimed)
+    except OSError:
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _dump_profile(profiler, page):
+    buf = io.StringIO()
+    pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(40)
+    path = os.path.join(METRICS_DIR, f"profile-{page}-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}.txt")
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(buf.getvalue())
+    except OSError:
+        return None
+    return path
+
+
+def list_profiles():
+    """Relatórios de cProfile gravados, mais recentes primeiro."""
+    try:
+        names = [n for n in os.listdir(METRICS_DIR) if n.startswith("profile-") and n.endswith(".txt")]
+    except OSError:
+        return []
+    return sorted((os.path.join(METRICS_DIR, n) for n in names), key=os.path.getmtime, reverse=True)
@@ -0,0 +1,223 @@
+# utils/outbox.py
+"""
+Fila persistente (em disco) de uploads para o GitHub.
+
+Cada escrita local enfileira (path_local, repo_path, message) e volta na hora
+(path_local None remove o arquivo do repositório); uma thread em segundo plano
+drena a fila, agrupando tudo o que estiver pronto em um único commit
+(utils.github_sync.commit_files). Se o commit falha, o lote é dividido ao meio
+até isolar o item problemático, e os demais seguem. Falhas são refeitas com
+backoff exponencial; depois de MAX_ATTEMPTS o item fica como "failed" até um
+admin pedir para reenviar.
+
+Há um arquivo por repo_path: enfileirar de novo o mesmo caminho apenas
+atualiza o item existente (coalescência), e o conteúdo enviado é sempre o
+do arquivo local no momento do envio.
+"""
+import os
+import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+from utils import codec
+from utils.github_sync import commit_files, is_configured
+from utils.storage import write_json
+
+OUTBOX_DIR = os.path.join("database", ".outbox")
+MAX_ATTEMPTS = 8
+BASE_DELAY = 2.0     # segundos; dobra a cada tentativa
+MAX_DELAY = 300.0
+POLL_INTERVAL = 5.0
+
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_worker = None
+
+
+def _item_path(repo_path, outbox_dir=OUTBOX_DIR):
+    key = hashlib.sha1(repo_path.encode("utf-8")).hexdigest()
+    return os.path.join(outbox_dir, f"{key}.json")
+
+
+def _read_item(path):
+    try:
+        return codec.load(path)
+    except Exception:
+        return None
+
+
+def _save_item(item, outbox_dir=OUTBOX_DIR):
+    write_json(_item_path(item["repo_path"], outbox_dir), item)
+
+
+def enqueue(path_local, repo_path, message, outbox_dir=OUTBOX_DIR):
+    """Enfileira (ou atualiza, se o mesmo repo_path já estiver na fila) um upload."""
+    repo_path = repo_path.replace("\\", "/")
+    now = time.time()
+    with _lock:
+        item = _read_item(_item_path(repo_path, outbox_dir)) or {"created_at": now}
+        item.update({
+            "path_local": path_local,
+            "repo_path": repo_path,
+            "message": message,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt": now,
+            "last_error": None,
+            "updated_at": now,
+            "seq": int(item.get("seq", 0)) + 1,
+        })
+        _save_item(item, outbox_dir)
+    _wakeup.set()
+    return item
+
+
+def enqueue_many(files, message, outbox_dir=OUTBOX_DIR):
+    """Enfileira [(path_local, repo_path), ...] com a mesma mensagem."""
+    for path_local, repo_path in files:
+        enqueue(path_local, repo_path, message, outbox_dir=outbox_dir)
+
+
+def list_items(outbox_dir=OUTBOX_DIR):
+    """Todos os itens da fila, mais antigos primeiro."""
+    if not os.path.exists(outbox_dir):
+        return []
+    items = []
+    for fname in os.listdir(outbox_dir):
+        if not fname.endswith(".json"):
+            continue
+        item = _read_item(os.path.join(outbox_dir, fname))
+        if item:
+            items.append(item)
+    items.sort(key=lambda it: it.get("created_at", 0))
+    return items
+
+
+def status(outbox_dir=OUTBOX_DIR):
+    """{"pending": [...], "failed": [...]} para o painel do admin."""
+    items = list_items(outbox_dir)
+    return {
+        "pending": [it for it in items if it.get("status") == "pending"],
+        "failed": [it for it in items if it.get("status") == "failed"],
+    }
+
+
+def retry_failed(outbox_dir=OUTBOX_DIR):
+    """Volta os itens com falha para pending (tentativas zeradas). Retorna quantos."""
+    n = 0
+    with _lock:
+        for item in list_items(outbox_dir):
+            if item.get("status") == "failed":
+                item.update({"status": "pending", "attempts": 0, "next_attempt": time.time()})
+                _save_item(item, outbox_dir)
+                n += 1
+    if n:
+        _wakeup.set()
+    return n
+
+
+def _message(items):
+    messages = list(dict.fromkeys(it["message"] for it in items))
+    return messages[0] if len(messages) == 1 else "Sincroniza alterações\n\n" + "\n".join(f"- {m}" for m in messages)
+
+
+def _commit(items, config):
+    return commit_files([(it["path_local"], it["repo_path"]) for it in items], _message(items), config)
+
+
+def _send(items, config, error=None):
+    """
+    Envia items em um commit; se falhar (ou se já se sabe que falha: error),
+    divide o lote ao meio e tenta cada metade, isolando o item problemático em
+    O(log n) commits. Se as duas metades falham, o erro é do lote todo (rede,
+    token) e não divide mais. Retorna {repo_path: (ok, msg)}.
+    """
+    if error is None:
+        ok, msg = _commit(items, config)
+        if ok:
+            return {it["repo_path"]: (True, msg) for it in items}
+        error = msg
+    if len(items) == 1:
+        return {items[0]["repo_path"]: (False, error)}
+    mid = len(items) // 2
+    halves = [(half,) + _commit(half, config) for half in (items[:mid], items[mid:])]
+    if not any(ok for _, ok, _ in halves):
+        return {it["repo_path"]: (False, error) for it in items}
+    out = {}
+    for half, ok, msg in halves:
+        if ok:
+            out.update({it["repo_path"]: (True, msg) for it in half})
+        else:
+            out.update(_send(half, config, error=msg))
+    return out
+
+
+def drain_once(config, outbox_dir=OUTBOX_DIR, now=None):
+    """
+    Envia em um único commit todos os itens pendentes cujo backoff já venceu
+    (path_local None = remoção do arquivo no repositório). Se o commit falha,
+    o lote é dividido para que um item ruim não segure os outros.
+    Retorna (enviados, falhos).
+    """
+    now = time.time() if now is None else now
+    with _lock:
+        due = [it for it in list_items(outbox_dir)
+               if it.get("status") == "pending" and it.get("next_attempt", 0) <= now]
+    if not due:
+        return 0, 0
+
+    missing = [it for it in due if it["path_local"] is not None and not os.path.exists(it["path_local"])]
+    ready = [it for it in due if it not in missing]
+    results = _send(ready, config) if ready else {}
+
+    sent, failed = 0, 0
+    with _lock:
+        for it in due:
+            ok, msg = results.get(it["repo_path"], (False, "arquivo local não encontrado"))
+            path = _item_path(it["repo_path"], outbox_dir)
+            current = _read_item(path)
+            if current is None or current.get("seq") != it.get("seq"):
+                # foi enfileirado de novo durante o envio: o item novo continua na fila
+                if ok:
+                    sent += 1
+                continue
+            if ok:
+                os.remove(path)
+                sent += 1
+                continue
+            attempts = int(current.get("attempts", 0)) + 1
+            current["attempts"] = attempts
+            current["last_error"] = msg
+            current["last_attempt_at"] = datetime.now(timezone.utc).isoformat()
+            if attempts >= MAX_ATTEMPTS or it in missing:
+                current["status"] = "failed"
+                failed += 1
+            else:
+                current["next_attempt"] = now + min(MAX_DELAY, BASE_DELAY * (2 ** (attempts - 1)))
+            _save_item(current, outbox_dir)
+    return sent, failed
+
+
+def _run(config, outbox_dir):
+    while True:
+        _wakeup.wait(POLL_INTERVAL)
+        _wakeup.clear()
+        try:
+            drain_once(config, outbox_dir)
+        except Exception:
+            # o worker nunca morre; o erro fica registrado nos itens na próxima tentativa
+            pass
+
+
+def start_worker(config, outbox_dir=OUTBOX_DIR):
+    """Inicia (uma vez por processo) a thread que drena a fila. Sem GitHub configurado não faz nada."""
+    global _worker
+    if not is_configured(config):
+        return False
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, args=(config, outbox_dir), name="github-outbox", daemon=True)
+            _worker.start()
+    _wakeup.set()
+    return True
@@ -0,0 +1,107 @@
+# utils/perfis.py
+"""
+Índice e-mail (minúsculo) -> perfil em users/perfis (nome do arquivo, sem
+.json, que é o user_id com que salvar_perfil grava o perfil).
+
+Mantido a cada gravação de perfil (update_email_index, só a entrada do
+perfil, e só se ela mudou) e reconstruível a partir do disco
+(rebuild_email_index, quando o índice falta ou está corrompido). A leitura
+passa por utils.cache, então um login custa um stat + um lookup em dict,
+independente do número de perfis.
+
+Perfis copiados para users/perfis sem passar por salvar_perfil só entram no
+índice com a reconstrução:
+
+    python -m utils.perfis rebuild
+"""
+import os
+import sys
+
+from utils import cache, codec, metrics
+from utils.storage import write_json, file_lock
+
+PERFIS_DIR = os.path.join("users", "perfis")
+EMAIL_INDEX_FILE = os.path.join("users", "email_index.json")
+
+
+def normalize_email(email):
+    return (email or "").strip().lower()
+
+
+@metrics.timed("perfis.scan")
+def _scan_index(perfis_dir):
+    emails = {}
+    if not os.path.exists(perfis_dir):
+        return emails
+    for fname in sorted(os.listdir(perfis_dir)):
+        if not fname.lower().endswith(".json"):
+            continue
+        try:
+            data = codec.load(os.path.join(perfis_dir, fname))
+        except Exception:
+            continue
+        email = normalize_email(data.get("email"))
+        # em caso de e-mail repetido vale o primeiro perfil em ordem de nome de arquivo
+        if email and email not in emails:
+            emails[email] = fname[:-5]
+    return emails
+
+
+def _write_index(index_path, emails):
+    index = {"emails": dict(sorted(emails.items()))}
+    write_json(index_path, index)
+    return index
+
+
+def rebuild_email_index(perfis_dir=PERFIS_DIR, index_path=EMAIL_INDEX_FILE):
+    """Reconstrói o índice lendo todos os perfis em disco (fallback/reparo)."""
+    with file_lock(index_path):
+        return _write_index(index_path, _scan_index(perfis_dir))
+
+
+def update_email_index(user_id, perfil, perfis_dir=PERFIS_DIR, index_path=EMAIL_INDEX_FILE):
+    """Atualiza a entrada do perfil gravado em <user_id>.json (chamar depois de gravar)."""
+    with file_lock(index_path):
+        index = None
+        try:
+            index = codec.load(index_path)
+        except Exception:
+            index = None
+        if not isinstance(index, dict) or not isinstance(index.get("emails"), dict):
+            _write_index(index_path, _scan_index(perfis_dir))
+            return
+        emails = index["emails"]
+        email = normalize_email(perfil.get("email"))
+        stale = [e for e, uid in emails.items() if uid == user_id and e != email]
+        if not stale and (not email or email in emails):
+            return  # entrada já correta (caso comum: login regravando o mesmo perfil)
+        for e in stale:
+            del emails[e]
+        if email:
+            emails.setdefault(email, user_id)
+        _write_index(index_path, emails)
+
+
+def load_email_index(perfis_dir=PERFIS_DIR, index_path=EMAIL_INDEX_FILE):
+    """
+    {email: user_id}; reconstrói só se o índice não existir ou for inválido.
+    """
+    data = cache.load_json(index_path)
+    if not isinstance(data, dict) or not isinstance(data.get("emails"), dict):
+        data = rebuild_email_index(perfis_dir=perfis_dir, index_path=index_path)
+    return data["emails"]
+
+
+def lookup_perfil_key(email, perfis_dir=PERFIS_DIR, index_path=EMAIL_INDEX_FILE):
+    """Nome do arquivo (sem .json) do perfil com esse e-mail, ou None."""
+    email = normalize_email(email)
+    if not email:
+        return None
+    return load_email_index(perfis_dir, index_path).get(email)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("uso: python -m utils.perfis rebuild")
+        sys.exit(2)
+    print(f"{len(rebuild_email_index()['emails'])} e-mail(s) no índice")
@@ -0,0 +1,212 @@
+# utils/projection.py
+"""
+Projeção dos totais dos jogadores a partir das partidas (event sourcing).
+
+Os arquivos de partida das rodadas fechadas são a fonte da verdade: cada
+rodada é reprocessada (resumo -> scores) em paralelo num pool de processos, os
+resultados são somados e gols / assistencias / vitorias / pontos_total /
+pontos_por_rodada de jogadores.json são reescritos a partir deles.
+
+Fechar ou reprocessar rodadas não refaz a temporada: apply_scores soma aos
+totais gravados só a diferença (scores novos - anteriores) das rodadas
+tocadas. O replay completo (rebuild / verify) fica para a linha de comando e
+para o botão de reconstrução do admin.
+
+    python -m utils.projection verify   [--workers N]   # só mostra as diferenças
+    python -m utils.projection rebuild  [--workers N]   # grava os totais projetados
+"""
+import os
+import sys
+import copy
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import storage
+from utils.summary import summary_from_matches
+from utils.scores import compute_scores_from_summary
+
+DEFAULT_FORMULA = {"gol": 8, "assist": 4, "vitoria": 4}
+TOTAL_FIELDS = ("gols", "assistencias", "vitorias", "pontos_total", "pontos_por_rodada")
+PARALLEL_MIN_RODADAS = 4  # abaixo disso o pool custa mais do que economiza
+
+
+def _repo_args(repo):
+    return repo.backend, getattr(repo, "path", None)
+
+
+def _replay_rodada(args):
+    """(backend, sqlite_path, rodada_id) -> (rodada_id, scores). Executa no processo do pool."""
+    from utils.repository import get_repository
+    backend, sqlite_path, rodada_id = args
+    repo = get_repository(backend, sqlite_path)
+    matches = repo.list_matches(rodada_id)
+    previous = repo.get_scores(rodada_id) or {}
+    if not matches:
+        # rodada sem arquivos de partida (dados antigos): vale o scores.json gravado
+        return rodada_id, previous.get("scores", {}) or {}
+    formula = previous.get("points_formula") or DEFAULT_FORMULA
+    summary = summary_from_matches(rodada_id, matches)
+    return rodada_id, compute_scores_from_summary(summary, formula=formula)["scores"]
+
+
+def replay_rodadas(repo, rodada_ids, workers=None):
+    """{rodada_id: scores} reprocessando as partidas de cada rodada (em paralelo se valer a pena)."""
+    backend, sqlite_path = _repo_args(repo)
+    tasks = [(backend, sqlite_path, rid) for rid in rodada_ids]
+    if workers == 1 or len(tasks) < PARALLEL_MIN_RODADAS:
+        return dict(_replay_rodada(t) for t in tasks)
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(_replay_rodada, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+
+def merge_totals(per_rodada):
+    """Soma os scores por rodada em totais por jogador (rodadas em ordem de id)."""
+    totals = {}
+    for rid in sorted(per_rodada):
+        for pid, vals in per_rodada[rid].items():
+            t = totals.setdefault(pid, {"gols": 0, "assistencias": 0, "vitorias": 0,
+                                        "pontos_total": 0, "pontos_por_rodada": {}})
+            t["gols"] += int(vals.get("gols", 0))
+            t["assistencias"] += int(vals.get("assistencias", 0))
+            t["vitorias"] += int(vals.get("vitorias", 0))
+            pontos = int(vals.get("pontos", 0))
+            t["pontos_total"] += pontos
+            t["pontos_por_rodada"][rid] = pontos
+    return totals
+
+
+def project_totals(repo, overrides=None, workers=None):
+    """
+    Totais projetados de todas as rodadas fechadas. overrides: {rodada_id: scores}
+    para rodadas ainda não gravadas como fechadas (a que está sendo fechada).
+    """
+    overrides = overrides or {}
+    closed = [r["id"] for r in repo.list_rodadas(status="closed") if r["id"] not in overrides]
+    per_rodada = replay_rodadas(repo, closed, workers=workers)
+    per_rodada.update(overrides)
+    return merge_totals(per_rodada)
+
+
+def apply_delta(jogadores, rodada_id, new_scores, old_scores=None):
+    """
+    Novo dict de jogadores com os totais de rodada_id trocados: subtrai
+    old_scores (scores já aplicados da rodada, se houver) e soma new_scores.
+    Sem old_scores, jogadores que já têm rodada_id em pontos_por_rodada são
+    pulados (a rodada já foi somada a eles): aplicar duas vezes não duplica.
+    """
+    zeros = {"gols": 0, "assistencias": 0, "vitorias": 0, "pontos_total": 0}
+    out = dict(jogadores)
+    if old_scores is None:
+        new_scores = {pid: vals for pid, vals in (new_scores or {}).items()
+                      if rodada_id not in ((jogadores.get(pid) or {}).get("pontos_por_rodada") or {})}
+
+    def _rec(pid):
+        if pid not in out:
+            # jogador que aparece nas partidas mas não no cadastro
+            out[pid] = {"nome": pid, "valor": 0, "imagem": "", **zeros, "pontos_por_rodada": {}}
+        else:
+            out[pid] = {**zeros, **out[pid]}
+        out[pid]["pontos_por_rodada"] = dict(out[pid].get("pontos_por_rodada") or {})
+        return out[pid]
+
+    for sign, scores in ((-1, old_scores or {}), (1, new_scores or {})):
+        for pid, vals in scores.items():
+            rec = _rec(pid)
+            rec["gols"] += sign * int(vals.get("gols", 0))
+            rec["assistencias"] += sign * int(vals.get("assistencias", 0))
+            rec["vitorias"] += sign * int(vals.get("vitorias", 0))
+            rec["pontos_total"] += sign * int(vals.get("pontos", 0))
+            if sign > 0:
+                rec["pontos_por_rodada"][rodada_id] = int(vals.get("pontos", 0))
+            else:
+                rec["pontos_por_rodada"].pop(rodada_id, None)
+    return out
+
+
+def apply_scores(repo, new_by_rodada, old_by_rodada=None):
+    """
+    Atualiza os totais gravados só com as rodadas informadas, sem reler as
+    partidas: {rodada_id: scores} novos e, para rodadas já aplicadas
+    (reprocessamento), {rodada_id: scores} anteriores. Compare-and-swap em
+    jogadores (entra no batch do chamador, se houver).
+    """
+    old_by_rodada = old_by_rodada or {}
+
+    def attempt():
+        with repo.batch():
+            jogadores = repo.get_jogadores()
+            for rid in sorted(new_by_rodada):
+                jogadores = apply_delta(jogadores, rid, new_by_rodada[rid], old_by_rodada.get(rid))
+            repo.save_jogadores(jogadores)
+    storage.retry_on_conflict(attempt)
+
+
+def project_jogadores(jogadores, totals):
+    """Novo dict de jogadores com os campos de totais substituídos pelos projetados."""
+    zeros = {"gols": 0, "assistencias": 0, "vitorias": 0, "pontos_total": 0, "pontos_por_rodada": {}}
+    out = {}
+    for pid, j in jogadores.items():
+        rec = dict(j)
+        rec.update(copy.deepcopy(totals.get(pid, zeros)))
+        out[pid] = rec
+    for pid, t in totals.items():
+        if pid not in out:
+            # jogador que aparece nas partidas mas não no cadastro
+            out[pid] = {"nome": pid, "valor": 0, "imagem": "", **copy.deepcopy(t)}
+    return out
+
+
+def diff_totals(current, projected):
+    """[{player_id, campo, atual, projetado}] onde os totais divergem."""
+    out = []
+    for pid in sorted(set(current) | set(projected)):
+        cur = current.get(pid) or {}
+        new = projected.get(pid) or {}
+        for campo in TOTAL_FIELDS:
+            a, b = cur.get(campo), new.get(campo)
+            if campo == "pontos_por_rodada":
+                a, b = a or {}, b or {}
+            else:
+                a, b = a or 0, b or 0
+            if a != b:
+                out.append({"player_id": pid, "campo": campo, "atual": a, "projetado": b})
+    return out
+
+
+def rebuild(repo, overrides=None, workers=None, dry_run=False):
+    """
+    Recalcula os totais e grava jogadores (dentro de repo.batch(); se o chamador já
+    abriu um batch, entra nele). A gravação é um compare-and-swap: se jogadores
+    mudou durante o cálculo (ex.: cadastro no admin), relê e recalcula.
+    Retorna a lista de diferenças encontradas.
+    """
+    totals = project_totals(repo, overrides=overrides, workers=workers)
+
+    def attempt():
+        with repo.batch():
+            current = repo.get_jogadores()
+            projected = project_jogadores(current, totals)
+            diffs = diff_totals(current, projected)
+            if diffs and not dry_run:
+                repo.save_jogadores(projected)
+        return diffs
+    return storage.retry_on_conflict(attempt)
+
+
+def verify(repo, workers=None):
+    """Diferenças entre os totais gravados e os projetados (nada é gravado)."""
+    return rebuild(repo, workers=workers, dry_run=True)
+
+
+if __name__ == "__main__":
+    from utils.repository import get_repository
+    args = sys.argv[1:]
+    if not args or args[0] not in ("verify", "rebuild"):
+        print("uso: python -m utils.projection (verify | rebuild) [--workers N]")
+        sys.exit(2)
+    n_workers = int(args[args.index("--workers") + 1]) if "--workers" in args else None
+    repo = get_repository()
+    diffs = rebuild(repo, workers=n_workers, dry_run=(args[0] == "verify"))
+    for d in diffs:
+        print(f"{d['player_id']}\t{d['campo']}\t{d['atual']} -> {d['projetado']}")
+    print(f"{len(diffs)} diferença(s)" + (" gravada(s)" if args[0] == "rebuild" and diffs else ""))
@@ -0,0 +1,103 @@
+# utils/ranking.py
+"""
+Ranking de jogadores calculado uma única vez por (rodada, versão dos dados).
+
+Ordem: pontos desc, gols desc, assistências desc, nome asc. O rank é denso
+(empates em pontos dividem a mesma posição, sem buracos na sequência).
+"""
+import heapq
+import threading
+from collections import OrderedDict
+
+MAX_MEMO = 32
+
+_lock = threading.Lock()
+_memo = OrderedDict()  # (rodada_id, version) -> leaderboard
+
+
+def _score_key(pid, pontos, gols, assistencias, nome):
+    return (-pontos, -gols, -assistencias, (nome or "").lower(), pid)
+
+
+def top_k(scores, k=3, jogadores=None):
+    """
+    Retorna os k melhores (player_id, score_obj) de scores usando heap
+    (O(n log k)), com o mesmo desempate do leaderboard.
+    """
+    jogadores = jogadores or {}
+
+    def key(item):
+        pid, s = item
+        return _score_key(pid, int(s.get("pontos", 0)), int(s.get("gols", 0)),
+                          int(s.get("assistencias", 0)), jogadores.get(pid, {}).get("nome", pid))
+
+    return heapq.nsmallest(k, scores.items(), key=key)
+
+
+def build_leaderboard(jogadores, rodada_scores=None):
+    """
+    Monta o leaderboard completo em uma passada de ordenação.
+    Sem rodada_scores ordena pelos totais acumulados (pontos_total).
+    Retorna {"rows": [...], "top1": player_id | None}.
+    """
+    rows = []
+    for pid, j in jogadores.items():
+        row = {
+            "player_id": pid,
+            "nome": j.get("nome", "—"),
+            "imagem": j.get("imagem", ""),
+            "miniaturas": j.get("miniaturas") or {},
+            "valor": j.get("valor", "—"),
+            "gols_total": int(j.get("gols", 0)),
+            "assistencias_total": int(j.get("assistencias", 0)),
+            "pontos_total": int(j.get("pontos_total", 0)),
+        }
+        if rodada_scores is not None:
+            s = rodada_scores.get(pid) or {}
+            row["gols"] = int(s.get("gols", 0))
+            row["assistencias"] = int(s.get("assistencias", 0))
+            row["vitorias"] = int(s.get("vitorias", 0))
+            row["pontos"] = int(s.get("pontos", 0))
+        rows.append(row)
+
+    if rodada_scores is not None:
+        metric = "pontos"
+        rows.sort(key=lambda r: _score_key(r["player_id"], r["pontos"], r["gols"], r["assistencias"], r["nome"]))
+    else:
+        metric = "pontos_total"
+        rows.sort(key=lambda r: _score_key(r["player_id"], r["pontos_total"], r["gols_total"],
+                                           r["assistencias_total"], r["nome"]))
+
+    rank = 0
+    last = None
+    for r in rows:
+        if r[metric] != last:
+            rank += 1
+            last = r[metric]
+        r["rank"] = rank
+
+    top1 = None
+    if rodada_scores:
+        best = top_k(rodada_scores, 1, jogadores)
+        top1 = best[0][0] if best else None
+    return {"rows": rows, "top1": top1}
+
+
+def get_leaderboard(rodada_id, version, jogadores, rodada_scores=None):
+    """
+    build_leaderboard memorizado por (rodada_id, version), onde version é
+    qualquer valor que mude quando os arquivos de origem mudam (ex.: as
+    assinaturas de cache.file_signature). O resultado é compartilhado: não mutar.
+    """
+    key = (rodada_id, version)
+    with _lock:
+        hit = _memo.get(key)
+        if hit is not None:
+            _memo.move_to_end(key)
+            return hit
+    board = build_leaderboard(jogadores, rodada_scores)
+    with _lock:
+        _memo[key] = board
+        while len(_memo) > MAX_MEMO:
+            _memo.popitem(last=False)
+    return board
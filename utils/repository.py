@@ -0,0 +1,698 @@
+# utils/repository.py
+"""
+Camada de repositório: páginas e utils falam com get_repository() em vez de
+abrir arquivos diretamente.
+
+- JsonRepository: o layout atual (database/jogadores.json, database/rodadas/*,
+  users/perfis/*.json, times/lineups/*.json), com leituras via utils.cache e
+  escritas via utils.storage.
+- SqliteRepository: um arquivo SQLite em modo WAL, com índices por jogador,
+  rodada, partida e e-mail.
+
+O backend é escolhido por configuração (STORAGE_BACKEND = "json" | "sqlite",
+SQLITE_PATH) e há uma ferramenta de migração/exportação entre os dois:
+
+    python -m utils.repository migrate json sqlite [--db database/futebol.sqlite3]
+    python -m utils.repository migrate sqlite json [--db database/futebol.sqlite3]
+
+Os dicts devolvidos pelas leituras podem ser compartilhados (cache): quem
+for alterar deve trabalhar sobre uma cópia (copy.deepcopy).
+
+jogadores tem escrita otimista (compare-and-swap): get_jogadores_versioned()
+devolve (versão, cópia própria), save_jogadores(..., expected_version=v) só
+grava se ninguém gravou depois da leitura (senão storage.VersionConflict) e
+update_jogadores(fn) faz o ciclo ler-alterar-gravar com novas tentativas.
+Dentro de batch() a versão lida é conferida no commit da transação.
+"""
+import os
+import sys
+import json
+import glob
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from utils import cache, metrics, storage
+from utils import rodadas as rodadas_util
+from utils import perfis as perfis_util
+from utils import lineup_history
+from utils.match_id import create_match_file
+from utils.summary import update_running_summary, load_running_summary, load_match_files, empty_summary, fold_match
+
+JOGADORES_FILE = "database/jogadores.json"
+RODADAS_DIR = os.path.join("database", "rodadas")
+PERFIS_DIR = perfis_util.PERFIS_DIR
+LINEUPS_DIR = storage.LINEUPS_DIR
+FANTASY_LEADERBOARD_FILE = os.path.join("database", "fantasy_leaderboard.json")
+DEFAULT_SQLITE_PATH = os.path.join("database", "futebol.sqlite3")
+# arquivos alterados por ler-alterar-gravar de várias sessões: escrita sob
+# <arquivo>.lock e, em transação, a versão lida é conferida no commit (CAS);
+# o meta.json de cada rodada e o catálogo de rodadas também (ver is_versioned)
+VERSIONED_FILES = (os.path.normpath(JOGADORES_FILE), os.path.normpath(FANTASY_LEADERBOARD_FILE))
+
+
+def is_versioned(path):
+    """True para os arquivos gravados com versão: VERSIONED_FILES, o catálogo e database/rodadas/<id>/meta.json."""
+    path = os.path.normpath(path)
+    if path in VERSIONED_FILES or path == os.path.normpath(rodadas_util.CATALOG_FILE):
+        return True
+    return (os.path.basename(path) == "meta.json"
+            and os.path.dirname(os.path.dirname(path)) == os.path.normpath(RODADAS_DIR))
+
+
+def _update_jogadores(repo, fn):
+    """Ciclo otimista comum aos backends: fn altera uma cópia no lugar; conflito = reler e reaplicar."""
+    def attempt():
+        version, jogadores = repo.get_jogadores_versioned()
+        fn(jogadores)
+        repo.save_jogadores(jogadores, expected_version=version)
+        return jogadores
+    return storage.retry_on_conflict(attempt)
+
+
+def _new_meta(rodada_id, nome, admin_user, date_str):
+    return {
+        "id": rodada_id,
+        "nome": nome or f"Rodada {date_str}",
+        "admin": admin_user or "",
+        "inicio": datetime.now(timezone.utc).isoformat(),
+        "fim": None,
+        "status": "open",
+        "matches": [],
+        "match_count": 0
+    }
+
+
+# =========================
+# JSON (layout atual)
+# =========================
+class JsonRepository:
+    backend = "json"
+    syncs_files = True  # os dados são arquivos do repositório (sincronizáveis com o GitHub)
+
+    def __init__(self):
+        self._local = threading.local()
+
+    # --- transação (uma por thread/sessão) ---
+    @contextmanager
+    def batch(self):
+        """Agrupa as escritas do bloco em uma única transação de utils.storage."""
+        if getattr(self._local, "tx", None) is not None:
+            yield
+            return
+        self._local.tx = storage.transaction()
+        self._local.after = []
+        try:
+            with self._local.tx:
+                yield
+            for fn in self._local.after:
+                fn()
+        finally:
+            self._local.tx = None
+            self._local.after = []
+
+    def _write(self, path, obj, after=None, expected=storage.ANY):
+        tx = getattr(self._local, "tx", None)
+        versioned = is_versioned(path)
+        if tx is not None:
+            tx.write_json(path, obj)
+            if versioned:
+                tx.expect(path, expected)
+            if after:
+                self._local.after.append(after)
+        else:
+            if versioned:
+                storage.write_json_cas(path, obj, expected)
+            else:
+                storage.write_json(path, obj)
+            if after:
+                after()
+
+    def _read(self, path, default=None):
+        tx = getattr(self._local, "tx", None)
+        if tx is not None:
+            # em uma transação quem lê um arquivo versionado costuma gravá-lo em seguida
+            if is_versioned(path):
+                return tx.read_versioned(path, default)
+            return tx.read_json(path, default)
+        return cache.load_json(path, default)
+
+    def _rodada_dir(self, rodada_id):
+        return os.path.join(RODADAS_DIR, rodada_id)
+
+    # --- jogadores (escrita com compare-and-swap) ---
+    def get_jogadores(self):
+        data = self._read(JOGADORES_FILE, {})
+        return data if isinstance(data, dict) else {}
+
+    def get_jogadores_versioned(self):
+        """(versão, jogadores) com uma cópia própria (pode ser alterada)."""
+        if getattr(self._local, "tx", None) is not None:
+            return storage.ANY, self.get_jogadores()  # lido do disco; versão conferida no commit
+        version, data = storage.read_versioned(JOGADORES_FILE, {})
+        return version, data if isinstance(data, dict) else {}
+
+    def save_jogadores(self, jogadores, expected_version=storage.ANY):
+        """Grava jogadores; com expected_version só se o arquivo ainda estiver nela (senão VersionConflict)."""
+        self._write(JOGADORES_FILE, jogadores, expected=expected_version)
+
+    def update_jogadores(self, fn):
+        """fn(jogadores) altera no lugar a cópia recebida; repete em conflito. Retorna o gravado."""
+        return _update_jogadores(self, fn)
+
+    # --- rodadas ---
+    def list_rodadas(self, status=None):
+        rows = rodadas_util.list_all_rodadas()
+        return [r for r in rows if status is None or r.get("status") == status]
+
+    def get_meta(self, rodada_id):
+        # leitura direta (não compartilhada): meta costuma ser alterado em seguida;
+        # em transação a versão lida é conferida no commit
+        tx = getattr(self._local, "tx", None)
+        path = os.path.join(self._rodada_dir(rodada_id), "meta.json")
+        return tx.read_versioned(path) if tx is not None else storage.read_json(path)
+
+    def save_meta(self, meta):
+        """meta.json e a entrada do catálogo na mesma transação (a do batch, se houver)."""
+        tx = getattr(self._local, "tx", None)
+        if tx is not None:
+            rodadas_util.stage_meta(tx, meta)
+            return
+
+        def attempt():
+            with storage.transaction() as own:
+                rodadas_util.stage_meta(own, meta)
+        storage.retry_on_conflict(attempt)
+
+    def create_rodada(self, nome, admin_user=None):
+        date_str = datetime.now().strftime("%Y-%m-%d")
+        rodada_id = rodadas_util.next_rodada_id_for_date(RODADAS_DIR, date_str)
+        os.makedirs(os.path.join(self._rodada_dir(rodada_id), "matches"), exist_ok=True)
+        meta = _new_meta(rodada_id, nome, admin_user, date_str)
+        self.save_meta(meta)
+        return meta
+
+    def get_scores(self, rodada_id):
+        return self._read(os.path.join(self._rodada_dir(rodada_id), "scores.json"))
+
+    def save_scores(self, rodada_id, scores_obj):
+        self._write(os.path.join(self._rodada_dir(rodada_id), "scores.json"), scores_obj)
+
+    def get_summary(self, rodada_id):
+        return self._read(os.path.join(self._rodada_dir(rodada_id), "summary.json"))
+
+    def save_summary(self, rodada_id, summary):
+        self._write(os.path.join(self._rodada_dir(rodada_id), "summary.json"), summary)
+
+    def get_running_summary(self, rodada_id):
+        return load_running_summary(self._rodada_dir(rodada_id))
+
+    def list_matches(self, rodada_id):
+        return load_match_files(self._rodada_dir(rodada_id))
+
+    def save_match(self, rodada_id, match):
+        """
+        Grava uma nova partida (id sequencial por data), registra no meta.json e
+        no resumo corrente. Retorna (match_id, [arquivos tocados]).
+        """
+        rodada_dir = self._rodada_dir(rodada_id)
+        match_id, filepath = create_match_file(os.path.join(rodada_dir, "matches"), match)
+        touched = [filepath]
+        if rodadas_util.add_match_to_meta(rodada_id, match_id):
+            touched.append(os.path.join(rodada_dir, "meta.json"))
+        update_running_summary(rodada_dir, match, match_id)
+        return match_id, touched
+
+    def put_match(self, rodada_id, match):
+        """Grava a partida com o id que ela já tem (migração)."""
+        self._write(os.path.join(self._rodada_dir(rodada_id), "matches", f"{match['id']}.json"), match)
+
+    def put_running_summary(self, rodada_id, summary):
+        from utils.summary import RUNNING_SUMMARY_FILE
+        self._write(os.path.join(self._rodada_dir(rodada_id), RUNNING_SUMMARY_FILE), summary)
+
+    # --- perfis ---
+    @metrics.timed("repo.list_perfis")
+    def list_perfis(self):
+        perfis = {}
+        if not os.path.exists(PERFIS_DIR):
+            return perfis
+        for fname in os.listdir(PERFIS_DIR):
+            if not fname.lower().endswith(".json"):
+                continue
+            data = storage.read_json(os.path.join(PERFIS_DIR, fname))
+            if isinstance(data, dict):
+                perfis[data.get("user_id") or fname[:-5]] = data
+        return perfis
+
+    def get_perfil(self, user_id):
+        return storage.read_json(os.path.join(PERFIS_DIR, f"{user_id}.json"))
+
+    def save_perfil(self, user_id, perfil):
+        snapshot = dict(perfil)
+        self._write(os.path.join(PERFIS_DIR, f"{user_id}.json"), perfil,
+                    after=lambda: perfis_util.update_email_index(user_id, snapshot))
+
+    def find_perfil_by_email(self, email):
+        """Lookup pelo índice de e-mails (utils.perfis), sem varrer os perfis."""
+        key = perfis_util.lookup_perfil_key(email)
+        perfil = self.get_perfil(key) if key else None
+        if not isinstance(perfil, dict) or perfis_util.normalize_email(perfil.get("email")) != perfis_util.normalize_email(email):
+            return None, None
+        return perfil.get("user_id") or key, perfil
+
+    # --- lineups ---
+    @metrics.timed("repo.list_lineups")
+    def list_lineups(self):
+        out = {}
+        for path in glob.glob(os.path.join(LINEUPS_DIR, "*.json")):
+            data = storage.read_json(path)
+            if isinstance(data, dict):
+                out[data.get("user_id") or os.path.basename(path)[:-5]] = data
+        return out
+
+    def get_lineup(self, user_id):
+        return storage.carregar_lineup(user_id)
+
+    def save_lineup(self, user_id, lineup):
+        return storage.salvar_lineup(user_id, lineup)
+
+    def put_lineup(self, user_id, lineup):
+        """Grava o time como está, mantendo atualizado_em e sem tocar no histórico (migração)."""
+        self._write(os.path.join(LINEUPS_DIR, f"{user_id}.json"), lineup)
+
+    def lineup_at(self, user_id, timestamp):
+        """Time vigente em timestamp (None se ainda não havia time salvo)."""
+        return lineup_history.lineup_at(user_id, timestamp)
+
+    def list_lineup_history_users(self):
+        return lineup_history.list_users()
+
+    def list_lineup_versions(self, user_id):
+        """Versões do time do usuário, em ordem de atualizado_em."""
+        return lineup_history.versions(user_id)
+
+    def put_lineup_version(self, user_id, lineup):
+        """Acrescenta uma versão ao histórico com o atualizado_em que ela já tem (migração)."""
+        lineup_history.append(user_id, lineup)
+
+    # --- fantasy (pontos dos usuários por rodada e leaderboard acumulado) ---
+    def get_fantasy_points(self, rodada_id):
+        return self._read(os.path.join(self._rodada_dir(rodada_id), "fantasy.json"))
+
+    def save_fantasy_points(self, rodada_id, obj):
+        self._write(os.path.join(self._rodada_dir(rodada_id), "fantasy.json"), obj)
+
+    def get_fantasy_leaderboard(self):
+        return self._read(FANTASY_LEADERBOARD_FILE)
+
+    def save_fantasy_leaderboard(self, obj):
+        self._write(FANTASY_LEADERBOARD_FILE, obj)
+
+    # --- versão dos dados (para memoização de leaderboards) ---
+    def scores_versions(self, rodada_ids):
+        """Versão do scores.json de cada rodada (muda a cada gravação)."""
+        return [cache.file_signature(os.path.join(self._rodada_dir(rid), "scores.json")) for rid in rodada_ids]
+
+    def data_version(self, rodada_id=None):
+        sig = [cache.file_signature(JOGADORES_FILE)]
+        if rodada_id:
+            from utils.summary import RUNNING_SUMMARY_FILE
+            sig.append(cache.file_signature(os.path.join(self._rodada_dir(rodada_id), "scores.json")))
+            sig.append(cache.file_signature(os.path.join(self._rodada_dir(rodada_id), RUNNING_SUMMARY_FILE)))
+        return tuple(sig)
+
+
+# =========================
+# SQLite (WAL)
+# =========================
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jogadores (id TEXT PRIMARY KEY, nome TEXT, doc TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_jogadores_nome ON jogadores(nome);
+CREATE TABLE IF NOT EXISTS rodadas (id TEXT PRIMARY KEY, status TEXT, inicio TEXT, doc TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_rodadas_status ON rodadas(status, id);
+CREATE TABLE IF NOT EXISTS matches (id TEXT NOT NULL, rodada_id TEXT NOT NULL, doc TEXT NOT NULL, PRIMARY KEY (rodada_id, id));
+CREATE INDEX IF NOT EXISTS idx_matches_id ON matches(id);
+CREATE TABLE IF NOT EXISTS score_sets (rodada_id TEXT PRIMARY KEY, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS scores (
+    rodada_id TEXT NOT NULL, player_id TEXT NOT NULL,
+    gols INTEGER, assistencias INTEGER, vitorias INTEGER, pontos INTEGER,
+    PRIMARY KEY (rodada_id, player_id)
+);
+CREATE INDEX IF NOT EXISTS idx_scores_player ON scores(player_id, rodada_id);
+CREATE TABLE IF NOT EXISTS summaries (rodada_id TEXT NOT NULL, kind TEXT NOT NULL, doc TEXT NOT NULL, PRIMARY KEY (rodada_id, kind));
+CREATE TABLE IF NOT EXISTS perfis (user_id TEXT PRIMARY KEY, email_norm TEXT, doc TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_perfis_email ON perfis(email_norm);
+CREATE TABLE IF NOT EXISTS lineups (user_id TEXT PRIMARY KEY, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS lineup_history (user_id TEXT NOT NULL, ts INTEGER NOT NULL, doc TEXT NOT NULL, PRIMARY KEY (user_id, ts));
+CREATE TABLE IF NOT EXISTS fantasy (key TEXT PRIMARY KEY, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS versions (key TEXT PRIMARY KEY, n INTEGER NOT NULL);
+"""
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False)
+
+
+class SqliteRepository:
+    backend = "sqlite"
+    syncs_files = False  # o banco não é sincronizado arquivo a arquivo com o GitHub
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def _batch_conn(self):
+        conn = self._conn()
+        if self._local.depth == 0:
+            conn.execute("BEGIN IMMEDIATE")
+        self._local.depth += 1
+        try:
+            yield conn
+        except Exception:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.execute("ROLLBACK")
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            conn.execute("COMMIT")
+
+    @contextmanager
+    def batch(self):
+        """Agrupa as escritas do bloco em uma única transação SQLite."""
+        with self._batch_conn():
+            yield
+
+    def _bump(self, conn, *keys):
+        for key in keys:
+            conn.execute("INSERT INTO versions(key, n) VALUES (?, 1) ON CONFLICT(key) DO UPDATE SET n = n + 1", (key,))
+
+    def _one(self, sql, args=()):
+        row = self._conn().execute(sql, args).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # --- jogadores (escrita com compare-and-swap pela versão em versions) ---
+    def get_jogadores(self):
+        return {pid: json.loads(doc) for pid, doc in self._conn().execute("SELECT id, doc FROM jogadores ORDER BY id")}
+
+    def _jogadores_version(self, conn):
+        return (conn.execute("SELECT n FROM versions WHERE key = 'jogadores'").fetchone() or (0,))[0]
+
+    def get_jogadores_versioned(self):
+        """(versão, jogadores) lidos no mesmo snapshot (leitura WAL: não bloqueia nem é bloqueada)."""
+        conn = self._conn()
+        if self._local.depth:
+            return self._jogadores_version(conn), self.get_jogadores()
+        conn.execute("BEGIN")
+        try:
+            return self._jogadores_version(conn), self.get_jogadores()
+        finally:
+            conn.execute("COMMIT")
+
+    def save_jogadores(self, jogadores, expected_version=storage.ANY):
+        """Grava jogadores; com expected_version só se a versão ainda for ela (senão VersionConflict)."""
+        with self._batch_conn() as conn:
+            if expected_version is not storage.ANY and self._jogadores_version(conn) != expected_version:
+                raise storage.VersionConflict("jogadores")
+            conn.execute("DELETE FROM jogadores")
+            conn.executemany("INSERT INTO jogadores(id, nome, doc) VALUES (?, ?, ?)",
+                             [(pid, j.get("nome"), _dumps(j)) for pid, j in jogadores.items()])
+            self._bump(conn, "jogadores")
+
+    def update_jogadores(self, fn):
+        """fn(jogadores) altera no lugar a cópia recebida; repete em conflito. Retorna o gravado."""
+        return _update_jogadores(self, fn)
+
+    # --- rodadas ---
+    def list_rodadas(self, status=None):
+        sql = "SELECT doc FROM rodadas" + (" WHERE status = ?" if status else "") + " ORDER BY id"
+        args = (status,) if status else ()
+        out = []
+        for (doc,) in self._conn().execute(sql, args):
+            meta = json.loads(doc)
+            out.append(rodadas_util._catalog_entry(meta))
+        return out
+
+    def get_meta(self, rodada_id):
+        return self._one("SELECT doc FROM rodadas WHERE id = ?", (rodada_id,))
+
+    def save_meta(self, meta):
+        with self._batch_conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO rodadas(id, status, inicio, doc) VALUES (?, ?, ?, ?)",
+                         (meta["id"], meta.get("status"), meta.get("inicio"), _dumps(meta)))
+            self._bump(conn, f"rodada:{meta['id']}")
+
+    def create_rodada(self, nome, admin_user=None):
+        date_str = datetime.now().strftime("%Y-%m-%d")
+        with self._batch_conn() as conn:
+            prefix = f"{date_str}-rodada-"
+            n = conn.execute("SELECT COUNT(*) FROM rodadas WHERE id LIKE ?", (prefix + "%",)).fetchone()[0] + 1
+            while conn.execute("SELECT 1 FROM rodadas WHERE id = ?", (f"{prefix}{n:02d}",)).fetchone():
+                n += 1
+            meta = _new_meta(f"{prefix}{n:02d}", nome, admin_user, date_str)
+            self.save_meta(meta)
+        return meta
+
+    def get_scores(self, rodada_id):
+        return self._one("SELECT doc FROM score_sets WHERE rodada_id = ?", (rodada_id,))
+
+    def save_scores(self, rodada_id, scores_obj):
+        with self._batch_conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO score_sets(rodada_id, doc) VALUES (?, ?)", (rodada_id, _dumps(scores_obj)))
+            conn.execute("DELETE FROM scores WHERE rodada_id = ?", (rodada_id,))
+            conn.executemany(
+                "INSERT INTO scores(rodada_id, player_id, gols, assistencias, vitorias, pontos) VALUES (?, ?, ?, ?, ?, ?)",
+                [(rodada_id, pid, v.get("gols", 0), v.get("assistencias", 0), v.get("vitorias", 0), v.get("pontos", 0))
+                 for pid, v in scores_obj.get("scores", {}).items()])
+            self._bump(conn, f"rodada:{rodada_id}")
+
+    def get_summary(self, rodada_id):
+        return self._one("SELECT doc FROM summaries WHERE rodada_id = ? AND kind = 'final'", (rodada_id,))
+
+    def save_summary(self, rodada_id, summary):
+        with self._batch_conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO summaries(rodada_id, kind, doc) VALUES (?, 'final', ?)", (rodada_id, _dumps(summary)))
+
+    def get_running_summary(self, rodada_id):
+        return self._one("SELECT doc FROM summaries WHERE rodada_id = ? AND kind = 'running'", (rodada_id,))
+
+    def put_running_summary(self, rodada_id, summary):
+        with self._batch_conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO summaries(rodada_id, kind, doc) VALUES (?, 'running', ?)", (rodada_id, _dumps(summary)))
+            self._bump(conn, f"rodada:{rodada_id}")
+
+    def list_matches(self, rodada_id):
+        return [json.loads(doc) for (doc,) in
+                self._conn().execute("SELECT doc FROM matches WHERE rodada_id = ? ORDER BY id", (rodada_id,))]
+
+    def put_match(self, rodada_id, match):
+        with self._batch_conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO matches(id, rodada_id, doc) VALUES (?, ?, ?)", (match["id"], rodada_id, _dumps(match)))
+
+    def save_match(self, rodada_id, match):
+        """Mesma semântica de JsonRepository.save_match, em uma transação. Retorna (match_id, [])."""
+        date_str = datetime.now().strftime("%Y-%m-%d")
+        with self._batch_conn() as conn:
+            prefix = f"{date_str}-match-"
+            n = conn.execute("SELECT COUNT(*) FROM matches WHERE rodada_id = ? AND id LIKE ?",
+                             (rodada_id, prefix + "%")).fetchone()[0] + 1
+            while conn.execute("SELECT 1 FROM matches WHERE rodada_id = ? AND id = ?",
+                               (rodada_id, f"{prefix}{n:02d}")).fetchone():
+                n += 1
+            match_id = f"{prefix}{n:02d}"
+            match.setdefault("id", match_id)
+            match.setdefault("timestamp_utc", datetime.now(timezone.utc).isoformat())
+            self.put_match(rodada_id, match)
+
+            meta = self.get_meta(rodada_id) or {"id": rodada_id}
+            meta.setdefault("matches", [])
+            if match_id not in meta["matches"]:
+                meta["matches"].append(match_id)
+                meta["match_count"] = len(meta["matches"])
+                self.save_meta(meta)
+
+            running = self.get_running_summary(rodada_id) or empty_summary(rodada_id)
+            if fold_match(running, match, match_id):
+                self.put_running_summary(rodada_id, running)
+        return match_id, []
+
+    # --- perfis ---
+    def list_perfis(self):
+        return {uid: json.loads(doc) for uid, doc in self._conn().execute("SELECT user_id, doc FROM perfis")}
+
+    def get_perfil(self, user_id):
+        return self._one("SELECT doc FROM perfis WHERE user_id = ?", (user_id,))
+
+    def save_perfil(self, user_id, perfil):
+        email_norm = perfis_util.normalize_email(perfil.get("email")) or None
+        with self._batch_conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO perfis(user_id, email_norm, doc) VALUES (?, ?, ?)",
+                         (user_id, email_norm, _dumps(perfil)))
+
+    def find_perfil_by_email(self, email):
+        email_norm = perfis_util.normalize_email(email)
+        row = self._conn().execute("SELECT user_id, doc FROM perfis WHERE email_norm = ? LIMIT 1", (email_norm,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else (None, None)
+
+    # --- lineups ---
+    def list_lineups(self):
+        return {uid: json.loads(doc) for uid, doc in self._conn().execute("SELECT user_id, doc FROM lineups")}
+
+    def get_lineup(self, user_id):
+        return self._one("SELECT doc FROM lineups WHERE user_id = ?", (user_id,)) or \
+            {"user_id": user_id, "time": [], "atualizado_em": None}
+
+    def save_lineup(self, user_id, lineup):
+        lineup["user_id"] = user_id
+        lineup["atualizado_em"] = datetime.utcnow().isoformat() + "Z"
+        with self._batch_conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO lineups(user_id, doc) VALUES (?, ?)", (user_id, _dumps(lineup)))
+            conn.execute("INSERT OR REPLACE INTO lineup_history(user_id, ts, doc) VALUES (?, ?, ?)",
+                         (user_id, lineup_history.to_us(lineup["atualizado_em"]), _dumps(lineup)))
+        return True
+
+    def put_lineup(self, user_id, lineup):
+        with self._batch_conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO lineups(user_id, doc) VALUES (?, ?)", (user_id, _dumps(lineup)))
+
+    def lineup_at(self, user_id, timestamp):
+        """Time vigente em timestamp: busca pela chave primária (user_id, ts)."""
+        return self._one("SELECT doc FROM lineup_history WHERE user_id = ? AND ts <= ? ORDER BY ts DESC LIMIT 1",
+                         (user_id, lineup_history.to_us(timestamp)))
+
+    def list_lineup_history_users(self):
+        return [uid for (uid,) in self._conn().execute("SELECT DISTINCT user_id FROM lineup_history ORDER BY user_id")]
+
+    def list_lineup_versions(self, user_id):
+        return [json.loads(doc) for (doc,) in
+                self._conn().execute("SELECT doc FROM lineup_history WHERE user_id = ? ORDER BY ts", (user_id,))]
+
+    def put_lineup_version(self, user_id, lineup):
+        with self._batch_conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO lineup_history(user_id, ts, doc) VALUES (?, ?, ?)",
+                         (user_id, lineup_history.to_us(lineup["atualizado_em"]), _dumps(lineup)))
+
+    # --- fantasy: chave "rodada:<id>" para os pontos da rodada, "leaderboard" para o acumulado ---
+    def get_fantasy_points(self, rodada_id):
+        return self._one("SELECT doc FROM fantasy WHERE key = ?", (f"rodada:{rodada_id}",))
+
+    def save_fantasy_points(self, rodada_id, obj):
+        with self._batch_conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO fantasy(key, doc) VALUES (?, ?)", (f"rodada:{rodada_id}", _dumps(obj)))
+
+    def get_fantasy_leaderboard(self):
+        return self._one("SELECT doc FROM fantasy WHERE key = 'leaderboard'")
+
+    def save_fantasy_leaderboard(self, obj):
+        with self._batch_conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO fantasy(key, doc) VALUES ('leaderboard', ?)", (_dumps(obj),))
+
+    # --- versão dos dados ---
+    def scores_versions(self, rodada_ids):
+        """Versão de cada rodada (contador em versions, incrementado ao gravar scores)."""
+        n = dict(self._conn().execute("SELECT key, n FROM versions WHERE key LIKE 'rodada:%'"))
+        return [n.get(f"rodada:{rid}", 0) for rid in rodada_ids]
+
+    def data_version(self, rodada_id=None):
+        keys = ["jogadores"] + ([f"rodada:{rodada_id}"] if rodada_id else [])
+        conn = self._conn()
+        return tuple((conn.execute("SELECT n FROM versions WHERE key = ?", (k,)).fetchone() or (0,))[0] for k in keys)
+
+
+# =========================
+# Seleção de backend e migração
+# =========================
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_repository(backend=None, sqlite_path=None):
+    """
+    Repositório do processo para o backend configurado. backend/sqlite_path vêm
+    de st.secrets (STORAGE_BACKEND / SQLITE_PATH) nas páginas, ou das variáveis de
+    ambiente FUTEBOL_STORAGE_BACKEND / FUTEBOL_SQLITE_PATH; o padrão é "json".
+    """
+    backend = (backend or os.environ.get("FUTEBOL_STORAGE_BACKEND") or "json").lower()
+    sqlite_path = sqlite_path or os.environ.get("FUTEBOL_SQLITE_PATH") or DEFAULT_SQLITE_PATH
+    key = (backend, sqlite_path if backend == "sqlite" else None)
+    with _instances_lock:
+        repo = _instances.get(key)
+        if repo is None:
+            if backend == "json":
+                repo = JsonRepository()
+            elif backend == "sqlite":
+                repo = SqliteRepository(sqlite_path)
+            else:
+                raise ValueError(f"STORAGE_BACKEND desconhecido: {backend}")
+            _instances[key] = repo
+        return repo
+
+
+def migrate(src, dst):
+    """Copia todo o estado de src para dst (ambos repositórios). Retorna contagens."""
+    counts = {"jogadores": 0, "rodadas": 0, "matches": 0, "perfis": 0, "lineups": 0, "lineup_versions": 0}
+    with dst.batch():
+        jogadores = src.get_jogadores()
+        dst.save_jogadores(jogadores)
+        counts["jogadores"] = len(jogadores)
+        for entry in src.list_rodadas():
+            rid = entry["id"]
+            meta = src.get_meta(rid)
+            if not meta:
+                continue
+            dst.save_meta(meta)
+            for m in src.list_matches(rid):
+                dst.put_match(rid, m)
+                counts["matches"] += 1
+            for getter, putter in ((src.get_scores, dst.save_scores), (src.get_summary, dst.save_summary),
+                                   (src.get_running_summary, dst.put_running_summary),
+                                   (src.get_fantasy_points, dst.save_fantasy_points)):
+                obj = getter(rid)
+                if obj:
+                    putter(rid, obj)
+            counts["rodadas"] += 1
+        leaderboard = src.get_fantasy_leaderboard()
+        if leaderboard:
+            dst.save_fantasy_leaderboard(leaderboard)
+        for uid, perfil in src.list_perfis().items():
+            dst.save_perfil(uid, perfil)
+            counts["perfis"] += 1
+        for uid, lineup in src.list_lineups().items():
+            # put_lineup, não save_lineup: mantém o atualizado_em original
+            dst.put_lineup(uid, lineup)
+            counts["lineups"] += 1
+    # histórico fora da transação: no JSON é um log append-only por usuário
+    for uid in src.list_lineup_history_users():
+        for version in src.list_lineup_versions(uid):
+            dst.put_lineup_version(uid, version)
+            counts["lineup_versions"] += 1
+    if isinstance(dst, JsonRepository):
+        rodadas_util.rebuild_catalog()
+    return counts
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) < 3 or args[0] != "migrate" or args[1] == args[2] or {args[1], args[2]} - {"json", "sqlite"}:
+        print("uso: python -m utils.repository migrate (json sqlite | sqlite json) [--db caminho.sqlite3]")
+        sys.exit(2)
+    db = args[args.index("--db") + 1] if "--db" in args else None
+    src = get_repository(args[1], db)
+    dst = get_repository(args[2], db)
+    print(json.dumps(migrate(src, dst), ensure_ascii=False))
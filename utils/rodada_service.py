@@ -0,0 +1,278 @@
+# utils/rodada_service.py
+"""
+Operações de rodada sem Streamlit: criar, fechar (uma ou várias) e
+reprocessar rodadas fechadas. O admin (pages/admin.py) e a linha de comando
+usam as mesmas funções; o envio ao GitHub fica com quem chama (as funções
+devolvem os arquivos tocados como [(path_local, repo_path)]).
+
+Cada rodada fechada ou reprocessada grava status, scores, os totais de
+jogadores.json (só a diferença dos scores da rodada) e o leaderboard do
+fantasy na mesma transação, então um lote interrompido nunca deixa rodada
+fechada sem totais. Em lote (close_rodadas / recompute_rodadas) os lineups
+são lidos uma vez. Nenhum dos caminhos reprocessa a temporada inteira (isso
+é o rebuild-totals).
+
+    python -m utils.rodada_service create [--nome "Rodada X"] [--admin admin]
+    python -m utils.rodada_service close (<rodada_id> ... | --all-open) [--recalcular] [--no-backup] [--github]
+    python -m utils.rodada_service recompute (<rodada_id> ... | --all-closed) [--github]
+    python -m utils.rodada_service rebuild-totals [--github]
+
+O backend vem de FUTEBOL_STORAGE_BACKEND / FUTEBOL_SQLITE_PATH (padrão: json);
+--github enfileira os arquivos no outbox (enviados pelo worker do app).
+"""
+import os
+import sys
+from datetime import datetime, timezone
+
+from utils import fantasy, lineup_history, projection, snapshots, storage
+from utils.repository import JOGADORES_FILE, RODADAS_DIR, FANTASY_LEADERBOARD_FILE
+from utils.scores import compute_scores_from_summary
+from utils.summary import summary_for_close, summary_from_matches
+
+
+def _rodada_files(rodada_id, *names):
+    return [(os.path.join(RODADAS_DIR, rodada_id, n), f"database/rodadas/{rodada_id}/{n}") for n in names]
+
+
+def _totals_files():
+    return [(JOGADORES_FILE, JOGADORES_FILE), (FANTASY_LEADERBOARD_FILE, FANTASY_LEADERBOARD_FILE)]
+
+
+# ------------------------
+# Criar
+# ------------------------
+def create_rodada(repo, nome, admin_user=None):
+    """Cria uma rodada aberta. Retorna (ok, rodada_id, msg, arquivos)."""
+    try:
+        meta = repo.create_rodada(nome, admin_user=admin_user)
+    except Exception as e:
+        return False, None, f"Falha ao gravar meta.json: {e}", []
+    return True, meta["id"], "Rodada criada com sucesso", _rodada_files(meta["id"], "meta.json")
+
+
+# ------------------------
+# Fechar
+# ------------------------
+def close_rodada(repo, rodada_id, backup=True, recalcular=False, lineups=None,
+                 snapshot_keep_last=snapshots.KEEP_LAST):
+    """
+    Fecha uma rodada aberta: summary, scores, pontos do fantasy, totais dos
+    jogadores, leaderboard e meta em uma única transação do repositório (ou
+    tudo, ou nada). Retorna (ok, msg, arquivos, resultado) com
+    resultado = {"scores": {...}, "fantasy": {user_id: pontos}}.
+    """
+    meta = repo.get_meta(rodada_id)
+    if not meta:
+        return False, "meta.json não encontrado ou inválido", [], None
+    if meta.get("status") != "open":
+        return False, f"Rodada já está com status '{meta.get('status')}'", [], None
+
+    # resumo incremental mantido a cada partida salva; recalcula do zero só se
+    # não cobrir as partidas do meta.json (ou se pedido para verificar)
+    resumo, origem = summary_for_close(
+        rodada_id, meta.get("matches", []), repo.get_running_summary(rodada_id),
+        lambda: repo.list_matches(rodada_id), verify=recalcular)
+    if not resumo["matches"]:
+        return False, "Nenhuma partida encontrada para agregar", [], None
+
+    summary = {
+        "rodada_id": rodada_id,
+        "timestamp_closed": datetime.now(timezone.utc).isoformat(),
+        "matches": resumo["matches"],
+        "placar_por_partida": resumo["placar_por_partida"],
+        "resumo_por_jogador": resumo["resumo_por_jogador"],
+        "meta_snapshot": meta
+    }
+
+    # snapshot de jogadores (estado anterior ao fechamento), deduplicado e comprimido
+    if backup:
+        try:
+            snapshots.snapshot_bytes(storage.dumps_json(repo.get_jogadores()), "fechar_rodada", rodada_id=rodada_id)
+        except Exception as e:
+            return False, f"Falha ao criar backup de jogadores.json: {e}", [], None
+
+    def gravar():
+        with repo.batch():
+            # relê o meta dentro da transação (versão conferida no commit): se outra
+            # sessão fechou a rodada no meio, esta tentativa conflita e a seguinte
+            # vê o status novo e desiste, sem somar os scores de novo
+            atual = repo.get_meta(rodada_id)
+            if not atual or atual.get("status") != "open":
+                return None
+            repo.save_summary(rodada_id, summary)
+
+            # gera scores da rodada
+            scores_obj = compute_scores_from_summary(summary, formula=projection.DEFAULT_FORMULA)
+            repo.save_scores(rodada_id, scores_obj)
+
+            # totais dos jogadores: soma os scores desta rodada aos totais gravados
+            projection.apply_scores(repo, {rodada_id: scores_obj["scores"]})
+
+            # fantasy: todos os times pontuados de uma vez contra os scores da rodada
+            user_points = fantasy.score_rodada(repo, rodada_id, scores=scores_obj["scores"], lineups=lineups)
+
+            atual["fim"] = datetime.now(timezone.utc).isoformat()
+            atual["status"] = "closed"
+            atual["summary_file"] = "summary.json"
+            atual["match_count"] = len(resumo["matches"])
+            repo.save_meta(atual)
+        return scores_obj, user_points
+
+    # meta, jogadores.json e o leaderboard são gravados com compare-and-swap: se
+    # outra sessão os alterou durante o fechamento, a transação inteira é refeita
+    try:
+        gravado = storage.retry_on_conflict(gravar)
+    except Exception as e:
+        return False, f"Erro ao fechar rodada (nada foi gravado): {e}", [], None
+    if gravado is None:
+        status = (repo.get_meta(rodada_id) or {}).get("status")
+        return False, f"Rodada já está com status '{status}'", [], None
+    scores_obj, user_points = gravado
+
+    if backup:
+        try:
+            snapshots.prune(keep_last=snapshot_keep_last)
+        except Exception:
+            pass
+
+    files = _rodada_files(rodada_id, "summary.json", "scores.json", "meta.json", "fantasy.json") + _totals_files()
+    return True, "Rodada fechada com sucesso", files, {"scores": scores_obj["scores"], "fantasy": user_points}
+
+
+def close_rodadas(repo, rodada_ids, backup=True, recalcular=False, snapshot_keep_last=snapshots.KEEP_LAST):
+    """
+    Fecha várias rodadas em sequência com estado compartilhado: um snapshot de
+    jogadores antes do lote e lineups lidos uma vez. Cada rodada é gravada com
+    seus totais na própria transação: se o lote parar no meio, as já fechadas
+    estão completas e as demais continuam abertas.
+    Retorna ([(rodada_id, ok, msg)], arquivos).
+    """
+    if backup:
+        snapshots.snapshot_bytes(storage.dumps_json(repo.get_jogadores()), "fechar_rodadas")
+    lineups = repo.list_lineups()
+    results, files = [], []
+    for rid in rodada_ids:
+        ok, msg, touched, _ = close_rodada(repo, rid, backup=False, recalcular=recalcular, lineups=lineups)
+        results.append((rid, ok, msg))
+        if ok:
+            files += touched
+    if backup:
+        try:
+            snapshots.prune(keep_last=snapshot_keep_last)
+        except Exception:
+            pass
+    return results, list(dict.fromkeys(files))
+
+
+# ------------------------
+# Reprocessar rodadas fechadas
+# ------------------------
+def recompute_rodada(repo, rodada_id):
+    """
+    Refaz summary, scores e pontos do fantasy de uma rodada fechada a partir
+    das partidas (mesma fórmula de pontos já usada nela; o fantasy usa os times
+    registrados no fechamento ou, sem fantasy.json, os vigentes no fim da rodada
+    segundo o histórico de lineups). Retorna (ok, msg, arquivos, resultado) como close_rodada.
+    """
+    meta = repo.get_meta(rodada_id)
+    if not meta or meta.get("status") != "closed":
+        return False, "Rodada não encontrada ou não está fechada", [], None
+    matches = repo.list_matches(rodada_id)
+    if not matches:
+        return False, "Rodada sem arquivos de partida", [], None
+    previous = repo.get_summary(rodada_id) or {}
+    summary = summary_from_matches(rodada_id, matches)
+    summary.update({"timestamp_closed": previous.get("timestamp_closed") or meta.get("fim"),
+                    "meta_snapshot": previous.get("meta_snapshot") or meta})
+    previous_scores = repo.get_scores(rodada_id) or {}
+    anteriores = previous_scores.get("scores")
+    formula = previous_scores.get("points_formula") or projection.DEFAULT_FORMULA
+    scores_obj = compute_scores_from_summary(summary, formula=formula)
+    fantasy_prev = (repo.get_fantasy_points(rodada_id) or {}).get("pontos")
+    if fantasy_prev:
+        lineups = {uid: {"time": rec.get("time", [])} for uid, rec in fantasy_prev.items()}
+    else:
+        # times da época (não os de hoje): quem ainda não tinha time não pontua
+        quando = meta.get("fim") or meta.get("inicio")
+        atuais = repo.list_lineups()
+        lineups = {}
+        for uid in sorted(set(atuais) | set(repo.list_lineup_history_users())):
+            lineup = repo.lineup_at(uid, quando)
+            atual = atuais.get(uid) or {}
+            if (lineup is None and atual.get("atualizado_em")
+                    and lineup_history.to_us(atual["atualizado_em"]) <= lineup_history.to_us(quando)):
+                lineup = atual  # salvo antes de existir o histórico e não alterado desde então
+            if lineup is not None:
+                lineups[uid] = lineup
+
+    def gravar():
+        with repo.batch():
+            repo.save_summary(rodada_id, summary)
+            repo.save_scores(rodada_id, scores_obj)
+            user_points = fantasy.score_rodada(repo, rodada_id, scores=scores_obj["scores"], lineups=lineups)
+            projection.apply_scores(repo, {rodada_id: scores_obj["scores"]}, {rodada_id: anteriores})
+        return user_points
+
+    user_points = storage.retry_on_conflict(gravar)
+    files = _rodada_files(rodada_id, "summary.json", "scores.json", "fantasy.json") + _totals_files()
+    return True, "Rodada reprocessada", files, {"scores": scores_obj["scores"], "fantasy": user_points,
+                                                "scores_anteriores": anteriores}
+
+
+def recompute_rodadas(repo, rodada_ids):
+    """Reprocessa várias rodadas fechadas (cada uma com seus totais na própria transação). Retorna ([(id, ok, msg)], arquivos)."""
+    results, files = [], []
+    for rid in rodada_ids:
+        ok, msg, touched, _ = recompute_rodada(repo, rid)
+        results.append((rid, ok, msg))
+        if ok:
+            files += touched
+    return results, list(dict.fromkeys(files))
+
+
+if __name__ == "__main__":
+    from utils.repository import get_repository
+
+    args = sys.argv[1:]
+    cmd = args[0] if args else None
+    opt = lambda name, default=None: args[args.index(name) + 1] if name in args else default
+    ids = [a for a in args[1:] if not a.startswith("--") and a not in (opt("--nome"), opt("--admin"))]
+    repo = get_repository()
+    files, message, exit_code = [], None, 0
+
+    if cmd == "create":
+        ok, rodada_id, msg, files = create_rodada(repo, opt("--nome", ""), admin_user=opt("--admin", "cli"))
+        print(f"{rodada_id or '-'}\t{msg}")
+        message = f"Cria rodada {rodada_id}"
+        exit_code = 0 if ok else 1
+    elif cmd in ("close", "recompute"):
+        if cmd == "close":
+            ids = ids or ([r["id"] for r in repo.list_rodadas(status="open")] if "--all-open" in args else [])
+        else:
+            ids = ids or ([r["id"] for r in repo.list_rodadas(status="closed")] if "--all-closed" in args else [])
+        if not ids:
+            print("nenhuma rodada informada")
+            sys.exit(2)
+        if cmd == "close":
+            results, files = close_rodadas(repo, ids, backup="--no-backup" not in args, recalcular="--recalcular" in args)
+            message = f"Fecha {len(ids)} rodada(s)"
+        else:
+            results, files = recompute_rodadas(repo, ids)
+            message = f"Reprocessa {len(ids)} rodada(s)"
+        for rid, ok, msg in results:
+            print(f"{rid}\t{'ok' if ok else 'ERRO'}\t{msg}")
+        exit_code = 0 if all(ok for _, ok, _ in results) else 1
+    elif cmd == "rebuild-totals":
+        snapshots.snapshot_bytes(storage.dumps_json(repo.get_jogadores()), "reconstruir_totais")
+        diffs = projection.rebuild(repo)
+        print(f"{len(diffs)} alteração(ões)")
+        files, message = _totals_files()[:1], "Reconstrói totais dos jogadores a partir das partidas"
+    else:
+        print("uso: python -m utils.rodada_service (create | close | recompute | rebuild-totals) [...]")
+        sys.exit(2)
+
+    if "--github" in args and files and repo.syncs_files:
+        from utils import outbox
+        outbox.enqueue_many(files, message)
+        print(f"{len(files)} arquivo(s) enfileirado(s) para o GitHub")
+    sys.exit(exit_code)
@@ -1,29 +1,179 @@
-import os, json, tempfile
-
-def _write_atomic(path, data_bytes):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
-    os.close(fd)
-    with open(tmp, "wb") as f:
-        f.write(data_bytes)
-        f.flush()
-        os.fsync(f.fileno())
-    os.replace(tmp, path)
+import os
+
+from utils import cache, codec, metrics, sequence, storage
+
+RODADAS_DIR = os.path.join("database", "rodadas")
+CATALOG_FILE = os.path.join("database", "rodadas_catalog.json")
+
+def next_rodada_id_for_date(base_dir, date_str, prefix="rodada", pad=2, max_attempts=1000):
+    """
+    Reserva o próximo rodada_id da data pelo contador .seq-<prefix>-<data> em
+    base_dir (O(1)); a pasta é criada com mkdir atômico. Se ela já existir
+    (contador perdido ou antigo), tenta o número seguinte.
+    """
+    os.makedirs(base_dir, exist_ok=True)
+    base_prefix = f"{date_str}-{prefix}-"
+    counter = sequence.counter_path(base_dir, f"{prefix}-{date_str}")
+    recover = lambda: sequence.scan_next(os.listdir(base_dir), base_prefix)
+    for _ in range(max_attempts):
+        rodada_id = f"{base_prefix}{str(sequence.allocate(counter, recover)).zfill(pad)}"
+        try:
+            # tentativa atômica de criar a pasta; falha se já existir
+            os.mkdir(os.path.join(base_dir, rodada_id))
+            return rodada_id
+        except FileExistsError:
+            continue
+    raise RuntimeError("Não foi possível gerar rodada_id único após muitas tentativas")
+
+def meta_path(rodada_id, base_dir=RODADAS_DIR):
+    return os.path.join(base_dir, rodada_id, "meta.json")
 
 def add_match_to_meta(rodada_id, match_id):
-    meta_path = os.path.join("database", "rodadas", rodada_id, "meta.json")
-    meta = {}
-    if os.path.exists(meta_path):
-        with open(meta_path, "r", encoding="utf-8") as f:
-            try:
-                meta = json.load(f)
-            except Exception:
+    path = meta_path(rodada_id)
+
+    def attempt():
+        # meta.json e catálogo na mesma transação, com as versões conferidas no commit
+        with storage.transaction() as tx:
+            meta = tx.read_versioned(path, {})
+            if not isinstance(meta, dict):
                 meta = {}
-    meta.setdefault("id", rodada_id)
-    meta.setdefault("matches", [])
-    if match_id not in meta["matches"]:
-        meta["matches"].append(match_id)
-        meta["match_count"] = len(meta["matches"])
-        _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"))
+            meta.setdefault("id", rodada_id)
+            meta.setdefault("matches", [])
+            if match_id in meta["matches"]:
+                return False
+            meta["matches"].append(match_id)
+            meta["match_count"] = len(meta["matches"])
+            stage_meta(tx, meta)
         return True
-    return False
+    return storage.retry_on_conflict(attempt)
+
+# ------------------------
+# Catálogo de rodadas: um único arquivo com o essencial de cada meta.json,
+# para que listar rodadas (abertas ou todas) não precise abrir cada pasta.
+# Cada meta.json é gravado na mesma transação que a sua entrada no catálogo,
+# e antes dele na ordem de gravação: o catálogo nunca é mais velho que um
+# meta.json gravado pelo app. Um meta.json mais novo que o catálogo (git pull,
+# sincronização, edição manual) ou uma pasta nova/removida faz load_catalog
+# reler só as rodadas afetadas.
+# ------------------------
+def _catalog_entry(meta):
+    return {
+        "id": meta.get("id"),
+        "nome": meta.get("nome"),
+        "status": meta.get("status"),
+        "inicio": meta.get("inicio"),
+        "fim": meta.get("fim"),
+        "match_count": meta.get("match_count", len(meta.get("matches", []))),
+    }
+
+def _load_entry(base_dir, name):
+    try:
+        meta = codec.load(meta_path(name, base_dir))
+    except Exception:
+        return None
+    if not isinstance(meta, dict):
+        return None
+    meta.setdefault("id", name)
+    return _catalog_entry(meta)
+
+def _meta_mtimes(base_dir):
+    """{rodada_id: mtime_ns do meta.json} das pastas de base_dir (um stat por rodada)."""
+    out = {}
+    try:
+        names = os.listdir(base_dir)
+    except OSError:
+        return out
+    for name in names:
+        if name.startswith("."):
+            continue
+        try:
+            out[name] = os.stat(meta_path(name, base_dir)).st_mtime_ns
+        except OSError:
+            continue  # sem meta.json (pasta recém-criada) ou não é pasta
+    return out
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+@metrics.timed("rodadas.scan_meta")
+def _scan_catalog(base_dir):
+    rodadas = {}
+    for name in sorted(_meta_mtimes(base_dir)):
+        entry = _load_entry(base_dir, name)
+        if entry is not None:
+            rodadas[name] = entry
+    return rodadas
+
+def stage_meta(tx, meta, catalog_path=CATALOG_FILE, base_dir=RODADAS_DIR):
+    """
+    Grava meta.json e a sua entrada no catálogo na transação tx (vão juntos
+    para o disco, ou nenhum dos dois); as versões de ambos são conferidas no commit.
+    """
+    path = meta_path(meta["id"], base_dir)
+    tx.write_json(path, meta)
+    tx.expect(path)
+    data = tx.read_versioned(catalog_path)
+    rodadas = data.get("rodadas") if isinstance(data, dict) else None
+    if not isinstance(rodadas, dict):
+        rodadas = _scan_catalog(base_dir)  # catálogo ausente ou corrompido
+    rodadas = dict(rodadas)
+    rodadas[meta["id"]] = _catalog_entry(meta)
+    tx.write_json(catalog_path, {"rodadas": dict(sorted(rodadas.items()))})
+
+def rebuild_catalog(base_dir=RODADAS_DIR, catalog_path=CATALOG_FILE):
+    """Reconstrói o catálogo lendo todos os meta.json em disco (fallback/reparo)."""
+    catalog = {"rodadas": _scan_catalog(base_dir)}
+    storage.write_json_cas(catalog_path, catalog)
+    return catalog
+
+def _refresh_catalog(catalog_path, base_dir):
+    """Relê só as rodadas com meta.json mais novo que o catálogo, novas ou removidas."""
+    def attempt():
+        with storage.transaction() as tx:
+            data = tx.read_versioned(catalog_path)
+            rodadas = data.get("rodadas") if isinstance(data, dict) else None
+            rodadas = rodadas if isinstance(rodadas, dict) else {}
+            catalog_mtime = _mtime(catalog_path)
+            fresh, touched = {}, False
+            for name, mtime in _meta_mtimes(base_dir).items():
+                if name in rodadas and catalog_mtime is not None and mtime <= catalog_mtime:
+                    fresh[name] = rodadas[name]
+                    continue
+                touched = True
+                entry = _load_entry(base_dir, name)
+                if entry is not None:
+                    fresh[name] = entry
+            catalog = {"rodadas": dict(sorted(fresh.items()))}
+            # regrava também se só o mtime estava velho, para não reler a cada chamada
+            if touched or fresh != rodadas:
+                tx.write_json(catalog_path, catalog)
+        return catalog
+    return storage.retry_on_conflict(attempt)
+
+def load_catalog(catalog_path=CATALOG_FILE, base_dir=RODADAS_DIR):
+    """
+    Retorna {rodada_id: entrada}; reconstrói do disco se o catálogo não existir
+    ou for inválido, e relê as rodadas cujo meta.json é mais novo que o
+    catálogo ou cujas pastas surgiram/sumiram (um listdir + um stat por rodada).
+    """
+    data = cache.load_json(catalog_path)
+    if not isinstance(data, dict) or not isinstance(data.get("rodadas"), dict):
+        return rebuild_catalog(base_dir=base_dir, catalog_path=catalog_path)["rodadas"]
+    mtimes = _meta_mtimes(base_dir)
+    catalog_mtime = _mtime(catalog_path)
+    if (set(mtimes) != set(data["rodadas"]) or catalog_mtime is None
+            or any(m > catalog_mtime for m in mtimes.values())):
+        data = _refresh_catalog(catalog_path, base_dir)
+    return data["rodadas"]
+
+def list_all_rodadas(catalog_path=CATALOG_FILE):
+    """Entradas de todas as rodadas, ordenadas por id."""
+    rodadas = load_catalog(catalog_path)
+    return [rodadas[k] for k in sorted(rodadas)]
+
+def list_open_rodadas(catalog_path=CATALOG_FILE):
+    """Ids das rodadas com status 'open', ordenados."""
+    return [e["id"] for e in list_all_rodadas(catalog_path) if e.get("status") == "open"]
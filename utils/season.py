@@ -0,0 +1,199 @@
+# utils/season.py
+"""
+Estatísticas da temporada: matriz jogador × rodada com os scores de todas as
+rodadas fechadas (NumPy), mantida por processo e atualizada incrementalmente
+(uma coluna nova quando uma rodada fecha).
+
+Layout: season["data"][m, i, j] é a métrica METRICS[m] do jogador
+season["players"][i] na rodada season["rodadas"][j]; season["played"][i, j]
+diz se o jogador aparece nos scores da rodada. As consultas devolvem arrays
+alinhados com season["players"].
+"""
+import threading
+
+import numpy as np
+
+METRICS = ("pontos", "gols", "assistencias", "vitorias", "partidas")
+_M = {m: k for k, m in enumerate(METRICS)}
+
+
+def empty_season(players_capacity=64, rodadas_capacity=16):
+    return {
+        "players": [],
+        "index": {},        # player_id -> linha
+        "rodadas": [],
+        "keys": [],         # (rodada_id, versão dos scores) na ordem das colunas, para detectar mudanças
+        "data": np.zeros((len(METRICS), players_capacity, rodadas_capacity), dtype=np.int32),
+        "played": np.zeros((players_capacity, rodadas_capacity), dtype=bool),
+    }
+
+
+def _grow(season, n_players, n_rodadas):
+    """Garante capacidade (dobrando) para n_players × n_rodadas."""
+    data, played = season["data"], season["played"]
+    cap_p, cap_r = played.shape
+    if n_players <= cap_p and n_rodadas <= cap_r:
+        return
+    new_p, new_r = cap_p, cap_r
+    while new_p < n_players:
+        new_p *= 2
+    while new_r < n_rodadas:
+        new_r *= 2
+    new_data = np.zeros((len(METRICS), new_p, new_r), dtype=data.dtype)
+    new_data[:, :cap_p, :cap_r] = data
+    new_played = np.zeros((new_p, new_r), dtype=bool)
+    new_played[:cap_p, :cap_r] = played
+    season["data"], season["played"] = new_data, new_played
+
+
+def add_rodada(season, rodada_id, scores_obj, version=None):
+    """Acrescenta a coluna de uma rodada (scores.json) à temporada (in-place)."""
+    scores = (scores_obj or {}).get("scores", {}) or {}
+    for pid in scores:
+        if pid not in season["index"]:
+            season["index"][pid] = len(season["players"])
+            season["players"].append(pid)
+    j = len(season["rodadas"])
+    _grow(season, len(season["players"]), j + 1)
+    rows = np.fromiter((season["index"][pid] for pid in scores), dtype=np.intp, count=len(scores))
+    if len(rows):
+        vals = np.array([[int(v.get(m, 0)) for m in METRICS] for v in scores.values()], dtype=np.int32)
+        season["data"][:, rows, j] = vals.T
+        season["played"][rows, j] = True
+    season["rodadas"].append(rodada_id)
+    season["keys"].append((rodada_id, version))
+    return season
+
+
+def matrix(season, metric="pontos"):
+    """View P × R da métrica (sem cópia)."""
+    return season["data"][_M[metric], :len(season["players"]), :len(season["rodadas"])]
+
+
+def played(season):
+    return season["played"][:len(season["players"]), :len(season["rodadas"])]
+
+
+# ------------------------
+# Consultas (vetorizadas)
+# ------------------------
+def totals(season, metric="pontos"):
+    return matrix(season, metric).sum(axis=1)
+
+
+def cumulative(season, metric="pontos"):
+    """Acumulado rodada a rodada (P × R)."""
+    return np.cumsum(matrix(season, metric), axis=1)
+
+
+def rolling_form(season, n=3, metric="pontos"):
+    """Soma da métrica nas últimas n rodadas da temporada."""
+    return matrix(season, metric)[:, -n:].sum(axis=1) if n > 0 else np.zeros(len(season["players"]), dtype=np.int64)
+
+
+def averages(season, metric="pontos"):
+    """
+    {"por_rodada": média nas rodadas disputadas, "por_partida": média por partida}
+    (NaN onde o jogador não disputou rodada/partida; scores antigos não têm "partidas").
+    """
+    m = matrix(season, metric)
+    tot = m.sum(axis=1).astype(float)
+    rodadas_jogadas = played(season).sum(axis=1)
+    partidas_m = matrix(season, "partidas")
+    # por partida só conta as rodadas em que o número de partidas é conhecido
+    tot_com_partidas = np.where(partidas_m > 0, m, 0).sum(axis=1)
+    partidas = partidas_m.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        por_rodada = np.where(rodadas_jogadas > 0, tot / rodadas_jogadas, np.nan)
+        por_partida = np.where(partidas > 0, tot_com_partidas / partidas, np.nan)
+    return {"por_rodada": por_rodada, "por_partida": por_partida}
+
+
+def percentiles(season, metric="pontos", qs=(25, 50, 75, 90)):
+    """Percentis dos totais da métrica entre os jogadores: {q: valor}."""
+    tot = totals(season, metric)
+    if not len(tot):
+        return {q: 0.0 for q in qs}
+    return dict(zip(qs, np.percentile(tot, qs).tolist()))
+
+
+def percentile_rank(season, metric="pontos"):
+    """Percentil (0–100) de cada jogador: fração dos jogadores com total <= o dele."""
+    tot = totals(season, metric)
+    if not len(tot):
+        return np.zeros(0)
+    ordered = np.sort(tot)
+    return np.searchsorted(ordered, tot, side="right") * 100.0 / len(tot)
+
+
+def series(season, player_id, metric="pontos"):
+    """Série da métrica do jogador por rodada (zeros onde não jogou)."""
+    i = season["index"].get(player_id)
+    if i is None:
+        return np.zeros(len(season["rodadas"]), dtype=np.int32)
+    return matrix(season, metric)[i]
+
+
+def season_table(season, jogadores, n_form=3):
+    """Linhas (dicts) para a tabela da temporada, ordenadas por pontos."""
+    if not season["players"]:
+        return []
+    tot = totals(season, "pontos")
+    form = rolling_form(season, n_form)
+    avg = averages(season)
+    pct = percentile_rank(season)
+    gols = totals(season, "gols")
+    assists = totals(season, "assistencias")
+    rodadas_jogadas = played(season).sum(axis=1)
+    rows = []
+    for i in np.argsort(-tot, kind="stable"):
+        pid = season["players"][i]
+        rows.append({
+            "player_id": pid,
+            "nome": jogadores.get(pid, {}).get("nome", pid),
+            "pontos": int(tot[i]),
+            "gols": int(gols[i]),
+            "assistencias": int(assists[i]),
+            "rodadas": int(rodadas_jogadas[i]),
+            "forma": int(form[i]),
+            "media_rodada": None if np.isnan(avg["por_rodada"][i]) else round(float(avg["por_rodada"][i]), 2),
+            "media_partida": None if np.isnan(avg["por_partida"][i]) else round(float(avg["por_partida"][i]), 2),
+            "percentil": round(float(pct[i]), 1),
+        })
+    return rows
+
+
+# ------------------------
+# Temporada do processo (incremental)
+# ------------------------
+_season = None
+_season_backend = None
+_lock = threading.Lock()
+
+
+def get_season(repo):
+    """
+    Temporada com todas as rodadas fechadas do repositório. Rodadas fechadas
+    desde a última chamada viram colunas novas; se uma rodada já incorporada
+    mudou (reaberta, scores regravados por um reprocessamento), a matriz é
+    reconstruída.
+    Compartilhada entre sessões: não mutar.
+    """
+    global _season, _season_backend
+    ids = [r["id"] for r in repo.list_rodadas(status="closed")]
+    entries = list(zip(ids, repo.scores_versions(ids)))
+    with _lock:
+        season = _season
+        if season is None or _season_backend != repo.backend or entries[:len(season["keys"])] != season["keys"]:
+            season = empty_season()
+        pending = entries[len(season["keys"]):]
+        if pending or season is not _season:
+            # trabalha em uma cópia: quem está lendo a versão anterior não vê escrita parcial
+            if season is _season:
+                season = {**season, "players": list(season["players"]), "index": dict(season["index"]),
+                          "rodadas": list(season["rodadas"]), "keys": list(season["keys"]),
+                          "data": season["data"].copy(), "played": season["played"].copy()}
+            for rid, version in pending:
+                add_rodada(season, rid, repo.get_scores(rid), version=version)
+            _season, _season_backend = season, repo.backend
+        return _season
@@ -0,0 +1,49 @@
+# utils/sequence.py
+"""
+Alocador de números sequenciais (ids de partida e de rodada).
+
+Cada escopo (ex.: partidas de uma data dentro de uma rodada, rodadas de uma
+data) tem um arquivo contador pequeno (.seq-<escopo>) ao lado do que ele
+numera. allocate() lê e grava o contador sob storage.file_lock, com gravação atômica
++ fsync antes de devolver o número: a reserva é durável e custa O(1),
+independente de quantos ids já existem. Se o contador sumir ou estiver
+corrompido, recover() (uma varredura do diretório) devolve o próximo número livre.
+"""
+import os
+import re
+
+from utils import codec
+from utils.storage import write_json, file_lock
+
+
+def counter_path(base_dir, scope):
+    return os.path.join(base_dir, f".seq-{scope}")
+
+
+def _read_counter(path):
+    try:
+        n = codec.load(path).get("next")
+        return n if isinstance(n, int) and n >= 1 else None
+    except Exception:
+        return None
+
+
+def allocate(path, recover):
+    """
+    Reserva e devolve o próximo número do contador em path. recover() é chamado
+    (sob o lock) quando o contador não existe ou é inválido e deve devolver o
+    próximo número livre segundo o disco.
+    """
+    with file_lock(path):
+        n = _read_counter(path)
+        if n is None:
+            n = max(1, int(recover()))
+        write_json(path, {"next": n + 1})
+        return n
+
+
+def scan_next(names, prefix):
+    """Próximo número após o maior <prefix><n> em names (recuperação do contador)."""
+    pattern = re.compile(re.escape(prefix) + r"(\d+)(?:\.json)?$")
+    seqs = [int(m.group(1)) for m in map(pattern.match, names) if m]
+    return max(seqs, default=0) + 1
@@ -0,0 +1,205 @@
+# utils/snapshots.py
+"""
+Snapshots (backups) de jogadores.json endereçados por conteúdo.
+
+Cada snapshot é um blob comprimido em database/snapshots/blobs/<aa>/<sha256>,
+com nome dado pelo hash do conteúdo: snapshots idênticos ocupam um único blob.
+O índice (database/snapshots/index.json) liga (timestamp, motivo, rodada) ao
+blob. A retenção mantém os últimos KEEP_LAST mais o último de cada rodada, e
+blobs sem referência são apagados.
+
+Compressão: zstd se o pacote opcional "zstandard" estiver instalado, senão gzip
+(o codec fica registrado em cada entrada do índice).
+
+    python -m utils.snapshots list
+    python -m utils.snapshots restore <id> [--to database/jogadores.json]
+    python -m utils.snapshots prune [--keep N]
+    python -m utils.snapshots import-bak      # importa (e remove) os antigos *.bak-<ts>
+"""
+import os
+import sys
+import glob
+import gzip
+import hashlib
+from datetime import datetime, timezone
+
+from utils import storage
+
+try:
+    import zstandard
+except ImportError:  # opcional
+    zstandard = None
+
+SNAPSHOTS_DIR = os.path.join("database", "snapshots")
+JOGADORES_FILE = os.path.join("database", "jogadores.json")
+KEEP_LAST = 20
+
+
+def _paths(base_dir):
+    return os.path.join(base_dir, "index.json"), os.path.join(base_dir, "blobs")
+
+
+def _blob_path(base_dir, digest):
+    return os.path.join(_paths(base_dir)[1], digest[:2], digest)
+
+
+def _read_index(base_dir):
+    data = storage.read_json(_paths(base_dir)[0], {})
+    return data.get("snapshots", []) if isinstance(data, dict) else []
+
+
+def _write_index(base_dir, entries):
+    storage.write_json(_paths(base_dir)[0], {"snapshots": entries})
+
+
+def _compress(data):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "gzip", gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _decompress(codec, blob):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("snapshot comprimido com zstd, mas o pacote zstandard não está instalado")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return gzip.decompress(blob)
+
+
+# ------------------------
+# Gravação / leitura
+# ------------------------
+def snapshot_bytes(data, reason, rodada_id=None, name="jogadores.json", base_dir=SNAPSHOTS_DIR, timestamp=None):
+    """Registra um snapshot de data (bytes). Retorna a entrada do índice (blob reaproveitado se idêntico)."""
+    digest = hashlib.sha256(data).hexdigest()
+    ts = timestamp or datetime.now(timezone.utc).isoformat()
+    with storage.file_lock(_paths(base_dir)[0]):
+        entries = _read_index(base_dir)
+        codec = next((e["codec"] for e in entries if e["blob"] == digest), None)
+        path = _blob_path(base_dir, digest)
+        if codec is None or not os.path.exists(path):
+            codec, blob = _compress(data)
+            storage.write_atomic(path, blob)
+        snap_id = base_id = f"{ts[:19].replace(':', '').replace('-', '')}-{digest[:8]}"
+        ids = {e["id"] for e in entries}
+        n = 1
+        while snap_id in ids:
+            n += 1
+            snap_id = f"{base_id}-{n}"
+        entry = {
+            "id": snap_id,
+            "timestamp": ts,
+            "reason": reason,
+            "rodada_id": rodada_id,
+            "name": name,
+            "blob": digest,
+            "codec": codec,
+            "size": len(data),
+        }
+        entries.append(entry)
+        _write_index(base_dir, entries)
+    return entry
+
+
+def snapshot_file(path=JOGADORES_FILE, reason="manual", rodada_id=None, base_dir=SNAPSHOTS_DIR):
+    """Snapshot do conteúdo atual de path (None se o arquivo não existe)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        data = f.read()
+    return snapshot_bytes(data, reason, rodada_id=rodada_id, name=os.path.basename(path), base_dir=base_dir)
+
+
+def list_snapshots(base_dir=SNAPSHOTS_DIR):
+    """Entradas do índice, mais recentes primeiro."""
+    return sorted(_read_index(base_dir), key=lambda e: e["timestamp"], reverse=True)
+
+
+def _find(snapshot_id, base_dir):
+    for e in _read_index(base_dir):
+        if e["id"] == snapshot_id:
+            return e
+    raise KeyError(f"snapshot não encontrado: {snapshot_id}")
+
+
+def load(snapshot_id, base_dir=SNAPSHOTS_DIR):
+    """Conteúdo (bytes) do snapshot, com conferência do hash."""
+    e = _find(snapshot_id, base_dir)
+    with open(_blob_path(base_dir, e["blob"]), "rb") as f:
+        data = _decompress(e["codec"], f.read())
+    if hashlib.sha256(data).hexdigest() != e["blob"]:
+        raise ValueError(f"blob corrompido: {e['blob']}")
+    return data
+
+
+def restore(snapshot_id, dest=JOGADORES_FILE, base_dir=SNAPSHOTS_DIR):
+    """Grava o snapshot em dest (atômico, avançando a versão do arquivo). Retorna a entrada restaurada."""
+    storage.write_bytes_cas(dest, load(snapshot_id, base_dir))
+    return _find(snapshot_id, base_dir)
+
+
+# ------------------------
+# Retenção
+# ------------------------
+def prune(keep_last=KEEP_LAST, keep_per_rodada=True, base_dir=SNAPSHOTS_DIR):
+    """
+    Mantém os keep_last snapshots mais recentes e (keep_per_rodada) o mais recente
+    de cada rodada; apaga do índice os demais e os blobs que ficaram sem referência.
+    Retorna (entradas_removidas, blobs_removidos).
+    """
+    with storage.file_lock(_paths(base_dir)[0]):
+        entries = sorted(_read_index(base_dir), key=lambda e: e["timestamp"], reverse=True)
+        keep = {e["id"] for e in entries[:keep_last]}
+        if keep_per_rodada:
+            seen = set()
+            for e in entries:
+                if e.get("rodada_id") and e["rodada_id"] not in seen:
+                    seen.add(e["rodada_id"])
+                    keep.add(e["id"])
+        kept = [e for e in entries if e["id"] in keep]
+        removed = len(entries) - len(kept)
+        if removed:
+            _write_index(base_dir, sorted(kept, key=lambda e: e["timestamp"]))
+        referenced = {e["blob"] for e in kept}
+        blobs_removed = 0
+        for path in glob.glob(os.path.join(_paths(base_dir)[1], "*", "*")):
+            if os.path.basename(path) not in referenced:
+                os.remove(path)
+                blobs_removed += 1
+    return removed, blobs_removed
+
+
+def import_legacy_backups(path=JOGADORES_FILE, base_dir=SNAPSHOTS_DIR):
+    """Importa os antigos <path>.bak-<ts> para o store e remove os arquivos. Retorna quantos."""
+    n = 0
+    for bak in sorted(glob.glob(f"{path}.bak-*")):
+        ts_raw = bak.rsplit(".bak-", 1)[1]
+        try:
+            ts = datetime.strptime(ts_raw, "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc).isoformat()
+        except ValueError:
+            ts = datetime.fromtimestamp(os.path.getmtime(bak), timezone.utc).isoformat()
+        with open(bak, "rb") as f:
+            snapshot_bytes(f.read(), "backup legado", name=os.path.basename(path), base_dir=base_dir, timestamp=ts)
+        os.remove(bak)
+        n += 1
+    return n
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    cmd = args[0] if args else None
+    if cmd == "list":
+        for e in list_snapshots():
+            print(f"{e['id']}\t{e['timestamp']}\t{e['reason']}\t{e.get('rodada_id') or '-'}\t{e['size']} bytes")
+    elif cmd == "restore" and len(args) >= 2:
+        dest = args[args.index("--to") + 1] if "--to" in args else JOGADORES_FILE
+        e = restore(args[1], dest)
+        print(f"restaurado {e['id']} ({e['timestamp']}) em {dest}")
+    elif cmd == "prune":
+        keep = int(args[args.index("--keep") + 1]) if "--keep" in args else KEEP_LAST
+        print("removidos: %d entrada(s), %d blob(s)" % prune(keep_last=keep))
+    elif cmd == "import-bak":
+        print(f"importados: {import_legacy_backups()}")
+    else:
+        print("uso: python -m utils.snapshots (list | restore <id> [--to caminho] | prune [--keep N] | import-bak)")
+        sys.exit(2)
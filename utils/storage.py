@@ -1,42 +1,373 @@
 import os
-import json
+import time
+import uuid
+import fcntl
+import random
 import tempfile
+import threading
+from contextlib import contextmanager, ExitStack
 from datetime import datetime
 
+from utils import codec, metrics
+
 LINEUPS_DIR = "times/lineups"
 HISTORY_DIR = "times/history"
+JOURNAL_DIR = "database/.journal"
+RECOVERY_ROOTS = ("database", "users", "times")
+ORPHAN_MIN_AGE = 60  # segundos; temporários mais novos podem ser de uma transação em andamento
+CAS_RETRIES = 12       # tentativas de um read-modify-write otimista antes de desistir
+CAS_BACKOFF = 0.01     # segundos; espera aleatória até CAS_BACKOFF * 2**tentativa...
+CAS_MAX_BACKOFF = 0.5  # ...limitada a isso
 os.makedirs(LINEUPS_DIR, exist_ok=True)
 os.makedirs(HISTORY_DIR, exist_ok=True)
 
-def _atomic_write(path: str, data: dict):
+# =========================
+# ESCRITA ATÔMICA (única implementação usada por páginas e utils)
+# =========================
+def _fsync_dir(dirn):
+    try:
+        fd = os.open(dirn or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+@metrics.timed("storage.write_atomic")
+def write_atomic(path, data_bytes):
+    """Grava bytes em path via arquivo temporário + fsync + os.replace."""
     dirn = os.path.dirname(path)
-    os.makedirs(dirn, exist_ok=True)
-    fd, tmp = tempfile.mkstemp(dir=dirn)
+    if dirn:
+        os.makedirs(dirn, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dirn or ".")
     try:
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data_bytes)
+            f.flush()
+            os.fsync(f.fileno())
         os.replace(tmp, path)
     finally:
         if os.path.exists(tmp):
             try: os.remove(tmp)
-            except: pass
+            except Exception: pass
+
+def dumps_json(obj, path=None):
+    """obj -> bytes no formato configurado para path (ver utils.codec)."""
+    return codec.dumps(obj, path=path)
+
+def write_json(path, obj):
+    """Grava obj de forma atômica no formato configurado para path (JSON indentado por padrão)."""
+    write_atomic(path, dumps_json(obj, path))
+
+@metrics.timed("storage.read_json")
+def read_json(path, default=None):
+    """Lê path em qualquer formato do codec; default se não existir ou for inválido."""
+    try:
+        return codec.load(path)
+    except codec.CodecUnavailable:
+        raise  # não confundir "sem o pacote" com "arquivo ausente" (evita sobrescrever dados)
+    except Exception:
+        return default
+
+# =========================
+# ESCRITA COM VERSÃO (compare-and-swap otimista)
+# =========================
+# A versão de um arquivo é um contador inteiro em <arquivo>.version (0 se
+# ainda não existe), incrementado a cada gravação sob um lock curto em
+# <arquivo>.lock. O conteúdo é trocado antes do contador, então quem lê o
+# contador e depois o conteúdo (sem lock: leitores nunca esperam) recebe um
+# conteúdo pelo menos tão novo quanto a versão; se for mais novo, o contador
+# já terá avançado quando esse leitor tentar gravar e o compare-and-swap
+# falha em vez de perder a escrita. Em conflito o chamador relê e tenta de novo.
+ANY = object()  # expected: grava sem conferir a versão (mas sob o mesmo lock)
+VERSION_SUFFIX = ".version"
+
+class VersionConflict(Exception):
+    """O arquivo mudou desde a leitura: o compare-and-swap não gravou nada."""
+
+def file_version(path):
+    """Versão atual de path (0 se nunca foi gravado com versão)."""
+    try:
+        with open(path + VERSION_SUFFIX, "rb") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+def read_versioned(path, default=None):
+    """(versão, objeto) sem lock: a versão é lida antes do conteúdo (ver acima)."""
+    version = file_version(path)
+    try:
+        return version, codec.load(path)
+    except codec.CodecUnavailable:
+        raise
+    except Exception:
+        return version, default
+
+@contextmanager
+def file_lock(path, shared=False):
+    """
+    Lock de path via fcntl em <path>.lock: exclusivo (escritas) ou, com
+    shared=True, compartilhado entre leitores. Os leitores de arquivos
+    versionados não o usam (ver acima).
+    """
+    dirn = os.path.dirname(path)
+    if dirn:
+        os.makedirs(dirn, exist_ok=True)
+    with open(path + ".lock", "a") as lf:
+        fcntl.flock(lf.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+
+def write_json_cas(path, obj, expected=ANY):
+    """
+    Grava obj em path se ele ainda estiver na versão expected; senão levanta
+    VersionConflict. Retorna a nova versão.
+    """
+    return write_bytes_cas(path, dumps_json(obj, path), expected)
+
+def write_bytes_cas(path, data_bytes, expected=ANY):
+    """Como write_json_cas, para bytes já serializados (ex.: restauração de snapshot)."""
+    with file_lock(path):
+        version = file_version(path)
+        if expected is not ANY and version != expected:
+            raise VersionConflict(path)
+        write_atomic(path, data_bytes)
+        write_atomic(path + VERSION_SUFFIX, str(version + 1).encode("ascii"))
+        return version + 1
+
+def retry_on_conflict(fn, retries=CAS_RETRIES):
+    """Chama fn() de novo (com espera aleatória crescente) enquanto levantar VersionConflict."""
+    for attempt in range(retries):
+        try:
+            return fn()
+        except VersionConflict:
+            if attempt == retries - 1:
+                raise
+            time.sleep(random.uniform(0, min(CAS_MAX_BACKOFF, CAS_BACKOFF * 2 ** attempt)))
+
+def update_json(path, fn, default=None, retries=CAS_RETRIES):
+    """
+    Read-modify-write otimista de path: fn altera no lugar uma cópia própria
+    do conteúdo atual. Em conflito relê e reaplica fn. Retorna o objeto gravado.
+    """
+    def attempt():
+        version, obj = read_versioned(path, default)
+        fn(obj)
+        write_json_cas(path, obj, version)
+        return obj
+    return retry_on_conflict(attempt, retries)
+
+# =========================
+# TRANSAÇÕES MULTI-ARQUIVO
+# =========================
+# Protocolo (redo log):
+#   1. cada arquivo é gravado em <dir>/.<nome>.tx-<txid> (sem fsync individual);
+#   2. fsync de todos os temporários de uma vez;
+#   3. grava o registro de journal (lista temp -> destino) com fsync: ponto de commit;
+#   4. os.replace de cada temporário e um fsync por diretório tocado;
+#   5. remove o journal.
+# Na recuperação, journals existentes são refeitos (roll forward) e temporários
+# sem journal (transação que não chegou ao commit) são descartados (rollback).
+# Arquivos versionados (expect / read_versioned) são travados do passo 1 ao 4
+# e têm a versão conferida antes de qualquer gravação: se algum mudou, o
+# commit levanta VersionConflict sem gravar nada.
+_TX_MARK = ".tx-"
+
+class Transaction:
+    """Grupo de escritas que é aplicado por inteiro ou não é aplicado."""
+
+    def __init__(self, journal_dir=JOURNAL_DIR):
+        self.txid = uuid.uuid4().hex
+        self.journal_dir = journal_dir
+        self._staged = {}  # destino -> (tmp, bytes)
+        self._expect = {}  # destino -> versão esperada no commit (ou ANY)
+        self._done = False
+
+    def write_bytes(self, path, data_bytes):
+        path = os.path.normpath(path)
+        dirn = os.path.dirname(path)
+        tmp = os.path.join(dirn, f".{os.path.basename(path)}{_TX_MARK}{self.txid}")
+        # regravar leva o arquivo para o fim: o commit grava na ordem da última
+        # escrita (o catálogo de rodadas fica mais novo que os meta.json dele)
+        self._staged.pop(path, None)
+        self._staged[path] = (tmp, data_bytes)
+
+    def write_json(self, path, obj):
+        self.write_bytes(path, dumps_json(obj, path))
+
+    def read_json(self, path, default=None):
+        """Lê path enxergando o que já foi gravado nesta transação."""
+        staged = self._staged.get(os.path.normpath(path))
+        if staged is not None:
+            return codec.loads(staged[1])
+        return read_json(path, default)
+
+    def expect(self, path, version=ANY):
+        """O commit trava path e só grava se ele ainda estiver em version (ANY: só trava)."""
+        path = os.path.normpath(path)
+        if version is not ANY or path not in self._expect:
+            self._expect[path] = version
+
+    def read_versioned(self, path, default=None):
+        """Como read_json, e a versão lida do disco passa a ser conferida no commit."""
+        path = os.path.normpath(path)
+        staged = self._staged.get(path)
+        if staged is not None:
+            return codec.loads(staged[1])
+        version, obj = read_versioned(path, default)
+        if self._expect.get(path, ANY) is ANY:
+            self._expect[path] = version
+        return obj
+
+    def commit(self):
+        if self._done:
+            return
+        self._done = True
+        if not self._staged:
+            return
+        with ExitStack() as locks:
+            # ordem fixa de locks: duas transações nunca esperam uma pela outra em ciclo
+            for path in sorted(self._expect):
+                locks.enter_context(file_lock(path))
+            for path, version in list(self._expect.items()):
+                current = file_version(path)
+                if version is not ANY and current != version:
+                    raise VersionConflict(path)
+                if path in self._staged:
+                    # o contador entra depois do conteúdo (ordem de os.replace no passo 4)
+                    self.write_bytes(path + VERSION_SUFFIX, str(current + 1).encode("ascii"))
+            self._commit_staged()
+
+    def _commit_staged(self):
+        files = []
+        try:
+            for path, (tmp, data) in self._staged.items():
+                dirn = os.path.dirname(path)
+                if dirn:
+                    os.makedirs(dirn, exist_ok=True)
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                files.append([tmp, path])
+            for tmp, _ in files:
+                fd = os.open(tmp, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        except Exception:
+            for tmp, _ in files:
+                try: os.remove(tmp)
+                except Exception: pass
+            raise
+        journal_path = os.path.join(self.journal_dir, f"{self.txid}.json")
+        write_atomic(journal_path, dumps_json({"txid": self.txid, "files": files}))
+        _fsync_dir(self.journal_dir)
+        _apply_journal(journal_path, files)
+
+    def rollback(self):
+        self._done = True
+        self._staged.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+def transaction(journal_dir=JOURNAL_DIR):
+    """Uso: with transaction() as tx: tx.write_json(...); ... (commit ao sair sem exceção)."""
+    return Transaction(journal_dir)
+
+def _apply_journal(journal_path, files):
+    dirs = set()
+    for tmp, path in files:
+        try:
+            os.replace(tmp, path)
+        except FileNotFoundError:
+            pass  # já aplicado (recuperação repetida)
+        dirs.add(os.path.dirname(path))
+    for d in dirs:
+        _fsync_dir(d)
+    try:
+        os.remove(journal_path)
+    except FileNotFoundError:
+        pass
+
+_recovered = False
+_recover_lock = threading.Lock()
+
+def recover(journal_dir=JOURNAL_DIR, roots=RECOVERY_ROOTS, orphan_min_age=ORPHAN_MIN_AGE):
+    """
+    Completa transações que chegaram ao commit e descarta as que não chegaram.
+    Executado uma vez por processo (na importação). Retorna (refeitas, descartadas).
+    """
+    global _recovered
+    with _recover_lock:
+        redone = 0
+        committed = set()
+        if os.path.exists(journal_dir):
+            for fname in sorted(os.listdir(journal_dir)):
+                if not fname.endswith(".json"):
+                    continue
+                jp = os.path.join(journal_dir, fname)
+                record = read_json(jp)
+                if not record or "files" not in record:
+                    # journal incompleto: o write_atomic do journal não terminou, logo não houve commit
+                    os.remove(jp)
+                    continue
+                committed.add(record.get("txid"))
+                _apply_journal(jp, record["files"])
+                redone += 1
+        discarded = 0
+        cutoff = time.time() - orphan_min_age
+        for root in roots:
+            if not os.path.exists(root):
+                continue
+            for dirpath, _, filenames in os.walk(root):
+                for fname in filenames:
+                    if fname.startswith(".") and _TX_MARK in fname:
+                        txid = fname.rsplit(_TX_MARK, 1)[1]
+                        tmp = os.path.join(dirpath, fname)
+                        try:
+                            if txid not in committed and os.path.getmtime(tmp) < cutoff:
+                                os.remove(tmp)
+                                discarded += 1
+                        except OSError:
+                            pass
+        _recovered = True
+        return redone, discarded
+
+if not _recovered:
+    try:
+        recover()
+    except Exception:
+        pass
 
+# =========================
+# LINEUPS
+# =========================
 def carregar_lineup(user_id: str) -> dict:
     path = os.path.join(LINEUPS_DIR, f"{user_id}.json")
     if not os.path.exists(path):
         return {"user_id": user_id, "time": [], "atualizado_em": None}
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return codec.load(path)
 
 def salvar_lineup(user_id: str, lineup: dict, save_history: bool = True):
     lineup["user_id"] = user_id
     lineup["atualizado_em"] = datetime.utcnow().isoformat() + "Z"
     path = os.path.join(LINEUPS_DIR, f"{user_id}.json")
-    _atomic_write(path, lineup)
+    write_json(path, lineup)
     if save_history:
-        ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-        hist_dir = os.path.join(HISTORY_DIR, user_id)
-        os.makedirs(hist_dir, exist_ok=True)
-        hist_path = os.path.join(hist_dir, f"{ts}.json")
-        _atomic_write(hist_path, lineup)
+        # log append-only com deltas (times/history/<user_id>.jsonl + índice)
+        from utils import lineup_history
+        lineup_history.append(user_id, lineup)
     return True
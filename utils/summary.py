@@ -0,0 +1,143 @@
+# utils/summary.py
+"""
+Resumo da rodada (placar por partida, gols/assistências/vitórias por jogador).
+
+Cada partida salva é incorporada (fold) a um running_summary.json mantido na
+pasta da rodada, de modo que fechar a rodada só finaliza esse resumo e a
+classificação parcial de uma rodada aberta sai de graça. compute_summary
+refaz tudo a partir dos arquivos de partida (verificação / fallback).
+"""
+import os
+import copy
+import glob
+
+from utils import cache, codec, metrics
+from utils.storage import write_json, file_lock
+
+RUNNING_SUMMARY_FILE = "running_summary.json"
+
+
+def _load_json(path):
+    try:
+        return codec.load(path)
+    except Exception:
+        return None
+
+
+def empty_summary(rodada_id):
+    return {"rodada_id": rodada_id, "matches": [], "placar_por_partida": {}, "resumo_por_jogador": {}}
+
+
+def fold_match(summary, match, match_id=None):
+    """
+    Incorpora uma partida ao resumo (in-place). Idempotente: uma partida já
+    presente em summary["matches"] é ignorada. Retorna True se incorporou.
+    """
+    match_id = match_id or match.get("id")
+    if match_id in summary["matches"]:
+        return False
+    resumo = summary["resumo_por_jogador"]
+    summary["matches"].append(match_id)
+    s = match.get("score", {"team1": 0, "team2": 0})
+    summary["placar_por_partida"][match_id] = s
+
+    # determina vencedor da partida
+    if s.get("team1", 0) > s.get("team2", 0):
+        vencedor_match = "team1"
+    elif s.get("team2", 0) > s.get("team1", 0):
+        vencedor_match = "team2"
+    else:
+        vencedor_match = "empate"
+
+    def _row(pid):
+        return resumo.setdefault(pid, {"gols": 0, "assistencias": 0, "vitorias": 0, "partidas": 0})
+
+    # resumo por eventos (gols/assist)
+    for ev in match.get("events", []):
+        if ev.get("type") == "gol" and ev.get("scorer"):
+            _row(ev["scorer"])["gols"] += 1
+        if ev.get("type") == "assist" and ev.get("assister"):
+            _row(ev["assister"])["assistencias"] += 1
+
+    # participação e vitórias: jogadores atribuídos a um time (1 ou 2)
+    winning_team_num = {"team1": 1, "team2": 2}.get(vencedor_match)
+    for pid, team in match.get("team_assign", {}).items():
+        if team not in (1, 2):
+            continue
+        row = _row(pid)
+        row["partidas"] = row.get("partidas", 0) + 1
+        if team == winning_team_num:
+            row["vitorias"] = row.get("vitorias", 0) + 1
+    return True
+
+
+def summary_from_matches(rodada_id, matches):
+    """Resumo a partir de uma sequência de partidas (dicts com "id")."""
+    summary = empty_summary(rodada_id)
+    for m in matches:
+        fold_match(summary, m)
+    return summary
+
+
+@metrics.timed("summary.load_match_files")
+def load_match_files(rodada_dir):
+    """Partidas de matches/*.json em ordem de id; arquivos inválidos são pulados."""
+    matches = []
+    for mf in sorted(glob.glob(os.path.join(rodada_dir, "matches", "*.json"))):
+        m = _load_json(mf)
+        if not m:
+            # pula arquivos inválidos
+            continue
+        m.setdefault("id", os.path.splitext(os.path.basename(mf))[0])
+        matches.append(m)
+    return matches
+
+
+def compute_summary(rodada_dir, rodada_id=None):
+    """Recalcula o resumo do zero a partir de matches/*.json (caminho de verificação)."""
+    rodada_id = rodada_id or os.path.basename(os.path.normpath(rodada_dir))
+    return summary_from_matches(rodada_id, load_match_files(rodada_dir))
+
+
+def load_running_summary(rodada_dir):
+    """Resumo corrente da rodada (via cache compartilhado; não mutar) ou None."""
+    data = cache.load_json(os.path.join(rodada_dir, RUNNING_SUMMARY_FILE))
+    return data if isinstance(data, dict) and "resumo_por_jogador" in data else None
+
+
+def update_running_summary(rodada_dir, match, match_id=None):
+    """Incorpora a partida ao running_summary.json da rodada (read-modify-write sob lock)."""
+    path = os.path.join(rodada_dir, RUNNING_SUMMARY_FILE)
+    os.makedirs(rodada_dir, exist_ok=True)
+    with file_lock(path):
+        summary = _load_json(path)
+        rebuilt = not isinstance(summary, dict) or "resumo_por_jogador" not in summary
+        if rebuilt:
+            # primeiro uso (ou arquivo perdido): parte das partidas já gravadas em
+            # disco, que normalmente já incluem esta; grava mesmo sem fold novo
+            summary = compute_summary(rodada_dir)
+        if fold_match(summary, match, match_id) or rebuilt:
+            write_json(path, summary)
+    return summary
+
+
+def summary_for_close(rodada_id, meta_matches, running, load_matches, verify=False):
+    """
+    Resumo a usar no fechamento: o running summary se ele cobre exatamente as
+    partidas do meta.json; caso contrário (ou com verify=True) recalcula do zero
+    com load_matches(). Retorna (summary, origem) com origem em {"running", "recomputed"}.
+    """
+    if not verify and running is not None and sorted(running.get("matches", [])) == sorted(meta_matches or []):
+        return copy.deepcopy(running), "running"
+    return summary_from_matches(rodada_id, load_matches()), "recomputed"
+
+
+def verify_running_summary(rodada_dir):
+    """True se o running summary bate com o recálculo completo a partir das partidas."""
+    running = load_running_summary(rodada_dir)
+    if running is None:
+        return False
+    full = compute_summary(rodada_dir)
+    return (sorted(running["matches"]) == sorted(full["matches"])
+            and running["placar_por_partida"] == full["placar_por_partida"]
+            and running["resumo_por_jogador"] == full["resumo_por_jogador"])